@@ -1,13 +1,32 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.append(WARIS_ROOT)
+
+from waris.anomaly import THRESHOLD as ALERT_THRESHOLD, load_events, lookup_events
+from waris.cache import cached
+from waris.data import load_data
+from waris.filters import filter_frame, load_filtered
+from waris.kpis import kpi_summary_from_cube, zone_metrics as compute_zone_metrics
+from waris.cube import aggregate, load_cube, period_rollup, slice_cube
+from waris.memprofile import track_objects
+from waris.reactive import session_graph
+from waris.timing import debug_overlay, section, start_run, timed
+from waris.tenants import select_tenant
+
+start_run('Home')
+
 # Page configuration
 st.set_page_config(
     page_title="WARIS Water Management Dashboard",
@@ -16,6 +35,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
 # Global CSS for water-themed branding
 st.markdown("""
 <style>
@@ -405,33 +427,113 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    """Load and preprocess the WARIS dataset"""
-    try:
-        df = pd.read_csv('../../../Data/WARIS.csv')
-        df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-        df['Year'] = df['Date'].dt.year
-        df['Month_Name'] = df['Date'].dt.month_name()
-        
-        # Calculate additional metrics
-        df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
-        df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+# Cached chart builders - keyed on the small aggregated frames and held in
+# the shared memory-bounded cache, so the default view is served from cache
+@timed('build revenue chart')
+@cached('home figures', disk=True)
+def build_revenue_chart(chart_df, chart_type):
+    """Build the Revenue vs Expenditure trend chart"""
+    if chart_type == "Line Chart":
+        fig = px.line(
+            chart_df, 
+            x='Date', 
+            y=['Total Operating Revenues', 'Total Operating Expenditures'],
+            color='Zone',
+            title='',
+            color_discrete_map={
+                'Total Operating Revenues': '#0ea5e9',
+                'Total Operating Expenditures': '#ef4444'
+            }
+        )
+    elif chart_type == "Bar Chart":
+        fig = px.bar(
+            chart_df, 
+            x='Date', 
+            y=['Total Operating Revenues', 'Total Operating Expenditures'],
+            color='Zone',
+            title='',
+            barmode='group'
+        )
+    else:  # Area Chart
+        fig = px.area(
+            chart_df, 
+            x='Date', 
+            y=['Total Operating Revenues', 'Total Operating Expenditures'],
+            color='Zone',
+            title=''
+        )
+    
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Amount ($)",
+        hovermode='x unified',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+    
+    # Add click event for drill-down
+    fig.update_traces(
+        hovertemplate="<b>%{fullData.name}</b><br>" +
+                     "Date: %{x}<br>" +
+                     "Value: $%{y:,.0f}<br>" +
+                     "<extra></extra>"
+    )
+    return fig
+
+@timed('build zone scatter')
+@cached('home figures', disk=True)
+def build_zone_scatter(zone_revenue):
+    """Build the interactive zone performance scatter plot"""
+    fig = px.scatter(
+        zone_revenue,
+        x='Total Operating Revenues',
+        y='Collection Efficiency',
+        size='Total Operating Revenues',
+        color='Zone',
+        hover_name='Zone',
+        hover_data={'Total Operating Revenues': ':.0f', 'Collection Efficiency': ':.1f'},
+        title='',
+        color_discrete_sequence=['#0ea5e9', '#0284c7', '#06b6d4', '#38bdf8', '#7dd3fc']
+    )
+    
+    fig.update_layout(
+        xaxis_title="Total Revenue ($)",
+        yaxis_title="Collection Efficiency (%)",
+        showlegend=False
+    )
+    return fig
+
+def revenue_rollup(cube_df, aggregation):
+    """Revenue and expenditure per zone and period, from the (sliced) cube"""
+    return period_rollup(cube_df, aggregation)[
+        ['Date', 'Zone', 'Total Operating Revenues', 'Total Operating Expenditures']
+    ]
+
+def zone_monthly_trend(drill_down_df):
+    """Monthly revenue and mean collection efficiency of the drilled-down rows"""
+    monthly_trend = drill_down_df.groupby(drill_down_df['Date'].dt.to_period('M')).agg({
+        'Total Operating Revenues': 'sum',
+        'Collection Efficiency': 'mean'
+    }).reset_index()
+    monthly_trend['Date'] = monthly_trend['Date'].dt.start_time
+    return monthly_trend
 
 # Load data
-df = load_data()
+with section('load data'):
+    df = load_data()
 
 if df.empty:
     st.error("No data available. Please check the data file path.")
     st.stop()
 
+# Derived values are recomputed only when their inputs change (waris.reactive)
+graph = session_graph('Home')
+
 # Header
 st.markdown("""
 <div class="main-header">
@@ -510,22 +612,14 @@ if "🏠 Home" in current_page:
             )
 
     # Apply filters
-    filtered_df = df.copy()
-
-    if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df['Date'].dt.date >= date_range[0]) & 
-            (filtered_df['Date'].dt.date <= date_range[1])
-        ]
+    with section('filter'):
+        filtered_df = graph.node('filtered_df', load_filtered, date_range, selected_zones, selected_years)
 
-    if 'All' not in selected_zones:
-        filtered_df = filtered_df[filtered_df['Zone'].isin(selected_zones)]
-
-    if selected_years:
-        filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
+        # Same filters applied to the cached aggregate cube for the roll-up charts
+        cube_df = graph.node('cube_df', slice_cube, load_cube(), date_range, selected_zones, selected_years)
 else:
     # For other pages, use all data
-    filtered_df = df.copy()
+    filtered_df = df
 
 # Page Content - Show different content based on selection
 if "🏠 Home" in current_page:
@@ -533,25 +627,10 @@ if "🏠 Home" in current_page:
     st.markdown('<div class="section-header">🎯 Executive Summary - Key Performance Indicators</div>', unsafe_allow_html=True)
 
     # Calculate KPIs with advanced metrics
-    total_revenue = filtered_df['Total Operating Revenues'].sum()
-    total_expenditure = filtered_df['Total Operating Expenditures'].sum()
-    net_revenue = total_revenue - total_expenditure
-    avg_efficiency = filtered_df['Collection Efficiency'].mean()
-    total_billing = filtered_df['Total Billing'].sum()
-    total_collection = filtered_df['Total Collection'].sum()
-    collection_rate = (total_collection / total_billing * 100) if total_billing > 0 else 0
-    
-    # Advanced KPI calculations
-    total_zones = filtered_df['Zone'].nunique()
-    avg_revenue_per_zone = total_revenue / total_zones if total_zones > 0 else 0
-    efficiency_variance = filtered_df['Collection Efficiency'].std()
-    
-    # Previous period comparison for trend analysis
-    if len(filtered_df) > 1:
-        prev_period_revenue = filtered_df.groupby('Year')['Total Operating Revenues'].sum().iloc[-2] if len(filtered_df.groupby('Year')) > 1 else 0
-        revenue_growth = ((total_revenue - prev_period_revenue) / prev_period_revenue * 100) if prev_period_revenue > 0 else 0
-    else:
-        revenue_growth = 0
+    with section('kpis'):
+        (total_revenue, total_expenditure, net_revenue, avg_efficiency, efficiency_variance,
+         total_billing, total_collection, collection_rate, total_zones, avg_revenue_per_zone,
+         revenue_growth) = graph.node('kpis', kpi_summary_from_cube, cube_df)
 
     # HIERARCHICAL KPI CARDS - Most Critical First
     st.markdown("""
@@ -624,80 +703,13 @@ if "🏠 Home" in current_page:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">💰 Revenue vs Expenditure Trends (Click to Drill Down)</div>', unsafe_allow_html=True)
         
-        # Apply aggregation
-        if aggregation == "Monthly":
-            chart_df = filtered_df.groupby(['Date', 'Zone']).agg({
-                'Total Operating Revenues': 'sum',
-                'Total Operating Expenditures': 'sum'
-            }).reset_index()
-        elif aggregation == "Quarterly":
-            chart_df = filtered_df.copy()
-            chart_df['Quarter'] = chart_df['Date'].dt.to_period('Q')
-            chart_df = chart_df.groupby(['Quarter', 'Zone']).agg({
-                'Total Operating Revenues': 'sum',
-                'Total Operating Expenditures': 'sum'
-            }).reset_index()
-            chart_df['Date'] = chart_df['Quarter'].dt.start_time
-        else:  # Yearly
-            chart_df = filtered_df.groupby(['Year', 'Zone']).agg({
-                'Total Operating Revenues': 'sum',
-                'Total Operating Expenditures': 'sum'
-            }).reset_index()
-            chart_df['Date'] = pd.to_datetime(chart_df['Year'], format='%Y')
+        # Apply aggregation from the cached (Date, Zone) cube
+        with section('period rollup'):
+            chart_df = graph.node('chart_df', revenue_rollup, cube_df, aggregation)
+        fig = graph.node('revenue_chart', build_revenue_chart, chart_df, chart_type)
         
-        # Create chart based on type
-        if chart_type == "Line Chart":
-            fig = px.line(
-                chart_df, 
-                x='Date', 
-                y=['Total Operating Revenues', 'Total Operating Expenditures'],
-                color='Zone',
-                title='',
-                color_discrete_map={
-                    'Total Operating Revenues': '#0ea5e9',
-                    'Total Operating Expenditures': '#ef4444'
-                }
-            )
-        elif chart_type == "Bar Chart":
-            fig = px.bar(
-                chart_df, 
-                x='Date', 
-                y=['Total Operating Revenues', 'Total Operating Expenditures'],
-                color='Zone',
-                title='',
-                barmode='group'
-            )
-        else:  # Area Chart
-            fig = px.area(
-                chart_df, 
-              x='Date', 
-              y=['Total Operating Revenues', 'Total Operating Expenditures'],
-                color='Zone',
-                title=''
-            )
-        
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Amount ($)",
-            hovermode='x unified',
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            )
-        )
-        
-        # Add click event for drill-down
-        fig.update_traces(
-            hovertemplate="<b>%{fullData.name}</b><br>" +
-                         "Date: %{x}<br>" +
-                         "Value: $%{y:,.0f}<br>" +
-                         "<extra></extra>"
-        )
-        
-        st.plotly_chart(fig, use_container_width=True, key="revenue_chart")
+        with section('render revenue chart'):
+            st.plotly_chart(fig, use_container_width=True, key="revenue_chart")
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
@@ -705,31 +717,14 @@ if "🏠 Home" in current_page:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">🏢 Zone Performance (Click to Filter)</div>', unsafe_allow_html=True)
         
-        zone_revenue = filtered_df.groupby('Zone').agg({
-            'Total Operating Revenues': 'sum',
-            'Collection Efficiency': 'mean'
-        }).reset_index()
+        with section('zone aggregate'):
+            zone_revenue = graph.node('zone_revenue', lambda cube_df: aggregate(cube_df, 'Zone')[
+                ['Zone', 'Total Operating Revenues', 'Collection Efficiency']
+            ], cube_df)
+        fig = graph.node('zone_scatter', build_zone_scatter, zone_revenue)
         
-        # Create interactive scatter plot
-        fig = px.scatter(
-            zone_revenue,
-            x='Total Operating Revenues',
-            y='Collection Efficiency',
-            size='Total Operating Revenues',
-            color='Zone',
-            hover_name='Zone',
-            hover_data={'Total Operating Revenues': ':.0f', 'Collection Efficiency': ':.1f'},
-            title='',
-            color_discrete_sequence=['#0ea5e9', '#0284c7', '#06b6d4', '#38bdf8', '#7dd3fc']
-        )
-        
-        fig.update_layout(
-            xaxis_title="Total Revenue ($)",
-            yaxis_title="Collection Efficiency (%)",
-            showlegend=False
-        )
-        
-        st.plotly_chart(fig, use_container_width=True, key="zone_scatter")
+        with section('render zone scatter'):
+            st.plotly_chart(fig, use_container_width=True, key="zone_scatter")
         st.markdown('</div>', unsafe_allow_html=True)
 
     # ADVANCED DRILL-DOWN: Zone Performance with Interactive Filtering
@@ -756,24 +751,15 @@ if "🏠 Home" in current_page:
         st.info("💡 **Drill-Down**: Select a specific zone to see detailed breakdown!")
     
     # Apply zone filter for drill-down
-    if selected_zone != "All Zones":
-        drill_down_df = filtered_df[filtered_df['Zone'] == selected_zone]
+    drill_down_zones = [selected_zone] if selected_zone != "All Zones" else None
+    drill_down_df = graph.node('drill_down_df', filter_frame, filtered_df, zones=drill_down_zones)
+    drill_down_cube = graph.node('drill_down_cube', slice_cube, cube_df, zones=drill_down_zones)
+    if drill_down_zones:
         st.success(f"🔍 **Drilling down into {selected_zone}** - Showing detailed analysis")
-    else:
-        drill_down_df = filtered_df
     
     # Calculate zone metrics
-    zone_metrics = drill_down_df.groupby('Zone').agg({
-        'Total Operating Revenues': 'sum',
-        'Total Operating Expenditures': 'sum',
-        'Collection Efficiency': 'mean',
-        'Operation & Maintenance Cost Coverage': 'mean',
-        'Total Collection': 'sum',
-        'Total Billing': 'sum'
-    }).round(2)
-
-    zone_metrics['Net Revenue'] = zone_metrics['Total Operating Revenues'] - zone_metrics['Total Operating Expenditures']
-    zone_metrics['Collection Rate'] = (zone_metrics['Total Collection'] / zone_metrics['Total Billing'] * 100).round(2)
+    with section('zone metrics'):
+        zone_metrics = graph.node('zone_metrics', compute_zone_metrics, drill_down_cube)
     
     # Filter metrics based on focus
     if metric_focus == "Revenue":
@@ -809,27 +795,24 @@ if "🏠 Home" in current_page:
             
             with col1:
                 # Monthly trend for selected zone
-                monthly_trend = drill_down_df.groupby(drill_down_df['Date'].dt.to_period('M')).agg({
-                    'Total Operating Revenues': 'sum',
-                    'Collection Efficiency': 'mean'
-                }).reset_index()
-                monthly_trend['Date'] = monthly_trend['Date'].dt.start_time
+                with section('zone deep dive'):
+                    monthly_trend = graph.node('monthly_trend', zone_monthly_trend, drill_down_df)
                 
-                fig = px.line(
-                    monthly_trend,
-                    x='Date',
-                    y=['Total Operating Revenues', 'Collection Efficiency'],
-                    title=f'{selected_zone} Monthly Performance',
-                    color_discrete_map={
-                        'Total Operating Revenues': '#0ea5e9',
-                        'Collection Efficiency': '#f59e0b'
-                    }
-                )
-                fig.update_layout(
-                    xaxis_title="Month",
-                    yaxis_title="Value"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                    fig = px.line(
+                        monthly_trend,
+                        x='Date',
+                        y=['Total Operating Revenues', 'Collection Efficiency'],
+                        title=f'{selected_zone} Monthly Performance',
+                        color_discrete_map={
+                            'Total Operating Revenues': '#0ea5e9',
+                            'Collection Efficiency': '#f59e0b'
+                        }
+                    )
+                    fig.update_layout(
+                        xaxis_title="Month",
+                        yaxis_title="Value"
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
 
             with col2:
                 # Performance comparison
@@ -871,13 +854,23 @@ if "🏠 Home" in current_page:
         # Performance alerts
         st.markdown("### 🚨 Performance Alerts")
         
-        if best_efficiency - worst_efficiency > 20:
-            st.warning(f"⚠️ **High Performance Variance**: {best_zone} ({best_efficiency:.1f}%) vs {worst_zone} ({worst_efficiency:.1f}%) - Consider investigating {worst_zone}")
+        # Per-month anomalies flagged by the streaming engine, looked up for the current filters
+        with section('anomaly lookup'):
+            anomalies = graph.node('anomalies', lookup_events, load_events(), selected_zones, date_range, selected_years)
         
-        if efficiency_variance > 15:
-            st.error(f"🔴 **High Efficiency Variance**: {efficiency_variance:.1f}% - Inconsistent performance across zones")
-        elif efficiency_variance < 5:
-            st.success(f"✅ **Consistent Performance**: {efficiency_variance:.1f}% variance - Good operational consistency")
+        for _, event in anomalies.head(5).iterrows():
+            message = (f"**{event['Direction']} in {event['Metric']}**: {event['Zone']}, {event['Date']:%b %Y} - "
+                       f"{event['Value']:,.1f} vs {event['Expected']:,.1f} expected (robust z {event['Robust Z']:+.1f})")
+            if abs(event['Robust Z']) > 2 * ALERT_THRESHOLD:
+                st.error(f"🔴 {message}")
+            else:
+                st.warning(f"⚠️ {message}")
+        
+        if anomalies.empty:
+            st.success("✅ **No Anomalies**: every zone's monthly figures are within their usual range")
+        elif len(anomalies) > 5:
+            with st.expander(f"All {len(anomalies)} flagged months"):
+                st.dataframe(anomalies, use_container_width=True, hide_index=True)
         
         if revenue_growth < 0:
             st.error(f"📉 **Revenue Decline**: {revenue_growth:.1f}% vs previous period - Immediate attention required")
@@ -927,17 +920,8 @@ elif "📊 Analytics" in current_page:
     st.markdown('<div class="section-header">📊 Advanced Analytics</div>', unsafe_allow_html=True)
     
     # Zone Performance Comparison
-    zone_metrics = filtered_df.groupby('Zone').agg({
-        'Total Operating Revenues': 'sum',
-        'Total Operating Expenditures': 'sum',
-        'Collection Efficiency': 'mean',
-        'Operation & Maintenance Cost Coverage': 'mean',
-        'Total Collection': 'sum',
-        'Total Billing': 'sum'
-    }).round(2)
-    
-    zone_metrics['Net Revenue'] = zone_metrics['Total Operating Revenues'] - zone_metrics['Total Operating Expenditures']
-    zone_metrics['Collection Rate'] = (zone_metrics['Total Collection'] / zone_metrics['Total Billing'] * 100).round(2)
+    with section('zone metrics'):
+        zone_metrics = graph.node('all_zone_metrics', compute_zone_metrics, load_cube())
     
     st.markdown('<div class="data-table">', unsafe_allow_html=True)
     st.dataframe(
@@ -964,35 +948,37 @@ elif "📈 Trends" in current_page:
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">Revenue Trends by Zone</div>', unsafe_allow_html=True)
-        fig = px.line(
-            filtered_df,
-            x='Date',
-            y='Total Operating Revenues',
-            color='Zone',
-            title=''
-        )
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Revenue ($)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('revenue trends chart'):
+            fig = px.line(
+                filtered_df,
+                x='Date',
+                y='Total Operating Revenues',
+                color='Zone',
+                title=''
+            )
+            fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Revenue ($)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">Collection Efficiency Trends</div>', unsafe_allow_html=True)
-        fig = px.line(
-            filtered_df,
-            x='Date',
-            y='Collection Efficiency',
-            color='Zone',
-            title=''
-        )
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Collection Efficiency (%)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('efficiency trends chart'):
+            fig = px.line(
+                filtered_df,
+                x='Date',
+                y='Collection Efficiency',
+                color='Zone',
+                title=''
+            )
+            fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Collection Efficiency (%)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
 elif "📋 Data Explorer" in current_page:
@@ -1053,4 +1039,10 @@ st.markdown("""
     <p>Built with Streamlit | Data last updated: {}</p>
     <p>Professional Water Management Analytics & Insights</p>
 </div>
-""".format(datetime.now().strftime("%B %d, %Y at %I:%M %p")), unsafe_allow_html=True)
\ No newline at end of file
+""".format(datetime.now().strftime("%B %d, %Y at %I:%M %p")), unsafe_allow_html=True)
+
+# Per-session memory of this page's frames (Admin page, when profiling is on)
+track_objects(globals())
+
+# Per-section timings (shown with ?debug=timing)
+debug_overlay()
@@ -1,13 +1,32 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.append(WARIS_ROOT)
+
+from waris.cache import cached
+from waris.data import load_data
+from waris.filters import load_filtered
+from waris.kpis import zone_metrics as compute_zone_metrics
+from waris.cube import aggregate, load_cube, slice_cube
+from waris.analytics import zone_correlation
+from waris.executor import show_when_ready, submit
+from waris.memprofile import track_objects
+from waris.timing import debug_overlay, section, start_run, timed
+from waris.tenants import select_tenant
+
+start_run('Analytics')
+
 # Page configuration
 st.set_page_config(
     page_title="WARIS Analytics",
@@ -16,6 +35,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -72,28 +94,66 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    """Load and preprocess the WARIS dataset"""
-    try:
-        df = pd.read_csv('../../../Data/WARIS.csv')
-        df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-        df['Year'] = df['Date'].dt.year
-        df['Month_Name'] = df['Date'].dt.month_name()
-        
-        # Calculate additional metrics
-        df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
-        df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+# Cached chart builders - keyed on the small aggregated frames and held in
+# the shared memory-bounded cache, so the default view is served from cache
+@timed('build revenue by year chart')
+@cached('analytics figures', disk=True)
+def build_revenue_by_year_chart(revenue_data):
+    """Build the grouped revenue-by-zone-and-year bar chart"""
+    fig = px.bar(
+        revenue_data,
+        x='Year',
+        y='Total Operating Revenues',
+        color='Zone',
+        title='Revenue by Zone Over Time',
+        barmode='group'
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Year",
+        yaxis_title="Revenue ($)"
+    )
+    return fig
+
+@timed('build revenue pie')
+@cached('analytics figures', disk=True)
+def build_revenue_pie(total_revenue_by_zone):
+    """Build the revenue distribution pie chart"""
+    fig = px.pie(
+        total_revenue_by_zone,
+        values='Total Operating Revenues',
+        names='Zone',
+        title='Revenue Distribution by Zone',
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(title_font_size=16, title_x=0.5)
+    return fig
+
+@timed('build coverage chart')
+@cached('analytics figures', disk=True)
+def build_coverage_chart(coverage_by_zone):
+    """Build the average O&M cost coverage bar chart"""
+    fig = px.bar(
+        coverage_by_zone,
+        x='Zone',
+        y='Operation & Maintenance Cost Coverage',
+        title='Average O&M Cost Coverage by Zone',
+        color='Operation & Maintenance Cost Coverage',
+        color_continuous_scale='Viridis'
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Zone",
+        yaxis_title="O&M Cost Coverage (%)"
+    )
+    return fig
 
 # Load data
-df = load_data()
+with section('load data'):
+    df = load_data()
 
 if df.empty:
     st.error("No data available. Please check the data file path.")
@@ -140,31 +200,24 @@ with st.sidebar:
     )
 
 # Filter data based on selections
-filtered_df = df[
-    (df['Zone'].isin(selected_zones)) & 
-    (df['Year'] >= year_range[0]) & 
-    (df['Year'] <= year_range[1])
-]
+selected_years = [year for year in years if year_range[0] <= year <= year_range[1]]
+with section('filter'):
+    filtered_df = load_filtered(zones=selected_zones, years=selected_years)
 
 if filtered_df.empty:
     st.warning("No data available for the selected filters. Please adjust your selection.")
     st.stop()
 
+# Same filters applied to the cached aggregate cube for the zone/year roll-ups
+with section('slice cube'):
+    cube_df = slice_cube(load_cube(), zones=selected_zones, years=selected_years)
+
 # Zone Performance Comparison
 st.markdown('<div class="section-header">🏢 Zone Performance Comparison</div>', unsafe_allow_html=True)
 
 # Calculate zone metrics
-zone_metrics = filtered_df.groupby('Zone').agg({
-    'Total Operating Revenues': 'sum',
-    'Total Operating Expenditures': 'sum',
-    'Collection Efficiency': 'mean',
-    'Operation & Maintenance Cost Coverage': 'mean',
-    'Total Collection': 'sum',
-    'Total Billing': 'sum'
-}).round(2)
-
-zone_metrics['Net Revenue'] = zone_metrics['Total Operating Revenues'] - zone_metrics['Total Operating Expenditures']
-zone_metrics['Collection Rate'] = (zone_metrics['Total Collection'] / zone_metrics['Total Billing'] * 100).round(2)
+with section('zone metrics'):
+    zone_metrics = compute_zone_metrics(cube_df)
 
 # Display zone comparison table
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
@@ -192,38 +245,19 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # Revenue by Zone and Year
-    revenue_data = filtered_df.groupby(['Zone', 'Year'])['Total Operating Revenues'].sum().reset_index()
-    fig = px.bar(
-        revenue_data,
-        x='Year',
-        y='Total Operating Revenues',
-        color='Zone',
-        title='Revenue by Zone Over Time',
-        barmode='group'
-    )
-    fig.update_layout(
-        title_font_size=16,
-        title_x=0.5,
-        xaxis_title="Year",
-        yaxis_title="Revenue ($)"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    revenue_data = aggregate(cube_df, ['Zone', 'Year'])[['Zone', 'Year', 'Total Operating Revenues']]
+    fig = build_revenue_by_year_chart(revenue_data)
+    with section('render revenue by year chart'):
+        st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col2:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # Revenue distribution pie chart
-    total_revenue_by_zone = filtered_df.groupby('Zone')['Total Operating Revenues'].sum().reset_index()
-    fig = px.pie(
-        total_revenue_by_zone,
-        values='Total Operating Revenues',
-        names='Zone',
-        title='Revenue Distribution by Zone',
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    fig.update_traces(textposition='inside', textinfo='percent+label')
-    fig.update_layout(title_font_size=16, title_x=0.5)
-    st.plotly_chart(fig, use_container_width=True)
+    total_revenue_by_zone = aggregate(cube_df, 'Zone')[['Zone', 'Total Operating Revenues']]
+    fig = build_revenue_pie(total_revenue_by_zone)
+    with section('render revenue pie'):
+        st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Efficiency Analysis
@@ -234,40 +268,30 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # Collection Efficiency over time
-    fig = px.line(
-        filtered_df,
-        x='Date',
-        y='Collection Efficiency',
-        color='Zone',
-        title='Collection Efficiency Trends by Zone'
-    )
-    fig.update_layout(
-        title_font_size=16,
-        title_x=0.5,
-        xaxis_title="Date",
-        yaxis_title="Collection Efficiency (%)"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    with section('collection efficiency trends by zone chart'):
+        fig = px.line(
+            filtered_df,
+            x='Date',
+            y='Collection Efficiency',
+            color='Zone',
+            title='Collection Efficiency Trends by Zone'
+        )
+        fig.update_layout(
+            title_font_size=16,
+            title_x=0.5,
+            xaxis_title="Date",
+            yaxis_title="Collection Efficiency (%)"
+        )
+        st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 with col2:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # O&M Cost Coverage
-    fig = px.bar(
-        filtered_df.groupby('Zone')['Operation & Maintenance Cost Coverage'].mean().reset_index(),
-        x='Zone',
-        y='Operation & Maintenance Cost Coverage',
-        title='Average O&M Cost Coverage by Zone',
-        color='Operation & Maintenance Cost Coverage',
-        color_continuous_scale='Viridis'
-    )
-    fig.update_layout(
-        title_font_size=16,
-        title_x=0.5,
-        xaxis_title="Zone",
-        yaxis_title="O&M Cost Coverage (%)"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    coverage_by_zone = aggregate(cube_df, 'Zone')[['Zone', 'Operation & Maintenance Cost Coverage']]
+    fig = build_coverage_chart(coverage_by_zone)
+    with section('render coverage chart'):
+        st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Correlation Analysis
@@ -275,22 +299,27 @@ st.markdown('<div class="section-header">🔗 Correlation Analysis</div>', unsaf
 
 # Calculate correlation matrix for selected metrics
 if len(selected_metrics) > 1:
-    correlation_data = filtered_df[selected_metrics + ['Zone']].groupby('Zone')[selected_metrics].corr()
+    # Computed in the process pool; a placeholder shows until it is ready
+    correlation_task = submit(zone_correlation, filtered_df[selected_metrics + ['Zone']], selected_metrics)
     
-    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-    fig = px.imshow(
-        correlation_data,
-        text_auto=True,
-        aspect="auto",
-        title="Correlation Matrix of Selected Metrics by Zone",
-        color_continuous_scale='RdBu'
-    )
-    fig.update_layout(
-        title_font_size=16,
-        title_x=0.5
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+    def render_correlation(correlation_data):
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        with section('correlation matrix chart'):
+            fig = px.imshow(
+                correlation_data,
+                text_auto=True,
+                aspect="auto",
+                title="Correlation Matrix of Selected Metrics by Zone",
+                color_continuous_scale='RdBu'
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    show_when_ready(correlation_task, render_correlation, "⏳ Computing correlation matrix...")
 
 # Statistical Summary
 st.markdown('<div class="section-header">📈 Statistical Summary</div>', unsafe_allow_html=True)
@@ -348,4 +377,10 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Per-session memory of this page's frames (Admin page, when profiling is on)
+track_objects(globals())
+
+# Per-section timings (shown with ?debug=timing)
+debug_overlay()
@@ -5,9 +5,27 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.append(WARIS_ROOT)
+
+from waris.cache import cached
+from waris.data import load_data
+from waris.filters import load_filtered
+from waris.cube import load_cube, period_rollup, slice_cube
+from waris.memprofile import track_objects
+from waris.reactive import session_graph
+from waris.timing import debug_overlay, section, start_run, timed
+from waris.tenants import select_tenant
+
+start_run('Trends')
+
 # Page configuration
 st.set_page_config(
     page_title="WARIS Trends",
@@ -16,6 +34,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -84,34 +105,98 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    """Load and preprocess the WARIS dataset"""
-    try:
-        df = pd.read_csv('../../../Data/WARIS.csv')
-        df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-        df['Year'] = df['Date'].dt.year
-        df['Month_Name'] = df['Date'].dt.month_name()
-        df['Quarter'] = df['Date'].dt.quarter
+# Cached chart builders - keyed on the small aggregated frames and held in
+# the shared memory-bounded cache, so the default view is served from cache
+@timed('build revenue trend chart')
+@cached('trends figures', disk=True)
+def build_revenue_trend_chart(trend_df, x_col, agg_level):
+    """Build the revenue-over-time line chart by zone"""
+    fig = px.line(
+        trend_df,
+        x=x_col,
+        y='Total Operating Revenues',
+        color='Zone',
+        title=f'Revenue Trends by Zone ({agg_level})',
+        markers=True
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Date",
+        yaxis_title="Revenue ($)"
+    )
+    return fig
+
+@timed('build growth chart')
+@cached('trends figures', disk=True)
+def build_growth_chart(growth_df, x_col, agg_level):
+    """Build the revenue growth rate bar chart by zone"""
+    fig = px.bar(
+        growth_df,
+        x=x_col,
+        y='Growth_Rate',
+        color='Zone',
+        title=f'Revenue Growth Rate by Zone ({agg_level})',
+        barmode='group'
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Date",
+        yaxis_title="Growth Rate (%)"
+    )
+    return fig
+
+def revenue_growth(agg_df, x_col):
+    """Period-over-period revenue growth (%) per zone"""
+    growth_df = agg_df[[x_col, 'Zone', 'Total Operating Revenues']].copy()
+    growth_df['Growth_Rate'] = growth_df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
+    return growth_df.dropna()
+
+def zone_trend_stats(agg_df):
+    """Mean, std, min and max of the main measures per zone"""
+    trend_stats = agg_df.groupby('Zone').agg({
+        'Total Operating Revenues': ['mean', 'std', 'min', 'max'],
+        'Collection Efficiency': ['mean', 'std', 'min', 'max'],
+        'Total Operating Expenditures': ['mean', 'std', 'min', 'max'],
+        'Net_Revenue': ['mean', 'std', 'min', 'max']
+    }).round(2)
+
+    # Flatten column names
+    trend_stats.columns = ['_'.join(col).strip() for col in trend_stats.columns]
+    return trend_stats.reset_index()
+
+def zone_performance(agg_df):
+    """Average level and mean period-over-period change of revenue and efficiency per zone"""
+    performance_metrics = []
+    for zone in agg_df['Zone'].unique():
+        zone_data = agg_df[agg_df['Zone'] == zone]
         
-        # Calculate additional metrics
-        df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
-        df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
+        # Calculate trends
+        revenue_trend = zone_data['Total Operating Revenues'].pct_change().mean() * 100
+        efficiency_trend = zone_data['Collection Efficiency'].pct_change().mean() * 100
         
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+        performance_metrics.append({
+            'Zone': zone,
+            'Avg Revenue': zone_data['Total Operating Revenues'].mean(),
+            'Revenue Trend': revenue_trend,
+            'Avg Efficiency': zone_data['Collection Efficiency'].mean(),
+            'Efficiency Trend': efficiency_trend,
+            'Total Net Revenue': zone_data['Net_Revenue'].sum()
+        })
+    return pd.DataFrame(performance_metrics)
 
 # Load data
-df = load_data()
+with section('load data'):
+    df = load_data()
 
 if df.empty:
     st.error("No data available. Please check the data file path.")
     st.stop()
 
+# Derived values are recomputed only when their inputs change (waris.reactive)
+graph = session_graph('Trends')
+
 # Main content
 st.markdown('<h1 class="main-header">📈 Trends Analysis</h1>', unsafe_allow_html=True)
 
@@ -155,54 +240,18 @@ with st.sidebar:
     )
 
 # Apply filters
-filtered_df = df.copy()
-
-if len(date_range) == 2:
-    filtered_df = filtered_df[
-        (filtered_df['Date'].dt.date >= date_range[0]) & 
-        (filtered_df['Date'].dt.date <= date_range[1])
-    ]
-
-if 'All' not in selected_zones:
-    filtered_df = filtered_df[filtered_df['Zone'].isin(selected_zones)]
+with section('filter'):
+    filtered_df = graph.node('filtered_df', load_filtered, date_range, selected_zones)
 
 if filtered_df.empty:
     st.warning("No data available for the selected filters. Please adjust your selection.")
     st.stop()
 
-# Aggregate data based on selected level
-if agg_level == 'Monthly':
-    agg_df = filtered_df.groupby(['Date', 'Zone']).agg({
-        'Total Operating Revenues': 'sum',
-        'Total Operating Expenditures': 'sum',
-        'Collection Efficiency': 'mean',
-        'Total Collection': 'sum',
-        'Total Billing': 'sum',
-        'Net_Revenue': 'sum'
-    }).reset_index()
-    x_col = 'Date'
-elif agg_level == 'Quarterly':
-    agg_df = filtered_df.groupby(['Year', 'Quarter', 'Zone']).agg({
-        'Total Operating Revenues': 'sum',
-        'Total Operating Expenditures': 'sum',
-        'Collection Efficiency': 'mean',
-        'Total Collection': 'sum',
-        'Total Billing': 'sum',
-        'Net_Revenue': 'sum'
-    }).reset_index()
-    agg_df['Quarter_Date'] = pd.to_datetime(agg_df[['Year', 'Quarter']].assign(Month=agg_df['Quarter']*3))
-    x_col = 'Quarter_Date'
-else:  # Yearly
-    agg_df = filtered_df.groupby(['Year', 'Zone']).agg({
-        'Total Operating Revenues': 'sum',
-        'Total Operating Expenditures': 'sum',
-        'Collection Efficiency': 'mean',
-        'Total Collection': 'sum',
-        'Total Billing': 'sum',
-        'Net_Revenue': 'sum'
-    }).reset_index()
-    agg_df['Year_Date'] = pd.to_datetime(agg_df['Year'], format='%Y')
-    x_col = 'Year_Date'
+# Aggregate data based on selected level, from the cached (Date, Zone) cube
+with section('period rollup'):
+    cube_df = graph.node('cube_df', slice_cube, load_cube(), date_range, selected_zones)
+    agg_df = graph.node('agg_df', period_rollup, cube_df, agg_level)
+x_col = 'Date'
 
 # Revenue Trends
 if trend_type in ['Revenue Trends', 'All Trends']:
@@ -213,45 +262,20 @@ if trend_type in ['Revenue Trends', 'All Trends']:
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Revenue over time by zone
-        fig = px.line(
-            agg_df,
-            x=x_col,
-            y='Total Operating Revenues',
-            color='Zone',
-            title=f'Revenue Trends by Zone ({agg_level})',
-            markers=True
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Date",
-            yaxis_title="Revenue ($)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        trend_df = graph.node('revenue_trend_df', lambda agg_df, x_col: agg_df[[x_col, 'Zone', 'Total Operating Revenues']],
+                              agg_df, x_col)
+        fig = graph.node('revenue_trend_chart', build_revenue_trend_chart, trend_df, x_col, agg_level)
+        with section('render revenue trend chart'):
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Revenue growth rate
-        growth_data = agg_df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        growth_df = agg_df.copy()
-        growth_df['Growth_Rate'] = growth_data
-        
-        fig = px.bar(
-            growth_df.dropna(),
-            x=x_col,
-            y='Growth_Rate',
-            color='Zone',
-            title=f'Revenue Growth Rate by Zone ({agg_level})',
-            barmode='group'
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Date",
-            yaxis_title="Growth Rate (%)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        growth_df = graph.node('growth_df', revenue_growth, agg_df, x_col)
+        fig = graph.node('growth_chart', build_growth_chart, growth_df, x_col, agg_level)
+        with section('render growth chart'):
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Efficiency Trends
@@ -263,40 +287,42 @@ if trend_type in ['Efficiency Trends', 'All Trends']:
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Collection efficiency over time
-        fig = px.line(
-            agg_df,
-            x=x_col,
-            y='Collection Efficiency',
-            color='Zone',
-            title=f'Collection Efficiency Trends by Zone ({agg_level})',
-            markers=True
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Date",
-            yaxis_title="Collection Efficiency (%)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('collection efficiency trends by zone chart'):
+            fig = px.line(
+                agg_df,
+                x=x_col,
+                y='Collection Efficiency',
+                color='Zone',
+                title=f'Collection Efficiency Trends by Zone ({agg_level})',
+                markers=True
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Date",
+                yaxis_title="Collection Efficiency (%)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Efficiency distribution
-        fig = px.box(
-            filtered_df,
-            x='Zone',
-            y='Collection Efficiency',
-            title='Collection Efficiency Distribution by Zone',
-            color='Zone'
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Zone",
-            yaxis_title="Collection Efficiency (%)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('collection efficiency distribution by zone chart'):
+            fig = px.box(
+                filtered_df,
+                x='Zone',
+                y='Collection Efficiency',
+                title='Collection Efficiency Distribution by Zone',
+                color='Zone'
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Zone",
+                yaxis_title="Collection Efficiency (%)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Expenditure Trends
@@ -308,42 +334,44 @@ if trend_type in ['Expenditure Trends', 'All Trends']:
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Expenditure over time
-        fig = px.line(
-            agg_df,
-            x=x_col,
-            y='Total Operating Expenditures',
-            color='Zone',
-            title=f'Expenditure Trends by Zone ({agg_level})',
-            markers=True
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Date",
-            yaxis_title="Expenditure ($)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('expenditure trends by zone chart'):
+            fig = px.line(
+                agg_df,
+                x=x_col,
+                y='Total Operating Expenditures',
+                color='Zone',
+                title=f'Expenditure Trends by Zone ({agg_level})',
+                markers=True
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Date",
+                yaxis_title="Expenditure ($)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Revenue vs Expenditure scatter
-        fig = px.scatter(
-            agg_df,
-            x='Total Operating Revenues',
-            y='Total Operating Expenditures',
-            color='Zone',
-            size='Collection Efficiency',
-            title='Revenue vs Expenditure by Zone',
-            hover_data=['Collection Efficiency']
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Revenue ($)",
-            yaxis_title="Expenditure ($)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('revenue vs expenditure by zone chart'):
+            fig = px.scatter(
+                agg_df,
+                x='Total Operating Revenues',
+                y='Total Operating Expenditures',
+                color='Zone',
+                size='Collection Efficiency',
+                title='Revenue vs Expenditure by Zone',
+                hover_data=['Collection Efficiency']
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Revenue ($)",
+                yaxis_title="Expenditure ($)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Collection Trends
@@ -355,58 +383,53 @@ if trend_type in ['Collection Trends', 'All Trends']:
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Collection vs Billing
-        fig = px.line(
-            agg_df,
-            x=x_col,
-            y=['Total Collection', 'Total Billing'],
-            color='Zone',
-            title=f'Collection vs Billing Trends by Zone ({agg_level})',
-            markers=True
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Date",
-            yaxis_title="Amount ($)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with section('collection vs billing trends by zone chart'):
+            fig = px.line(
+                agg_df,
+                x=x_col,
+                y=['Total Collection', 'Total Billing'],
+                color='Zone',
+                title=f'Collection vs Billing Trends by Zone ({agg_level})',
+                markers=True
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Date",
+                yaxis_title="Amount ($)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Collection rate over time
-        agg_df['Collection_Rate'] = (agg_df['Total Collection'] / agg_df['Total Billing'] * 100).round(2)
-        fig = px.line(
-            agg_df,
-            x=x_col,
-            y='Collection_Rate',
-            color='Zone',
-            title=f'Collection Rate Trends by Zone ({agg_level})',
-            markers=True
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Date",
-            yaxis_title="Collection Rate (%)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        rate_df = graph.node('collection_rate_df', lambda agg_df: agg_df.assign(
+            Collection_Rate=(agg_df['Total Collection'] / agg_df['Total Billing'] * 100).round(2)), agg_df)
+        with section('collection rate trends by zone chart'):
+            fig = px.line(
+                rate_df,
+                x=x_col,
+                y='Collection_Rate',
+                color='Zone',
+                title=f'Collection Rate Trends by Zone ({agg_level})',
+                markers=True
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Date",
+                yaxis_title="Collection Rate (%)"
+            )
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
 
 # Trend Summary Statistics
 st.markdown('<div class="section-header">📈 Trend Summary Statistics</div>', unsafe_allow_html=True)
 
 # Calculate trend statistics
-trend_stats = agg_df.groupby('Zone').agg({
-    'Total Operating Revenues': ['mean', 'std', 'min', 'max'],
-    'Collection Efficiency': ['mean', 'std', 'min', 'max'],
-    'Total Operating Expenditures': ['mean', 'std', 'min', 'max'],
-    'Net_Revenue': ['mean', 'std', 'min', 'max']
-}).round(2)
-
-# Flatten column names
-trend_stats.columns = ['_'.join(col).strip() for col in trend_stats.columns]
-trend_stats = trend_stats.reset_index()
+with section('trend stats'):
+    trend_stats = graph.node('trend_stats', zone_trend_stats, agg_df)
 
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
 st.subheader(f"Trend Statistics by Zone ({agg_level})")
@@ -417,24 +440,7 @@ st.markdown('</div>', unsafe_allow_html=True)
 st.markdown('<div class="section-header">🏆 Zone Performance Comparison</div>', unsafe_allow_html=True)
 
 # Calculate performance metrics
-performance_metrics = []
-for zone in agg_df['Zone'].unique():
-    zone_data = agg_df[agg_df['Zone'] == zone]
-    
-    # Calculate trends
-    revenue_trend = zone_data['Total Operating Revenues'].pct_change().mean() * 100
-    efficiency_trend = zone_data['Collection Efficiency'].pct_change().mean() * 100
-    
-    performance_metrics.append({
-        'Zone': zone,
-        'Avg Revenue': zone_data['Total Operating Revenues'].mean(),
-        'Revenue Trend': revenue_trend,
-        'Avg Efficiency': zone_data['Collection Efficiency'].mean(),
-        'Efficiency Trend': efficiency_trend,
-        'Total Net Revenue': zone_data['Net_Revenue'].sum()
-    })
-
-performance_df = pd.DataFrame(performance_metrics)
+performance_df = graph.node('performance_df', zone_performance, agg_df)
 
 col1, col2, col3 = st.columns(3)
 
@@ -479,3 +485,9 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
+
+# Per-session memory of this page's frames (Admin page, when profiling is on)
+track_objects(globals())
+
+# Per-section timings (shown with ?debug=timing)
+debug_overlay()
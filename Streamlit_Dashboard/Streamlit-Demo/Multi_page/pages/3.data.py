@@ -5,9 +5,29 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.append(WARIS_ROOT)
+
+from waris.cache import cached
+from waris.data import load_data
+from waris.filters import load_filtered
+from waris.cube import aggregate, load_cube, slice_cube
+from waris.analytics import correlation_matrix
+from waris.executor import show_when_ready, submit
+from waris.memprofile import track_objects
+from waris.outofcore import ROW_LIMIT, load_rows
+from waris.timing import debug_overlay, section, start_run, timed
+from waris.tenants import select_tenant
+
+start_run('Data Explorer')
+
 # Page configuration
 st.set_page_config(
     page_title="WARIS Data Explorer",
@@ -16,6 +36,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -79,30 +102,78 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    """Load and preprocess the WARIS dataset"""
-    try:
-        df = pd.read_csv('../../../Data/WARIS.csv')
-        df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-        df['Year'] = df['Date'].dt.year
-        df['Month_Name'] = df['Date'].dt.month_name()
-        df['Quarter'] = df['Date'].dt.quarter
-        
-        # Calculate additional metrics
-        df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
-        df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
-        df['Collection_Rate'] = (df['Total Collection'] / df['Total Billing'] * 100).round(2)
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
+# Cached chart builders - keyed on the small aggregated frames and held in
+# the shared memory-bounded cache, so the default view is served from cache
+@timed('build revenue by zone chart')
+@cached('data explorer figures', disk=True)
+def build_revenue_by_zone_chart(revenue_by_zone):
+    """Build the total revenue by zone bar chart"""
+    fig = px.bar(
+        revenue_by_zone,
+        x='Zone',
+        y='Total Operating Revenues',
+        title='Total Revenue by Zone',
+        color='Total Operating Revenues',
+        color_continuous_scale='Viridis'
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Zone",
+        yaxis_title="Revenue ($)"
+    )
+    return fig
+
+@timed('build efficiency by zone chart')
+@cached('data explorer figures', disk=True)
+def build_efficiency_by_zone_chart(efficiency_by_zone):
+    """Build the average collection efficiency by zone bar chart"""
+    fig = px.bar(
+        efficiency_by_zone,
+        x='Zone',
+        y='Collection Efficiency',
+        title='Average Collection Efficiency by Zone',
+        color='Collection Efficiency',
+        color_continuous_scale='Plasma'
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Zone",
+        yaxis_title="Collection Efficiency (%)"
+    )
+    return fig
+
+@timed('build revenue trend chart')
+@cached('data explorer figures', disk=True)
+def build_revenue_trend_chart(monthly_revenue):
+    """Build the monthly revenue trend line chart by zone"""
+    fig = px.line(
+        monthly_revenue,
+        x='Date',
+        y='Total Operating Revenues',
+        color='Zone',
+        title='Revenue Trends Over Time by Zone',
+        markers=True
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Date",
+        yaxis_title="Revenue ($)"
+    )
+    return fig
+
+@cached('data explorer exports')
+def build_export(export_df, export_format):
+    """Serialize the filtered rows for download (CSV or JSON)"""
+    if export_format == 'CSV':
+        return export_df.to_csv(index=False)
+    return export_df.to_json(orient='records', indent=2)
 
 # Load data
-df = load_data()
+with section('load data'):
+    df = load_data()
 
 if df.empty:
     st.error("No data available. Please check the data file path.")
@@ -168,27 +239,20 @@ with st.sidebar:
     )
 
 # Apply filters
-filtered_df = df.copy()
-
-if len(date_range) == 2:
-    filtered_df = filtered_df[
-        (filtered_df['Date'].dt.date >= date_range[0]) & 
-        (filtered_df['Date'].dt.date <= date_range[1])
-    ]
-
-if 'All' not in selected_zones:
-    filtered_df = filtered_df[filtered_df['Zone'].isin(selected_zones)]
-
-if selected_years:
-    filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
-
-if selected_months:
-    filtered_df = filtered_df[filtered_df['Month_Name'].isin(selected_months)]
+with section('filter'):
+    filtered_df = load_filtered(date_range, selected_zones, selected_years, selected_months)
 
 if filtered_df.empty:
     st.warning("No data available for the selected filters. Please adjust your selection.")
     st.stop()
 
+# Same filters applied to the cached aggregate cube for the zone/time roll-ups
+with section('slice cube'):
+    cube_df = slice_cube(load_cube(), date_range, selected_zones, selected_years, selected_months)
+
+# Rows of the source, also when it is served as its cube (waris.outofcore)
+total_records = int(cube_df['Rows'].sum())
+
 # Data Summary
 if show_summary:
     st.markdown('<div class="section-header">📊 Data Summary</div>', unsafe_allow_html=True)
@@ -196,7 +260,6 @@ if show_summary:
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_records = len(filtered_df)
         st.markdown(f"""
         <div class="metric-card">
             <div class="metric-label">Total Records</div>
@@ -241,85 +304,52 @@ if show_charts:
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Revenue by Zone
-        revenue_by_zone = filtered_df.groupby('Zone')['Total Operating Revenues'].sum().reset_index()
-        fig = px.bar(
-            revenue_by_zone,
-            x='Zone',
-            y='Total Operating Revenues',
-            title='Total Revenue by Zone',
-            color='Total Operating Revenues',
-            color_continuous_scale='Viridis'
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Zone",
-            yaxis_title="Revenue ($)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        revenue_by_zone = aggregate(cube_df, 'Zone')[['Zone', 'Total Operating Revenues']]
+        fig = build_revenue_by_zone_chart(revenue_by_zone)
+        with section('render revenue by zone chart'):
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         # Collection Efficiency by Zone
-        efficiency_by_zone = filtered_df.groupby('Zone')['Collection Efficiency'].mean().reset_index()
-        fig = px.bar(
-            efficiency_by_zone,
-            x='Zone',
-            y='Collection Efficiency',
-            title='Average Collection Efficiency by Zone',
-            color='Collection Efficiency',
-            color_continuous_scale='Plasma'
-        )
-        fig.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            xaxis_title="Zone",
-            yaxis_title="Collection Efficiency (%)"
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        efficiency_by_zone = aggregate(cube_df, 'Zone')[['Zone', 'Collection Efficiency']]
+        fig = build_efficiency_by_zone_chart(efficiency_by_zone)
+        with section('render efficiency by zone chart'):
+            st.plotly_chart(fig, use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     # Time Series Analysis
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # Revenue trends over time
-    monthly_revenue = filtered_df.groupby(['Date', 'Zone'])['Total Operating Revenues'].sum().reset_index()
-    fig = px.line(
-        monthly_revenue,
-        x='Date',
-        y='Total Operating Revenues',
-        color='Zone',
-        title='Revenue Trends Over Time by Zone',
-        markers=True
-    )
-    fig.update_layout(
-        title_font_size=16,
-        title_x=0.5,
-        xaxis_title="Date",
-        yaxis_title="Revenue ($)"
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    monthly_revenue = aggregate(cube_df, ['Date', 'Zone'])[['Date', 'Zone', 'Total Operating Revenues']]
+    fig = build_revenue_trend_chart(monthly_revenue)
+    with section('render revenue trend chart'):
+        st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Correlation Heatmap
-    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-    # Select numeric columns for correlation
+    # Correlation Heatmap - computed in the process pool over the numeric columns
     numeric_cols = filtered_df.select_dtypes(include=[np.number]).columns
-    correlation_matrix = filtered_df[numeric_cols].corr()
+    correlation_task = submit(correlation_matrix, filtered_df[numeric_cols])
     
-    fig = px.imshow(
-        correlation_matrix,
-        text_auto=True,
-        aspect="auto",
-        title="Correlation Matrix of Numeric Variables",
-        color_continuous_scale='RdBu'
-    )
-    fig.update_layout(
-        title_font_size=16,
-        title_x=0.5
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+    def render_correlation(correlation_data):
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        with section('correlation matrix chart'):
+            fig = px.imshow(
+                correlation_data,
+                text_auto=True,
+                aspect="auto",
+                title="Correlation Matrix of Numeric Variables",
+                color_continuous_scale='RdBu'
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    show_when_ready(correlation_task, render_correlation, "⏳ Computing correlation matrix...")
 
 # Data Statistics
 st.markdown('<div class="section-header">📈 Statistical Summary</div>', unsafe_allow_html=True)
@@ -335,29 +365,36 @@ st.markdown('</div>', unsafe_allow_html=True)
 # Zone-wise Summary
 st.markdown('<div class="section-header">🏢 Zone-wise Summary</div>', unsafe_allow_html=True)
 
-zone_summary = filtered_df.groupby('Zone').agg({
-    'Total Operating Revenues': ['sum', 'mean', 'std'],
-    'Total Operating Expenditures': ['sum', 'mean', 'std'],
-    'Collection Efficiency': ['mean', 'std', 'min', 'max'],
-    'Total Collection': ['sum', 'mean'],
-    'Total Billing': ['sum', 'mean']
-}).round(2)
+with section('zone summary'):
+    zone_summary = filtered_df.groupby('Zone').agg({
+        'Total Operating Revenues': ['sum', 'mean', 'std'],
+        'Total Operating Expenditures': ['sum', 'mean', 'std'],
+        'Collection Efficiency': ['mean', 'std', 'min', 'max'],
+        'Total Collection': ['sum', 'mean'],
+        'Total Billing': ['sum', 'mean']
+    }).round(2)
 
-# Flatten column names
-zone_summary.columns = ['_'.join(col).strip() for col in zone_summary.columns]
-zone_summary = zone_summary.reset_index()
+    # Flatten column names
+    zone_summary.columns = ['_'.join(col).strip() for col in zone_summary.columns]
+    zone_summary = zone_summary.reset_index()
 
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
 st.dataframe(zone_summary, use_container_width=True)
 st.markdown('</div>', unsafe_allow_html=True)
 
+# Row-level drill-down: the filtered rows, or a pruned scan of a file too large to load
+with section('drill-down rows'):
+    rows_df = load_rows(date_range, selected_zones, selected_years, selected_months)
+
 # Raw Data Table
 if show_raw_data:
     st.markdown('<div class="section-header">📋 Raw Data Table</div>', unsafe_allow_html=True)
     
+    if len(rows_df) < total_records:
+        st.caption(f"Showing the first {len(rows_df):,} of {total_records:,} rows (WARIS_ROW_LIMIT={ROW_LIMIT:,})")
     st.markdown('<div class="data-table">', unsafe_allow_html=True)
     st.dataframe(
-        filtered_df,
+        rows_df,
         use_container_width=True,
         height=400
     )
@@ -370,7 +407,7 @@ col1, col2, col3 = st.columns(3)
 
 with col1:
     if export_format == 'CSV':
-        csv_data = filtered_df.to_csv(index=False)
+        csv_data = build_export(rows_df, 'CSV')
         st.download_button(
             label="📊 Download as CSV",
             data=csv_data,
@@ -380,7 +417,7 @@ with col1:
 
 with col2:
     if export_format == 'Excel':
-        excel_data = filtered_df.to_excel(index=False)
+        excel_data = rows_df.to_excel(index=False)
         st.download_button(
             label="📊 Download as Excel",
             data=excel_data,
@@ -390,7 +427,7 @@ with col2:
 
 with col3:
     if export_format == 'JSON':
-        json_data = filtered_df.to_json(orient='records', indent=2)
+        json_data = build_export(rows_df, 'JSON')
         st.download_button(
             label="📊 Download as JSON",
             data=json_data,
@@ -426,4 +463,10 @@ st.markdown(
     </div>
     """,
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# Per-session memory of this page's frames (Admin page, when profiling is on)
+track_objects(globals())
+
+# Per-section timings (shown with ?debug=timing)
+debug_overlay()
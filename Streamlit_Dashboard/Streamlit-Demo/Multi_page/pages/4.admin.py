@@ -0,0 +1,366 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import os
+import sys
+import tracemalloc
+import warnings
+warnings.filterwarnings('ignore')
+
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.append(WARIS_ROOT)
+
+from waris import diskcache, memprofile, singleflight, tenants
+from waris.admin import require_admin
+from waris.cache import manager
+from waris.data import load_dataset
+from waris.executor import task_stats
+from waris.tenants import select_tenant
+
+# Page configuration
+st.set_page_config(
+    page_title="WARIS Cache Admin",
+    page_icon="⚙️",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Clearing caches and profiling affect every session: only for WARIS_ADMIN=1 or ?admin_token=
+require_admin()
+
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #1f2937;
+        text-align: center;
+        margin-bottom: 2rem;
+        background: linear-gradient(90deg, #3b82f6, #1d4ed8);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        background-clip: text;
+    }
+
+    .section-header {
+        font-size: 1.8rem;
+        font-weight: 600;
+        color: #374151;
+        margin: 2rem 0 1rem 0;
+        padding-bottom: 0.5rem;
+        border-bottom: 3px solid #3b82f6;
+    }
+
+    .chart-container {
+        background: white;
+        padding: 1rem;
+        border-radius: 15px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        margin-bottom: 2rem;
+    }
+
+    .metric-card {
+        background: white;
+        padding: 1.5rem;
+        border-radius: 15px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        border-left: 5px solid #3b82f6;
+        margin-bottom: 1rem;
+    }
+
+    .metric-value {
+        font-size: 2rem;
+        font-weight: 700;
+        color: #1f2937;
+        margin: 0.5rem 0;
+    }
+
+    .metric-label {
+        color: #6b7280;
+        font-size: 0.9rem;
+        margin: 0;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ['B', 'KB', 'MB']:
+        if abs(size) < 1024:
+            return f"{size:,.1f} {unit}"
+        size /= 1024
+    return f"{size:,.1f} GB"
+
+# Main content
+st.markdown('<h1 class="main-header">⚙️ Cache Admin</h1>', unsafe_allow_html=True)
+
+# Sidebar controls
+with st.sidebar:
+    st.markdown("## 🎛️ Cache Controls")
+
+    cache_stats = manager.stats()
+    clear_target = st.selectbox(
+        "Cache to Clear",
+        options=['All caches'] + cache_stats['cache'].tolist()
+    )
+    clear_tenant = st.selectbox(
+        "Tenant",
+        options=['All tenants'] + list(tenants.registry()),
+        format_func=lambda name: name if name == 'All tenants' else tenants.get(name).label
+    )
+    if st.button("🗑️ Clear"):
+        manager.clear(None if clear_target == 'All caches' else clear_target,
+                      None if clear_tenant == 'All tenants' else clear_tenant)
+        st.success(f"Cleared {clear_target.lower() if clear_target == 'All caches' else clear_target}"
+                   f" for {clear_tenant.lower() if clear_tenant == 'All tenants' else clear_tenant}")
+
+    if st.button("🔄 Refresh Statistics"):
+        st.rerun()
+
+cache_stats = manager.stats()
+
+# Budget overview
+st.markdown('<div class="section-header">💾 Memory Budget</div>', unsafe_allow_html=True)
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Budget</div>
+        <div class="metric-value">{format_bytes(manager.budget_bytes)}</div>
+        <div class="metric-label">WARIS_CACHE_BUDGET_MB</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with col2:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">In Use</div>
+        <div class="metric-value">{format_bytes(manager.used_bytes)}</div>
+        <div class="metric-label">{manager.used_bytes / manager.budget_bytes:.1%} of budget</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with col3:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Entries</div>
+        <div class="metric-value">{int(cache_stats['entries'].sum())}</div>
+        <div class="metric-label">{len(cache_stats)} caches</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with col4:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Eviction Policy</div>
+        <div class="metric-value">{manager.policy.upper()}</div>
+        <div class="metric-label">{int(cache_stats['evictions'].sum())} evictions</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+st.progress(min(manager.used_bytes / manager.budget_bytes, 1.0))
+
+# Per-cache statistics
+st.markdown('<div class="section-header">📊 Cache Statistics</div>', unsafe_allow_html=True)
+
+if cache_stats.empty:
+    st.info("No cache has been used yet in this process.")
+else:
+    col1, col2 = st.columns([3, 2])
+
+    with col1:
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        display_stats = cache_stats.copy()
+        display_stats['size'] = display_stats['bytes'].map(format_bytes)
+        st.dataframe(
+            display_stats[['cache', 'entries', 'size', 'hits', 'misses', 'hit_rate',
+                           'evictions', 'expirations', 'rejected']],
+            use_container_width=True,
+            hide_index=True
+        )
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    with col2:
+        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+        fig = px.bar(
+            cache_stats,
+            x='cache',
+            y='bytes',
+            title='Memory Used by Cache',
+            color='cache'
+        )
+        fig.update_layout(
+            title_font_size=16,
+            title_x=0.5,
+            xaxis_title="Cache",
+            yaxis_title="Bytes",
+            showlegend=False
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+# Per-tenant budgets
+st.markdown('<div class="section-header">🏢 Tenant Budgets</div>', unsafe_allow_html=True)
+
+tenant_stats = manager.tenant_stats()
+registry = tenants.registry()
+if tenant_stats.empty:
+    st.info(f"{len(registry)} tenant(s) registered; none has cached anything yet in this process.")
+else:
+    tenant_stats['label'] = tenant_stats['tenant'].map(lambda name: registry[name].label if name in registry else name)
+    tenant_stats['size'] = tenant_stats['bytes'].map(format_bytes)
+    tenant_stats['budget_size'] = tenant_stats['budget'].map(format_bytes)
+    tenant_stats['of_budget'] = (tenant_stats['bytes'] / tenant_stats['budget']).round(3)
+    st.dataframe(
+        tenant_stats[['label', 'entries', 'size', 'budget_size', 'of_budget', 'hits', 'misses', 'evictions']],
+        use_container_width=True,
+        hide_index=True
+    )
+
+# Disk tier
+st.markdown('<div class="section-header">🗄️ Disk Cache Tier</div>', unsafe_allow_html=True)
+
+if diskcache.enabled():
+    st.write(f"**Directory:** `{diskcache.CACHE_DIR}` (budget {format_bytes(diskcache.BUDGET_BYTES)})")
+    st.dataframe(diskcache.stats(), use_container_width=True, hide_index=True)
+else:
+    st.info("The disk tier is off. Set WARIS_DISK_CACHE_DIR to share cached results between processes on this host.")
+
+# Shared dataset and background work
+st.markdown('<div class="section-header">🧮 Dataset & Background Work</div>', unsafe_allow_html=True)
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.subheader("Dataset")
+    dataset = load_dataset()
+    st.write(f"**Tenant:** {tenants.current().label}")
+    st.write(f"**Version:** {dataset.version}")
+    st.write(f"**Rows:** {len(dataset.frame):,}")
+    st.write(f"**Memory:** {format_bytes(dataset.frame.memory_usage(deep=True).sum())} (not evictable)")
+
+with col2:
+    st.subheader("Single-flight")
+    flights = pd.DataFrame.from_dict(singleflight.stats(), orient='index')
+    st.dataframe(flights, use_container_width=True)
+
+with col3:
+    st.subheader("Process Pool")
+    st.dataframe(pd.Series(task_stats(), name='count'), use_container_width=True)
+
+# Per-session memory
+st.markdown('<div class="section-header">🧠 Session Memory</div>', unsafe_allow_html=True)
+
+if not memprofile.active():
+    st.info(
+        "Memory profiling is off. It traces every allocation (tracemalloc), which slows reruns; "
+        "start it here or with WARIS_MEMPROFILE=1, then use the dashboard pages."
+    )
+    if st.button("▶️ Start Memory Profiling"):
+        memprofile.enable()
+        st.rerun()
+else:
+    if st.button("⏹️ Stop Memory Profiling"):
+        memprofile.disable()
+        st.rerun()
+
+    session_stats = memprofile.sessions()
+    traced_current, traced_peak = tracemalloc.get_traced_memory()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Sessions Profiled", len(session_stats))
+    with col2:
+        st.metric("Traced Memory", format_bytes(traced_current))
+    with col3:
+        st.metric("Private Bytes per Session",
+                  format_bytes(session_stats['Private Bytes'].mean()) if len(session_stats) else "-")
+
+    if session_stats.empty:
+        st.info("No page has rerun since profiling started. Open the dashboard pages to record sessions.")
+    else:
+        display_sessions = session_stats.copy()
+        for column in ['Private Bytes', 'Shared Bytes', 'Rerun Peak']:
+            display_sessions[column] = display_sessions[column].map(format_bytes)
+        display_sessions['Session'] = display_sessions['Session'].str[:8]
+        st.dataframe(display_sessions, use_container_width=True, hide_index=True)
+
+        held = memprofile.objects()
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+            by_object = held[~held['Shared']].groupby('Object', as_index=False)['Bytes'].mean()
+            by_object = by_object.nlargest(15, 'Bytes')
+            fig = px.bar(
+                by_object,
+                x='Bytes',
+                y='Object',
+                orientation='h',
+                title='Largest Private Objects (mean per session)',
+                color='Bytes',
+                color_continuous_scale='Blues'
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                yaxis=dict(autorange='reversed'),
+                showlegend=False
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        with col2:
+            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+            section_stats = memprofile.sections()
+            by_section = section_stats.groupby(['Page', 'Section'], as_index=False)[['Net', 'Peak']].mean()
+            by_section = by_section[by_section['Section'] != 'Total rerun'].nlargest(15, 'Peak')
+            fig = px.bar(
+                by_section,
+                x='Peak',
+                y='Section',
+                color='Page',
+                orientation='h',
+                title='Peak Memory by Section (mean per rerun)'
+            )
+            fig.update_layout(
+                title_font_size=16,
+                title_x=0.5,
+                xaxis_title="Bytes above section start",
+                yaxis=dict(autorange='reversed')
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        with st.expander("📋 Objects by Session"):
+            display_objects = held.copy()
+            display_objects['Session'] = display_objects['Session'].str[:8]
+            display_objects['Size'] = display_objects['Bytes'].map(format_bytes)
+            st.dataframe(display_objects.drop(columns='Bytes'), use_container_width=True, hide_index=True)
+
+    st.subheader("Top Allocators")
+    group_by = st.radio("Group by", ['lineno', 'filename'], horizontal=True,
+                        format_func={'lineno': 'Source line', 'filename': 'File'}.get)
+    allocators = memprofile.top_allocators(group_by=group_by)
+    allocators['Size'] = allocators['Bytes'].map(format_bytes)
+    st.dataframe(allocators[['Location', 'Size', 'Blocks']], use_container_width=True, hide_index=True)
+
+# Footer
+st.markdown("---")
+st.markdown(
+    """
+    <div style='text-align: center; color: #6b7280; padding: 2rem;'>
+        <p>⚙️ WARIS Cache Admin | Memory Budget, Cache Statistics and Session Memory</p>
+        <p>Set WARIS_CACHE_BUDGET_MB and WARIS_CACHE_POLICY (lru or lfu) before starting the server</p>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
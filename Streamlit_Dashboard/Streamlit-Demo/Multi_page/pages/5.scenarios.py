@@ -0,0 +1,296 @@
+import streamlit as st
+import plotly.express as px
+import os
+import sys
+import warnings
+warnings.filterwarnings('ignore')
+
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.append(WARIS_ROOT)
+
+from waris.cache import cached
+from waris.cube import aggregate, load_cube, slice_cube
+from waris.data import load_dataset
+from waris.memprofile import track_objects
+from waris.simulate import run_scenarios
+from waris.timing import debug_overlay, section, start_run, timed
+from waris.tenants import select_tenant
+
+start_run('Scenario Simulator')
+
+# Page configuration
+st.set_page_config(
+    page_title="WARIS Scenario Simulator",
+    page_icon="🎲",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
+# Custom CSS
+st.markdown("""
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        font-weight: 700;
+        color: #1f2937;
+        text-align: center;
+        margin-bottom: 2rem;
+        background: linear-gradient(90deg, #3b82f6, #1d4ed8);
+        -webkit-background-clip: text;
+        -webkit-text-fill-color: transparent;
+        background-clip: text;
+    }
+
+    .section-header {
+        font-size: 1.8rem;
+        font-weight: 600;
+        color: #374151;
+        margin: 2rem 0 1rem 0;
+        padding-bottom: 0.5rem;
+        border-bottom: 3px solid #3b82f6;
+    }
+
+    .chart-container {
+        background: white;
+        padding: 1rem;
+        border-radius: 15px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        margin-bottom: 2rem;
+    }
+
+    .metric-card {
+        background: white;
+        padding: 1.5rem;
+        border-radius: 15px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        border-left: 5px solid #3b82f6;
+        margin-bottom: 1rem;
+    }
+
+    .metric-value {
+        font-size: 2rem;
+        font-weight: 700;
+        color: #1f2937;
+        margin: 0.5rem 0;
+    }
+
+    .metric-label {
+        color: #6b7280;
+        font-size: 0.9rem;
+        margin: 0;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# Cached chart builders - keyed on the small summary frames
+@timed('build net revenue histogram')
+@cached('scenario figures')
+def build_net_revenue_histogram(histogram, baseline_net):
+    """Build the distribution of simulated portfolio net revenue"""
+    fig = px.bar(
+        histogram,
+        x='Net Revenue',
+        y='Scenarios',
+        title='Simulated Net Revenue over the Horizon'
+    )
+    fig.add_vline(x=baseline_net, line_dash='dash', line_color='#ef4444',
+                  annotation_text='Historical average')
+    fig.add_vline(x=0, line_color='#1f2937')
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Net Revenue ($)",
+        yaxis_title="Scenarios",
+        bargap=0
+    )
+    return fig
+
+@timed('build zone range chart')
+@cached('scenario figures')
+def build_zone_range_chart(zone_summary):
+    """Build the per-zone median net revenue bar chart with P5-P95 ranges"""
+    fig = px.bar(
+        zone_summary,
+        x='Zone',
+        y='P50',
+        error_y=zone_summary['P95'] - zone_summary['P50'],
+        error_y_minus=zone_summary['P50'] - zone_summary['P5'],
+        color='Deficit Probability',
+        color_continuous_scale='RdYlGn_r',
+        title='Net Revenue by Zone (median, 5th-95th percentile)'
+    )
+    fig.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        xaxis_title="Zone",
+        yaxis_title="Net Revenue ($)"
+    )
+    return fig
+
+# Load data
+with section('load data'):
+    dataset = load_dataset()
+
+if dataset.frame.empty:
+    st.error("No data available. Please check the data file path.")
+    st.stop()
+
+# Main content
+st.markdown('<h1 class="main-header">🎲 Revenue Scenario Simulator</h1>', unsafe_allow_html=True)
+
+# Sidebar controls
+with st.sidebar:
+    st.markdown("## 🎛️ Scenario Controls")
+
+    st.markdown("### 🏢 Zones")
+    all_zones = sorted(dataset.frame['Zone'].unique())
+    selected_zones = st.multiselect(
+        "Zones to Simulate",
+        options=all_zones,
+        default=all_zones
+    )
+
+    st.markdown("### 📉 Stress Parameters")
+    billing_change = st.slider("Billing Change (%)", -50, 50, 0, step=5)
+    efficiency_change = st.slider("Collection Efficiency Change (points)", -30, 30, 0)
+    cost_change = st.slider("Cost Change (%)", -50, 50, 0, step=5)
+    volatility = st.slider("Volatility (x historical)", 0.0, 3.0, 1.0, step=0.25)
+
+    st.markdown("### 🎲 Simulation")
+    scenarios = st.select_slider(
+        "Scenarios",
+        options=[1_000, 10_000, 50_000, 100_000],
+        value=10_000,
+        format_func=lambda n: f"{n:,}"
+    )
+    months = st.slider("Horizon (months)", 1, 36, 12)
+    seed = st.number_input("Random Seed", min_value=0, value=42, step=1)
+
+if not selected_zones:
+    st.warning("Select at least one zone to simulate.")
+    st.stop()
+
+# Historical zone metrics (as on the Home page) define each zone's sampling pool
+with section('zone metrics'):
+    cube_df = slice_cube(load_cube(), zones=selected_zones)
+    zone_metrics = aggregate(cube_df, 'Zone').set_index('Zone')
+
+with st.spinner(f"Simulating {scenarios:,} scenarios..."), section('simulate'):
+    results = run_scenarios(
+        dataset.version, tuple(sorted(selected_zones)), scenarios, months,
+        billing_change / 100, float(efficiency_change), cost_change / 100, volatility, int(seed),
+        cube_df
+    )
+
+portfolio = results['portfolio'].set_index('Measure')
+baseline = results['baseline']
+
+# Headline metrics
+st.markdown('<div class="section-header">🎯 Scenario Outcome</div>', unsafe_allow_html=True)
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Median Net Revenue</div>
+        <div class="metric-value">${portfolio.loc['Net Revenue', 'P50']:,.0f}</div>
+        <div class="metric-label">Historical: ${baseline['Net Revenue']:,.0f}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with col2:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Downside (5th Percentile)</div>
+        <div class="metric-value">${portfolio.loc['Net Revenue', 'P5']:,.0f}</div>
+        <div class="metric-label">1 in 20 scenarios is worse</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with col3:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Deficit Probability</div>
+        <div class="metric-value">{portfolio.loc['Net Revenue', 'Probability Below Zero']:.1f}%</div>
+        <div class="metric-label">Expenditure exceeds revenue</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with col4:
+    st.markdown(f"""
+    <div class="metric-card">
+        <div class="metric-label">Median Collection</div>
+        <div class="metric-value">${portfolio.loc['Collection', 'P50']:,.0f}</div>
+        <div class="metric-label">Over {months} months</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+# Distribution
+st.markdown('<div class="section-header">📊 Net Revenue Distribution</div>', unsafe_allow_html=True)
+
+col1, col2 = st.columns([3, 2])
+
+with col1:
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    st.plotly_chart(
+        build_net_revenue_histogram(results['histogram'], baseline['Net Revenue']),
+        use_container_width=True
+    )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+with col2:
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    st.subheader("Portfolio Percentiles")
+    st.dataframe(
+        portfolio.style.format({
+            'P5': '${:,.0f}', 'P25': '${:,.0f}', 'P50': '${:,.0f}', 'P75': '${:,.0f}',
+            'P95': '${:,.0f}', 'Mean': '${:,.0f}', 'Probability Below Zero': '{:.1f}%'
+        }),
+        use_container_width=True
+    )
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# Zone breakdown
+st.markdown('<div class="section-header">🏢 Zone Breakdown</div>', unsafe_allow_html=True)
+
+zone_summary = results['zones']
+st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+st.plotly_chart(build_zone_range_chart(zone_summary), use_container_width=True)
+st.markdown('</div>', unsafe_allow_html=True)
+
+zone_table = zone_summary.set_index('Zone').join(
+    zone_metrics[['Total Operating Revenues', 'Total Operating Expenditures', 'Collection Efficiency']]
+)
+st.dataframe(
+    zone_table.style.format({
+        'P5': '${:,.0f}', 'P25': '${:,.0f}', 'P50': '${:,.0f}', 'P75': '${:,.0f}',
+        'P95': '${:,.0f}', 'Mean': '${:,.0f}', 'Deficit Probability': '{:.1f}%',
+        'Total Operating Revenues': '${:,.0f}', 'Total Operating Expenditures': '${:,.0f}',
+        'Collection Efficiency': '{:.1f}%'
+    }),
+    use_container_width=True
+)
+
+# Footer
+st.markdown("---")
+st.markdown(
+    """
+    <div style='text-align: center; color: #6b7280; padding: 2rem;'>
+        <p>🎲 WARIS Scenario Simulator | Monte Carlo Stress Testing</p>
+        <p>Scenarios resample each zone's own monthly history; the same seed and parameters always give the same result</p>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+
+# Per-session memory of this page's frames (Admin page, when profiling is on)
+track_objects(globals())
+
+# Per-section timings (shown with ?debug=timing)
+debug_overlay()
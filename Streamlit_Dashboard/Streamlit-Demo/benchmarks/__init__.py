@@ -0,0 +1,187 @@
+"""
+Offline performance benchmarks for the WARIS dashboard
+
+Every suite runs against synthetic WARIS data (waris.synthetic) at one or
+more sizes, written once to a dataset directory and reused, and writes
+machine-readable JSON. Passing a stored result as the baseline compares the
+two runs and flags regressions.
+
+    python -m benchmarks.components --sizes 10x5 100x10 --out results.json
+    python -m benchmarks.components --sizes 10x5 100x10 --baseline results.json
+
+Sizes are ZONESxYEARS.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.insert(0, WARIS_ROOT)
+
+DATASET_DIR = os.environ.get('WARIS_BENCH_DATA', os.path.join('/tmp', 'waris-bench'))
+DEFAULT_SIZES = ['10x5', '100x10']
+SEED = 0
+
+# A result must be this much slower (relative, and absolute in seconds) to count as a regression
+THRESHOLD = 0.10
+NOISE_FLOOR = 0.001
+
+
+def parse_size(size):
+    """'ZONESxYEARS' -> (zones, years)"""
+    zones, years = size.lower().split('x')
+    return int(zones), int(years)
+
+
+def dataset(size, fmt='csv'):
+    """Path of the synthetic dataset for a size, generating it on first use"""
+    from waris import synthetic
+
+    zones, years = parse_size(size)
+    path = os.path.join(DATASET_DIR, f'waris-{zones}z-{years}y-s{SEED}.{fmt}')
+    if not os.path.exists(path):
+        synthetic.write(path, zones, years, seed=SEED)
+    return path
+
+
+def measure(func, repeat=5, warmup=1):
+    """Wall-clock seconds of func() over repeat runs, after warmup unrecorded runs"""
+    for _ in range(warmup):
+        func()
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def summarize(runs):
+    """Summary statistics of a list of run times"""
+    runs = np.asarray(runs, dtype=float)
+    return {
+        'runs': len(runs),
+        'median_s': float(np.median(runs)),
+        'min_s': float(runs.min()),
+        'mean_s': float(runs.mean()),
+        'p95_s': float(np.percentile(runs, 95)),
+    }
+
+
+def environment():
+    """Versions and host details stored with every result file"""
+    import pandas as pd
+    import plotly
+    import streamlit
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=WARIS_ROOT, timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+def write_results(path, suite, results, **extra):
+    """Write a suite's results (a list of dicts with name, size and timings) as JSON
+
+    Extra keyword arguments are stored as further top-level keys.
+    """
+    document = {'suite': suite, 'environment': environment(), 'results': results, **extra}
+    if path in (None, '-'):
+        json.dump(document, sys.stdout, indent=2)
+        print()
+        return
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+def compare(results, baseline_path, metric='median_s', threshold=THRESHOLD, noise_floor=NOISE_FLOOR):
+    """Compare results with a stored run; returns (rows, regressions)
+
+    A benchmark regresses when its metric grew by more than threshold
+    (relative) and noise_floor (absolute seconds). Benchmarks missing from
+    either side (for the sizes that were run) are reported but never count
+    as regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['size']): r for r in json.load(f)['results']}
+
+    rows = []
+    regressions = []
+    for result in results:
+        key = (result['name'], result['size'])
+        before = baseline.pop(key, None)
+        if before is None or metric not in before:
+            rows.append((*key, None, result.get(metric), None, 'new'))
+            continue
+        old, new = before[metric], result[metric]
+        change = (new - old) / old if old else 0.0
+        if change > threshold and new - old > noise_floor:
+            status = 'REGRESSION'
+            regressions.append(key)
+        elif change < -threshold and old - new > noise_floor:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((*key, old, new, change, status))
+    sizes = {result['size'] for result in results}
+    rows.extend(
+        (*key, before.get(metric), None, None, 'missing')
+        for key, before in baseline.items() if key[1] in sizes
+    )
+    return rows, regressions
+
+
+def print_comparison(rows, metric='median_s'):
+    """Human-readable comparison table on stderr"""
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else '-'
+
+    print(f"{'benchmark':<40} {'size':>10} {'baseline':>10} {'current':>10} {'change':>8}  status", file=sys.stderr)
+    for name, size, old, new, change, status in rows:
+        print(f"{name:<40} {size:>10} {fmt(old, '.4f'):>10} {fmt(new, '.4f'):>10} "
+              f"{fmt(change, '+.1%'):>8}  {status}", file=sys.stderr)
+
+
+def add_common_arguments(parser):
+    """Arguments shared by every suite's command line"""
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="dataset sizes as ZONESxYEARS")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--out', default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument('--baseline', default=None, help="compare with a stored JSON result")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+
+
+def finish(args, suite, results, metric='median_s', **extra):
+    """Write results and, with --baseline, compare; returns the process exit code"""
+    write_results(args.out, suite, results, **extra)
+    if not args.baseline:
+        return 0
+    rows, regressions = compare(results, args.baseline, metric, args.threshold)
+    print_comparison(rows, metric)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,102 @@
+"""
+Backend benchmarks: the pandas path against the embedded DuckDB backend
+
+Times the work each backend does for a page view, uncached: the filtered
+rows, building the cube, zone metrics, the Monthly/Quarterly/Yearly
+roll-ups, the correlation inputs and a Data Explorer slice. The pandas path
+runs on the frame (and cube) already in memory, as the served dataset does;
+the DuckDB path runs its SQL over the file each time (waris.sqlbackend),
+so its timings include reading the data.
+
+    python -m benchmarks.backends --sizes 10x5 100x10 1000x20 --format parquet --out backends.json
+    python -m benchmarks.backends --sizes 10x5 100x10 --baseline backends.json
+
+Needs duckdb (``pip install duckdb``).
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from benchmarks import add_common_arguments, dataset, finish, measure, summarize
+from waris import sqlbackend
+from waris.cube import build_cube, period_rollup, slice_cube
+from waris.data import read_waris
+from waris.filters import filter_frame
+from waris.kpis import zone_metrics
+
+LEVELS = ['Monthly', 'Quarterly', 'Yearly']
+
+
+def pandas_cases(df, cube, filters):
+    date_range, zones, years, months = filters
+    sliced = lambda: slice_cube(cube, date_range, zones, years)  # noqa: E731
+    cases = [
+        ('rows', lambda: filter_frame(df, date_range, zones, years)),
+        ('build_cube', lambda: build_cube(df)),
+        ('zone_metrics', lambda: zone_metrics(sliced())),
+        ('correlation_inputs', lambda: filter_frame(df, date_range, zones, years).select_dtypes(include=[np.number])),
+        ('explorer_slice', lambda: filter_frame(df, date_range, zones, years, months)),
+    ]
+    for level in LEVELS:
+        cases.append((f'rollup/{level.lower()}', lambda level=level: period_rollup(sliced(), level)))
+    return cases
+
+
+def sql_cases(path, filters):
+    date_range, zones, years, months = filters
+    cases = [
+        ('rows', lambda: sqlbackend.rows(path, date_range, zones, years)),
+        ('build_cube', lambda: sqlbackend.cube(path)),
+        ('zone_metrics', lambda: sqlbackend.zone_metrics(path, date_range, zones, years)),
+        ('correlation_inputs', lambda: sqlbackend.rows(path, date_range, zones, years).select_dtypes(
+            include=[np.number])),
+        ('explorer_slice', lambda: sqlbackend.rows(path, date_range, zones, years, months)),
+    ]
+    for level in LEVELS:
+        cases.append((f'rollup/{level.lower()}', lambda level=level: sqlbackend.period_rollup(
+            path, level, True, date_range, zones, years)))
+    return cases
+
+
+def run_size(size, fmt, repeat):
+    """Benchmark both backends on one dataset size; returns result dicts"""
+    path = dataset(size, fmt)
+    df = read_waris(path)
+    cube = build_cube(df)
+
+    zones = sorted(df['Zone'].unique())
+    years = sorted(df['Year'].unique())
+    # The Home view of benchmarks.components, plus a quarter of months for the explorer slice
+    filters = (
+        (df['Date'].min().date(), df['Date'].max().date()),
+        zones[:max(1, len(zones) // 2)],
+        years[-2:],
+        ['January', 'February', 'March'],
+    )
+
+    results = []
+    for backend, cases in [('pandas', pandas_cases(df, cube, filters)), ('duckdb', sql_cases(path, filters))]:
+        for name, func in cases:
+            runs = measure(func, repeat=repeat)
+            results.append(dict(name=f'{backend}/{name}', size=size, rows=len(df), **summarize(runs)))
+            print(f"{size:>10} {backend + '/' + name:<40} {results[-1]['median_s'] * 1000:10.2f} ms",
+                  file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the pandas and DuckDB backends on WARIS queries")
+    add_common_arguments(parser)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="dataset file format")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.format, args.repeat))
+    return finish(args, 'backends', results, format=args.format)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
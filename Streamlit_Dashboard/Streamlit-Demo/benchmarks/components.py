@@ -0,0 +1,144 @@
+"""
+Component benchmarks: load, filter, aggregate and chart-build paths
+
+Times each stage the pages run on a rerun, in isolation and uncached:
+parsing the CSV (whole or streamed into the cube), the shared filter engine, the KPI and zone metrics math,
+building the cube and its Monthly/Quarterly/Yearly roll-ups, the
+correlation matrices and every page's Plotly figure builders.
+
+The figure builders are taken from the page scripts themselves (their
+``build_*`` functions, without the caching decorators), so the benchmark
+follows the pages as they change.
+
+    python -m benchmarks.components --sizes 10x5 100x10 1000x20 --out components.json
+    python -m benchmarks.components --sizes 10x5 100x10 --baseline components.json
+"""
+
+import argparse
+import ast
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import WARIS_ROOT, add_common_arguments, dataset, finish, measure, summarize
+from waris.analytics import correlation_matrix, zone_correlation
+from waris.cube import aggregate, build_cube, period_rollup, slice_cube
+from waris.data import read_waris
+from waris.filters import filter_frame
+from waris.kpis import kpi_summary, kpi_summary_from_cube, zone_metrics
+from waris.outofcore import stream_cube
+
+MULTI_PAGE_DIR = os.path.join(WARIS_ROOT, 'Multi_page')
+PAGES = {
+    'home': 'Home.py',
+    'analytics': os.path.join('pages', '1.Analytics.py'),
+    'trends': os.path.join('pages', '2.trends.py'),
+    'data': os.path.join('pages', '3.data.py'),
+}
+
+
+def page_builders(page):
+    """The page's build_* functions, compiled without their decorators"""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    with open(os.path.join(MULTI_PAGE_DIR, PAGES[page])) as f:
+        tree = ast.parse(f.read())
+    functions = [
+        node for node in tree.body
+        if isinstance(node, ast.FunctionDef) and node.name.startswith('build_')
+    ]
+    for node in functions:
+        node.decorator_list = []
+    namespace = {'px': px, 'go': go, 'make_subplots': make_subplots, 'pd': pd, 'np': np}
+    exec(compile(ast.Module(body=functions, type_ignores=[]), PAGES[page], 'exec'), namespace)
+    return {node.name: namespace[node.name] for node in functions}
+
+
+def figure_cases(cube):
+    """(page, builder, args) for every figure builder, with the inputs its page passes"""
+    monthly = period_rollup(cube, 'Monthly')
+    growth = monthly[['Date', 'Zone', 'Total Operating Revenues']].copy()
+    growth['Growth_Rate'] = growth.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
+    by_zone = aggregate(cube, 'Zone')
+    return [
+        ('home', 'build_revenue_chart', (
+            monthly[['Date', 'Zone', 'Total Operating Revenues', 'Total Operating Expenditures']], 'Line Chart')),
+        ('home', 'build_zone_scatter', (by_zone[['Zone', 'Total Operating Revenues', 'Collection Efficiency']],)),
+        ('analytics', 'build_revenue_by_year_chart', (
+            aggregate(cube, ['Zone', 'Year'])[['Zone', 'Year', 'Total Operating Revenues']],)),
+        ('analytics', 'build_revenue_pie', (by_zone[['Zone', 'Total Operating Revenues']],)),
+        ('analytics', 'build_coverage_chart', (by_zone[['Zone', 'Operation & Maintenance Cost Coverage']],)),
+        ('trends', 'build_revenue_trend_chart', (
+            monthly[['Date', 'Zone', 'Total Operating Revenues']], 'Date', 'Monthly')),
+        ('trends', 'build_growth_chart', (growth.dropna(), 'Date', 'Monthly')),
+        ('data', 'build_revenue_by_zone_chart', (by_zone[['Zone', 'Total Operating Revenues']],)),
+        ('data', 'build_efficiency_by_zone_chart', (by_zone[['Zone', 'Collection Efficiency']],)),
+        ('data', 'build_revenue_trend_chart', (
+            aggregate(cube, ['Date', 'Zone'])[['Date', 'Zone', 'Total Operating Revenues']],)),
+    ]
+
+
+def run_size(size, repeat):
+    """Benchmark every component on one dataset size; returns result dicts"""
+    path = dataset(size)
+    df = read_waris(path)
+    cube = build_cube(df)
+
+    zones = sorted(df['Zone'].unique())
+    years = sorted(df['Year'].unique())
+    # A typical Home view: the last two years of half the zones
+    date_range = (df['Date'].min().date(), df['Date'].max().date())
+    selected_zones = zones[:max(1, len(zones) // 2)]
+    selected_years = years[-2:]
+    metrics = ['Total Operating Revenues', 'Total Operating Expenditures', 'Collection Efficiency']
+    numeric = df.select_dtypes(include=[np.number])
+
+    cases = [
+        ('load/read_waris', lambda: read_waris(path)),
+        ('load/stream_cube', lambda: stream_cube(path)),
+        ('filter/rows', lambda: filter_frame(df, date_range, selected_zones, selected_years)),
+        ('filter/slice_cube', lambda: slice_cube(cube, date_range, selected_zones, selected_years)),
+        ('aggregate/kpis', lambda: kpi_summary(df)),
+        ('aggregate/kpis_from_cube', lambda: kpi_summary_from_cube(cube)),
+        ('aggregate/zone_metrics', lambda: zone_metrics(cube)),
+        ('aggregate/build_cube', lambda: build_cube(df)),
+        ('aggregate/zone_totals', lambda: aggregate(cube, 'Zone')),
+        ('correlation/matrix', lambda: correlation_matrix(numeric)),
+        ('correlation/by_zone', lambda: zone_correlation(df[metrics + ['Zone']], metrics)),
+    ]
+    for level in ['Monthly', 'Quarterly', 'Yearly']:
+        cases.append((f'rollup/{level.lower()}', lambda level=level: period_rollup(cube, level)))
+
+    builders = {page: page_builders(page) for page in PAGES}
+    for page, name, args in figure_cases(cube):
+        build = builders[page].get(name)
+        if build is None:
+            print(f"skipping {page}/{name}: not defined in {PAGES[page]}", file=sys.stderr)
+            continue
+        cases.append((f'figure/{page}/{name[len("build_"):]}', lambda build=build, args=args: build(*args)))
+
+    results = []
+    for name, func in cases:
+        runs = measure(func, repeat=repeat)
+        results.append(dict(name=name, size=size, rows=len(df), **summarize(runs)))
+        print(f"{size:>10} {name:<40} {results[-1]['median_s'] * 1000:10.2f} ms", file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark WARIS load, filter, aggregate and chart-build paths")
+    add_common_arguments(parser)
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.repeat))
+    return finish(args, 'components', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Concurrent-session load test of the multi-page dashboard
+
+Simulates N users at once. Sessions are spread over --workers processes
+(each one stands in for a Streamlit server process, with its own caches)
+and run as threads inside them, each driving the app through
+streamlit.testing.v1.AppTest. A session repeatedly opens Home.py or one of
+the pages and plays a random selection of that page's interactions (the
+steps of benchmarks.reruns), with optional think time between actions,
+until the test duration is up.
+
+AppTest installs a process-wide runtime for the length of each run, so the
+sessions of one worker take turns to rerun; an action's latency includes
+the time it queued behind the worker's other sessions, much as reruns
+queue for the GIL in a busy server process. Use more workers to load more
+cores.
+
+Reported: throughput (actions per second), latency percentiles per action
+and overall, errors, and each worker's CPU time, CPU utilisation and peak
+RSS. Everything runs offline against a synthetic dataset.
+
+    python -m benchmarks.loadtest --sessions 8 --workers 2 --duration 60 --size 100x10
+    python -m benchmarks.loadtest --sessions 8 --workers 2 --out load.json
+    python -m benchmarks.loadtest --sessions 8 --workers 2 --baseline load.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from benchmarks import WARIS_ROOT, dataset, finish, THRESHOLD
+from benchmarks.reruns import SCRIPTS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Pages a session visits, and how often relative to each other (operators, not visitors, open the admin page)
+PAGE_WEIGHTS = {
+    'home': 4,
+    'analytics': 2,
+    'trends': 2,
+    'data explorer': 1,
+    'scenarios': 1,
+}
+STEP_PROBABILITY = 0.5
+PERCENTILES = [50, 90, 95, 99]
+
+
+def session_plan(rng):
+    """A page visit: (script, [(step, interaction)]) with a random subset of its interactions"""
+    script = rng.choices(list(PAGE_WEIGHTS), weights=list(PAGE_WEIGHTS.values()))[0]
+    first, *rest = SCRIPTS[script][1]
+    return script, [first] + [step for step in rest if rng.random() < STEP_PROBABILITY]
+
+
+def run_session(session, seed, deadline, think, samples, lock, run_lock):
+    """Visit pages until the deadline, appending (session, action, start, seconds, ok) to samples"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        script, steps = session_plan(rng)
+        at = AppTest.from_file(os.path.join(WARIS_ROOT, SCRIPTS[script][0]), default_timeout=600)
+        for step, interaction in steps:
+            if time.perf_counter() >= deadline:
+                break
+            started = time.perf_counter()
+            try:
+                if interaction is not None:
+                    interaction(at)
+                with run_lock:
+                    at.run()
+                ok = not at.exception
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append((session, f'{script}/{step}', started, elapsed, ok))
+            if not ok:
+                break
+            if think:
+                time.sleep(rng.expovariate(1 / think))
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+def run_worker(worker, sessions, duration, think, seed, warmup):
+    """Run this worker's sessions as threads; returns its samples and resource use"""
+    logging.disable(logging.CRITICAL)
+    if warmup:
+        # Like a server after waris.warmup: the first visitor doesn't pay for the load
+        from streamlit.testing.v1 import AppTest
+        AppTest.from_file(os.path.join(WARIS_ROOT, SCRIPTS['home'][0]), default_timeout=600).run()
+
+    samples = []
+    lock = threading.Lock()
+    run_lock = threading.Lock()
+    cpu_started = cpu_seconds()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=run_session, args=(session, seed * 1000 + session, deadline, think, samples, lock, run_lock),
+                         daemon=True)
+        for session in sessions
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_started
+    return {
+        'worker': worker,
+        'sessions': len(sessions),
+        'actions': len(samples),
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'cpu_utilisation': cpu / wall if wall else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'samples': [(session, action, start - started, elapsed, ok) for session, action, start, elapsed, ok in samples],
+    }
+
+
+def latency_summary(name, size, samples, wall):
+    """Count, throughput, error count and latency percentiles of a group of samples"""
+    latencies = np.array([elapsed for _, _, _, elapsed, ok in samples if ok], dtype=float)
+    summary = {
+        'name': name,
+        'size': size,
+        'actions': len(samples),
+        'errors': sum(not ok for *_, ok in samples),
+        'throughput_per_s': len(samples) / wall if wall else 0.0,
+    }
+    if len(latencies):
+        for p in PERCENTILES:
+            summary[f'p{p}_s'] = float(np.percentile(latencies, p))
+        summary['mean_s'] = float(latencies.mean())
+        summary['max_s'] = float(latencies.max())
+    return summary
+
+
+def report(results, workers):
+    """Human-readable summary on stderr"""
+    print(f"{'action':<36} {'count':>6} {'err':>4} {'per s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+          file=sys.stderr)
+    for r in results:
+        def ms(key):
+            return f"{r[key] * 1000:9.1f}" if key in r else f"{'-':>9}"
+        print(f"{r['name']:<36} {r['actions']:>6} {r['errors']:>4} {r['throughput_per_s']:>7.2f} "
+              f"{ms('p50_s')} {ms('p95_s')} {ms('p99_s')}", file=sys.stderr)
+    print(file=sys.stderr)
+    for w in workers:
+        rss = f"{w['peak_rss_mb']:.0f} MB" if w['peak_rss_mb'] is not None else '-'
+        print(f"worker {w['worker']}: {w['sessions']} sessions, {w['actions']} actions, "
+              f"CPU {w['cpu_s']:.1f}s ({w['cpu_utilisation']:.0%}), peak RSS {rss}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the WARIS dashboard with concurrent simulated sessions")
+    parser.add_argument('--sessions', type=int, default=4, help="concurrent sessions in total (default 4)")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes the sessions are spread over")
+    parser.add_argument('--duration', type=float, default=30, help="test length in seconds (default 30)")
+    parser.add_argument('--think', type=float, default=0.0, help="mean think time between actions in seconds")
+    parser.add_argument('--size', default='100x10', help="dataset size as ZONESxYEARS (default 100x10)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the sessions' interaction scripts")
+    parser.add_argument('--no-warmup', dest='warmup', action='store_false',
+                        help="start the sessions against cold worker processes")
+    parser.add_argument('--out', default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument('--baseline', default=None, help="compare p95 latencies with a stored JSON result")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+    parser.add_argument('--worker', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--worker-sessions', type=int, nargs='*', default=[], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        json.dump(run_worker(args.worker, args.worker_sessions, args.duration, args.think, args.seed, args.warmup),
+                  sys.stdout)
+        return 0
+
+    workers = max(1, min(args.workers, args.sessions))
+    env = dict(os.environ, WARIS_DATA_PATH=dataset(args.size),
+               PYTHONPATH=os.pathsep.join(filter(None, [WARIS_ROOT, os.environ.get('PYTHONPATH')])))
+    processes = []
+    for worker in range(workers):
+        command = [sys.executable, '-m', 'benchmarks.loadtest', '--worker', str(worker),
+                   '--duration', str(args.duration), '--think', str(args.think), '--seed', str(args.seed),
+                   '--worker-sessions', *map(str, range(worker, args.sessions, workers))]
+        if not args.warmup:
+            command.append('--no-warmup')
+        processes.append(subprocess.Popen(command, cwd=WARIS_ROOT, env=env, stdout=subprocess.PIPE))
+    outputs = []
+    for process in processes:
+        stdout, _ = process.communicate()
+        if process.returncode:
+            parser.exit(process.returncode, f"worker exited with status {process.returncode}\n")
+        outputs.append(json.loads(stdout))
+
+    samples = [tuple(sample) for output in outputs for sample in output.pop('samples')]
+    wall = max(output['wall_s'] for output in outputs)
+
+    results = [latency_summary('all', args.size, samples, wall)]
+    for action in sorted({sample[1] for sample in samples}):
+        results.append(latency_summary(action, args.size, [s for s in samples if s[1] == action], wall))
+    report(results, outputs)
+
+    config = {'sessions': args.sessions, 'workers': workers, 'duration_s': args.duration,
+              'think_s': args.think, 'seed': args.seed, 'warmup': args.warmup}
+    return finish(args, 'loadtest', results, metric='p95_s', config=config, workers=outputs)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
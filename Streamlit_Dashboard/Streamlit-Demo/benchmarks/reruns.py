@@ -0,0 +1,172 @@
+"""
+End-to-end rerun benchmarks driven through streamlit.testing.v1.AppTest
+
+Runs Home.py, every page, main_dashboard.py and website_dashboard.py
+headless and scripts the interactions users make (switch page, change the
+aggregation, pick a zone, open the data explorer, rerun a scenario). Each step's full script
+rerun is timed; a separate traced pass records its peak Python memory
+(tracemalloc), so tracing does not inflate the timings.
+
+Each dataset size runs in its own worker process with WARIS_DATA_PATH set,
+so process-wide caches never leak between sizes. The first pass through a
+script is recorded as the cold start; the timed passes that follow start
+new sessions against the warm process caches, as a second user would.
+
+    python -m benchmarks.reruns --sizes 10x5 100x10 --out reruns.json
+    python -m benchmarks.reruns --sizes 10x5 100x10 --baseline reruns.json
+    python -m benchmarks.reruns --scripts home website --sizes 10x5
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks import WARIS_ROOT, add_common_arguments, dataset, finish, parse_size, summarize
+
+
+def _zone(at):
+    """First real zone offered by the script's zone multiselect"""
+    return next(option for option in at.multiselect[0].options if option != 'All')
+
+
+# script name -> (path under Streamlit-Demo, [(step, interaction applied before the rerun)])
+SCRIPTS = {
+    'home': (os.path.join('Multi_page', 'Home.py'), [
+        ('initial load', None),
+        ('change aggregation', lambda at: at.selectbox(key='aggregation').select('Quarterly')),
+        ('pick zone', lambda at: at.selectbox(key='zone_drill_down').select_index(1)),
+        ('switch page', lambda at: at.button(key='nav_analytics').click()),
+        ('open data explorer', lambda at: at.button(key='nav_data').click()),
+    ]),
+    'analytics': (os.path.join('Multi_page', 'pages', '1.Analytics.py'), [
+        ('initial load', None),
+        ('pick zone', lambda at: at.multiselect[0].set_value([at.multiselect[0].options[-1]])),
+    ]),
+    'trends': (os.path.join('Multi_page', 'pages', '2.trends.py'), [
+        ('initial load', None),
+        ('change aggregation', lambda at: at.selectbox[1].select('Quarterly')),
+        ('all trends', lambda at: at.selectbox[0].select('All Trends')),
+    ]),
+    'data explorer': (os.path.join('Multi_page', 'pages', '3.data.py'), [
+        ('initial load', None),
+        ('export json', lambda at: at.selectbox[0].select('JSON')),
+    ]),
+    'admin': (os.path.join('Multi_page', 'pages', '4.admin.py'), [
+        ('initial load', None),
+        ('refresh statistics', lambda at: at.button[1].click()),
+    ]),
+    'scenarios': (os.path.join('Multi_page', 'pages', '5.scenarios.py'), [
+        ('initial load', None),
+        ('stress billing', lambda at: at.slider[0].set_value(-20)),
+        ('more scenarios', lambda at: at.select_slider[0].set_value(100_000)),
+        ('pick zone', lambda at: at.multiselect[0].set_value([at.multiselect[0].options[0]])),
+    ]),
+    'main': ('main_dashboard.py', [
+        ('initial load', None),
+        ('pick zone', lambda at: at.multiselect[0].set_value([_zone(at)])),
+    ]),
+    'website': ('website_dashboard.py', [
+        ('initial load', None),
+        ('switch page', lambda at: at.radio(key='navigation').set_value('Analytics')),
+        ('change aggregation', lambda at: (
+            at.radio(key='navigation').set_value('Trends').run().selectbox(key='agg_level').select('Quarterly'))),
+        ('open data explorer', lambda at: at.radio(key='navigation').set_value('Data Explorer')),
+    ]),
+}
+
+
+def run_steps(path, steps, traced=False):
+    """Play a script's steps in one new session; returns [(step, seconds, peak bytes, errors)]
+
+    With traced, the peak is measured above what the session already held
+    before the rerun (tracemalloc must be running).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(WARIS_ROOT, path), default_timeout=600)
+    measurements = []
+    for step, interaction in steps:
+        if interaction is not None:
+            interaction(at)
+        if traced:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline if traced else None
+        errors = [str(e.value) for e in at.exception]
+        measurements.append((step, elapsed, peak, errors))
+    return measurements
+
+
+def run_worker(size, scripts, repeat):
+    """Benchmark the scripts on one dataset size (in a worker process); returns result dicts"""
+    # Script exceptions are recorded with the results instead of logged
+    logging.disable(logging.CRITICAL)
+    zones, years = parse_size(size)
+    results = []
+    for script in scripts:
+        path, steps = SCRIPTS[script]
+        cold = run_steps(path, steps)
+        timings = {step: [] for step, _ in steps}
+        failures = {step: errors for step, _, _, errors in cold if errors}
+        for _ in range(repeat):
+            for step, elapsed, _, errors in run_steps(path, steps):
+                timings[step].append(elapsed)
+                if errors:
+                    failures[step] = errors
+
+        tracemalloc.start()
+        try:
+            peaks = {step: peak for step, _, peak, _ in run_steps(path, steps, traced=True)}
+        finally:
+            tracemalloc.stop()
+
+        for step, _ in steps:
+            result = dict(name=f'{script}/{step}', size=size, rows=zones * years * 12, **summarize(timings[step]))
+            result['cold_s'] = next(elapsed for name, elapsed, _, _ in cold if name == step)
+            result['peak_mb'] = peaks[step] / 1024 / 1024
+            if step in failures:
+                result['errors'] = failures[step]
+            results.append(result)
+            print(f"{size:>10} {result['name']:<36} {result['median_s'] * 1000:9.1f} ms "
+                  f"(cold {result['cold_s'] * 1000:9.1f} ms) peak {result['peak_mb']:8.1f} MB"
+                  + ("  ERROR" if step in failures else ''), file=sys.stderr)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark full script reruns of the WARIS dashboards")
+    add_common_arguments(parser)
+    parser.add_argument('--scripts', nargs='+', choices=list(SCRIPTS), default=list(SCRIPTS),
+                        help="scripts to drive (default: all)")
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.repeat = max(args.repeat, 1)
+
+    if args.worker:
+        json.dump(run_worker(args.worker, args.scripts, args.repeat), sys.stdout)
+        return 0
+
+    results = []
+    for size in args.sizes:
+        # WARIS_ADMIN opens the admin page to the benchmark's sessions
+        env = dict(os.environ, WARIS_DATA_PATH=dataset(size), WARIS_ADMIN='1',
+                   PYTHONPATH=os.pathsep.join(filter(None, [WARIS_ROOT, os.environ.get('PYTHONPATH')])))
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.reruns', '--worker', size,
+             '--repeat', str(args.repeat), '--scripts', *args.scripts],
+            cwd=WARIS_ROOT, env=env, stdout=subprocess.PIPE, check=True,
+        )
+        results.extend(json.loads(completed.stdout))
+    return finish(args, 'reruns', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -8,6 +7,13 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from waris.cube import aggregate, load_cube, slice_cube
+from waris.data import load_data
+from waris.filters import load_filtered
+from waris.kpis import kpi_summary_from_cube, monthly_totals, zone_metrics as compute_zone_metrics
+from waris.reactive import session_graph
+from waris.tenants import select_tenant
+
 # Page configuration
 st.set_page_config(
     page_title="WARIS Water Management Dashboard",
@@ -16,6 +22,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
 # Custom CSS for modern styling
 st.markdown("""
 <style>
@@ -136,33 +145,58 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    """Load and preprocess the WARIS dataset"""
-    try:
-        df = pd.read_csv('../../Data/WARIS.csv')
-        df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-        df['Year'] = df['Date'].dt.year
-        df['Month_Name'] = df['Date'].dt.month_name()
-        
-        # Calculate additional metrics
-        df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
-        df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
-
-# Load data
+
+def build_monthly_trends(monthly_data):
+    """Two-row subplot of monthly revenue vs expenditure and collection efficiency"""
+    fig = make_subplots(
+        rows=2, cols=1,
+        subplot_titles=('Monthly Revenue vs Expenditure', 'Monthly Collection Efficiency'),
+        vertical_spacing=0.1
+    )
+
+    # Revenue and Expenditure
+    fig.add_trace(
+        go.Scatter(x=monthly_data['Date'], y=monthly_data['Total Operating Revenues'], 
+                   name='Revenue', line=dict(color='#10b981', width=3)),
+        row=1, col=1
+    )
+    fig.add_trace(
+        go.Scatter(x=monthly_data['Date'], y=monthly_data['Total Operating Expenditures'], 
+                   name='Expenditure', line=dict(color='#ef4444', width=3)),
+        row=1, col=1
+    )
+
+    # Collection Efficiency
+    fig.add_trace(
+        go.Scatter(x=monthly_data['Date'], y=monthly_data['Collection Efficiency'], 
+                   name='Collection Efficiency', line=dict(color='#3b82f6', width=3)),
+        row=2, col=1
+    )
+
+    fig.update_layout(
+        height=600,
+        title_text="Monthly Performance Trends",
+        title_font_size=20,
+        title_x=0.5,
+        showlegend=True
+    )
+
+    fig.update_xaxes(title_text="Date", row=2, col=1)
+    fig.update_yaxes(title_text="Amount ($)", row=1, col=1)
+    fig.update_yaxes(title_text="Efficiency (%)", row=2, col=1)
+    return fig
+
+
+# Load data (shared, read-only frame from the waris compute core)
 df = load_data()
 
 if df.empty:
     st.error("No data available. Please check the data file path.")
     st.stop()
 
+# Derived values are recomputed only when their inputs change (waris.reactive)
+graph = session_graph('Main')
+
 # Sidebar
 with st.sidebar:
     st.markdown("## 🎛️ Dashboard Controls")
@@ -198,19 +232,8 @@ with st.sidebar:
     )
     
     # Apply filters
-    filtered_df = df.copy()
-    
-    if len(date_range) == 2:
-        filtered_df = filtered_df[
-            (filtered_df['Date'].dt.date >= date_range[0]) & 
-            (filtered_df['Date'].dt.date <= date_range[1])
-        ]
-    
-    if 'All' not in selected_zones:
-        filtered_df = filtered_df[filtered_df['Zone'].isin(selected_zones)]
-    
-    if selected_years:
-        filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
+    filtered_df = graph.node('filtered_df', load_filtered, date_range, selected_zones, selected_years)
+    cube_df = graph.node('cube_df', slice_cube, load_cube(), date_range, selected_zones, selected_years)
 
 # Main content
 st.markdown('<h1 class="main-header">💧 WARIS Water Management Dashboard</h1>', unsafe_allow_html=True)
@@ -219,20 +242,9 @@ st.markdown('<h1 class="main-header">💧 WARIS Water Management Dashboard</h1>'
 st.markdown('<div class="section-header">📊 Key Performance Indicators</div>', unsafe_allow_html=True)
 
 # Calculate KPIs
-total_revenue = filtered_df['Total Operating Revenues'].sum()
-total_expenditure = filtered_df['Total Operating Expenditures'].sum()
-net_revenue = total_revenue - total_expenditure
-avg_efficiency = filtered_df['Collection Efficiency'].mean()
-total_billing = filtered_df['Total Billing'].sum()
-total_collection = filtered_df['Total Collection'].sum()
-collection_rate = (total_collection / total_billing * 100) if total_billing > 0 else 0
-
-# Previous period comparison (if data available)
-if len(filtered_df) > 1:
-    prev_period_revenue = filtered_df.groupby('Year')['Total Operating Revenues'].sum().iloc[-2] if len(filtered_df.groupby('Year')) > 1 else 0
-    revenue_growth = ((total_revenue - prev_period_revenue) / prev_period_revenue * 100) if prev_period_revenue > 0 else 0
-else:
-    revenue_growth = 0
+kpis = graph.node('kpis', kpi_summary_from_cube, cube_df)
+total_revenue, net_revenue, avg_efficiency = kpis.total_revenue, kpis.net_revenue, kpis.avg_efficiency
+collection_rate, revenue_growth = kpis.collection_rate, kpis.revenue_growth
 
 # KPI Cards
 col1, col2, col3, col4 = st.columns(4)
@@ -313,7 +325,7 @@ with col1:
 with col2:
     # Revenue by Zone Pie Chart
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-    zone_revenue = filtered_df.groupby('Zone')['Total Operating Revenues'].sum().reset_index()
+    zone_revenue = graph.node('zone_revenue', aggregate, cube_df, 'Zone')[['Zone', 'Total Operating Revenues']]
     fig = px.pie(
         zone_revenue, 
         values='Total Operating Revenues', 
@@ -330,17 +342,7 @@ with col2:
 st.markdown('<div class="section-header">🏢 Zone Performance Analysis</div>', unsafe_allow_html=True)
 
 # Zone comparison metrics
-zone_metrics = filtered_df.groupby('Zone').agg({
-    'Total Operating Revenues': 'sum',
-    'Total Operating Expenditures': 'sum',
-    'Collection Efficiency': 'mean',
-    'Operation & Maintenance Cost Coverage': 'mean',
-    'Total Collection': 'sum',
-    'Total Billing': 'sum'
-}).round(2)
-
-zone_metrics['Net Revenue'] = zone_metrics['Total Operating Revenues'] - zone_metrics['Total Operating Expenditures']
-zone_metrics['Collection Rate'] = (zone_metrics['Total Collection'] / zone_metrics['Total Billing'] * 100).round(2)
+zone_metrics = graph.node('zone_metrics', compute_zone_metrics, cube_df)
 
 # Display zone metrics table
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
@@ -367,7 +369,7 @@ with col1:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # Collection Efficiency by Zone
     fig = px.bar(
-        filtered_df.groupby('Zone')['Collection Efficiency'].mean().reset_index(),
+        zone_metrics['Collection Efficiency'].reset_index(),
         x='Zone',
         y='Collection Efficiency',
         title='Average Collection Efficiency by Zone',
@@ -387,7 +389,7 @@ with col2:
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     # Maintenance Cost Coverage
     fig = px.bar(
-        filtered_df.groupby('Zone')['Operation & Maintenance Cost Coverage'].mean().reset_index(),
+        zone_metrics['Operation & Maintenance Cost Coverage'].reset_index(),
         x='Zone',
         y='Operation & Maintenance Cost Coverage',
         title='Average O&M Cost Coverage by Zone',
@@ -407,52 +409,10 @@ with col2:
 st.markdown('<div class="section-header">📅 Monthly Trends Analysis</div>', unsafe_allow_html=True)
 
 # Monthly revenue and expenditure trends
-monthly_data = filtered_df.groupby(['Year', 'Month']).agg({
-    'Total Operating Revenues': 'sum',
-    'Total Operating Expenditures': 'sum',
-    'Collection Efficiency': 'mean'
-}).reset_index()
-
-monthly_data['Date'] = pd.to_datetime(monthly_data[['Year', 'Month']].assign(DAY=1))
-monthly_data['Net Revenue'] = monthly_data['Total Operating Revenues'] - monthly_data['Total Operating Expenditures']
+monthly_data = graph.node('monthly_data', monthly_totals, cube_df)
 
 # Create subplot for monthly trends
-fig = make_subplots(
-    rows=2, cols=1,
-    subplot_titles=('Monthly Revenue vs Expenditure', 'Monthly Collection Efficiency'),
-    vertical_spacing=0.1
-)
-
-# Revenue and Expenditure
-fig.add_trace(
-    go.Scatter(x=monthly_data['Date'], y=monthly_data['Total Operating Revenues'], 
-               name='Revenue', line=dict(color='#10b981', width=3)),
-    row=1, col=1
-)
-fig.add_trace(
-    go.Scatter(x=monthly_data['Date'], y=monthly_data['Total Operating Expenditures'], 
-               name='Expenditure', line=dict(color='#ef4444', width=3)),
-    row=1, col=1
-)
-
-# Collection Efficiency
-fig.add_trace(
-    go.Scatter(x=monthly_data['Date'], y=monthly_data['Collection Efficiency'], 
-               name='Collection Efficiency', line=dict(color='#3b82f6', width=3)),
-    row=2, col=1
-)
-
-fig.update_layout(
-    height=600,
-    title_text="Monthly Performance Trends",
-    title_font_size=20,
-    title_x=0.5,
-    showlegend=True
-)
-
-fig.update_xaxes(title_text="Date", row=2, col=1)
-fig.update_yaxes(title_text="Amount ($)", row=1, col=1)
-fig.update_yaxes(title_text="Efficiency (%)", row=2, col=1)
+fig = graph.node('monthly_trends', build_monthly_trends, monthly_data)
 
 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
 st.plotly_chart(fig, use_container_width=True)
@@ -6,17 +6,20 @@ from streamlit_option_menu import option_menu
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import statsmodels.api as sm
 
+from waris.analytics import ols_trendline
+from waris.cube import load_cube, period_rollup
+from waris.data import load_data, load_dataset
+from waris.executor import show_when_ready, submit
+from waris.forecast import (BATCH_METHOD, FORECAST_METHODS, FORECAST_METRICS, fit_models,
+                            forecast_frame, forecast_status, forecast_summary, zone_matrix)
+from waris.tenants import select_tenant
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    df = pd.read_csv('../../Data/WARIS.CSV')
-    df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-    df['Year'] = df['Date'].dt.year
-    return df
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
+# Load data (shared, read-only frame from the waris compute core)
 df = load_data()
 
 # Sidebar navigation
@@ -51,8 +54,19 @@ if selected == "Dashboard":
     # Revenue vs Expenditure Scatter Plot
     st.header("Revenue vs. Expenditure Over Time")
     fig = px.scatter(df, x='Total Operating Revenues', y='Total Operating Expenditures', color='Year', 
-                     trendline="ols", labels={"x": "Operating Revenues", "y": "Operating Expenditures"})
-    st.plotly_chart(fig, use_container_width=True)
+                     labels={"x": "Operating Revenues", "y": "Operating Expenditures"})
+    # OLS trendline is fitted in the process pool
+    trendline_task = submit(ols_trendline, df['Total Operating Revenues'], df['Total Operating Expenditures'])
+
+    def render_trendline(trendline):
+        line, params = trendline
+        chart = go.Figure(fig)
+        chart.add_trace(go.Scatter(x=line['x'], y=line['y'], mode='lines', name='OLS trendline',
+                                   hovertemplate=f"y = {params['slope']:.3f}x + {params['intercept']:,.0f}<br>"
+                                                 f"R² = {params['r_squared']:.3f}<extra></extra>"))
+        st.plotly_chart(chart, use_container_width=True)
+
+    show_when_ready(trendline_task, render_trendline, "⏳ Fitting OLS trendline...")
 
     st.header("Zone-Wise Revenue Comparison")
     revenue_comparison = df.groupby(['Year', 'Zone'])['Total Operating Revenues'].sum().reset_index()
@@ -108,4 +122,53 @@ if selected == "Operational Details":
     st.plotly_chart(fig, use_container_width=True)
 
 if selected == "Predictive Analytics":
-    st.write("Predictive analytics sections would go here with future projections based on historical data.")
+    st.title("Zone Forecasts")
+    controls = st.columns(3)
+    metric = controls[0].selectbox("Metric", FORECAST_METRICS)
+    method = controls[1].selectbox("Model", FORECAST_METHODS)
+    horizon = controls[2].slider("Months Ahead", min_value=3, max_value=24, value=12)
+
+    # Models are fitted per zone in the process pool and cached by dataset version
+    dataset = load_dataset()
+    if dataset.frame.empty:
+        st.stop()
+    matrix = zone_matrix(period_rollup(load_cube(), 'Monthly'), metric)
+    zones = st.multiselect("Zones", matrix.columns.tolist(), default=matrix.columns[:3].tolist())
+    models_task = fit_models(matrix, metric, method, dataset.version)
+
+    def render_forecasts(models):
+        forecasts = forecast_frame(dataset.version, metric, method, horizon, matrix, models)
+        shown = forecasts[forecasts['Zone'].isin(zones)]
+
+        st.header(f"{metric} Forecast ({method})")
+        status = forecast_status(metric, method)
+        if status is not None and status['version'] == dataset.version:
+            st.caption(f"{status['mode'].capitalize()}: {status['appended_months']} new months, "
+                       f"{status['refit_zones']} of {status['zones']} zones refitted")
+        fig = px.line(shown, x='Date', y=metric, color='Zone', line_dash='Series')
+        for zone, band in shown[shown['Series'] == 'Forecast'].groupby('Zone'):
+            fig.add_trace(go.Scatter(
+                x=list(band['Date']) + list(band['Date'][::-1]),
+                y=list(band['Upper']) + list(band['Lower'][::-1]),
+                fill='toself', opacity=0.15, line=dict(width=0), hoverinfo='skip',
+                name=f'{zone} 95% interval', showlegend=False))
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.header("Forecast for All Zones")
+        ahead = forecasts[forecasts['Series'] == 'Forecast']
+        heatmap = ahead.pivot_table(index='Zone', columns='Date', values=metric)
+        heatmap.columns = heatmap.columns.strftime('%Y-%m')
+        fig = px.imshow(heatmap, aspect="auto", labels=dict(x="Month", y="Zone", color=metric))
+        st.plotly_chart(fig, use_container_width=True)
+
+        if method == BATCH_METHOD:
+            st.header("Monthly Trend by Zone")
+            trend = pd.DataFrame({'Zone': matrix.columns, 'Trend per Month': models.trend}).sort_values('Trend per Month')
+            fig = px.bar(trend, x='Zone', y='Trend per Month', color='Trend per Month',
+                         color_continuous_scale='RdYlGn')
+            st.plotly_chart(fig, use_container_width=True)
+
+        st.header("Forecast Summary by Zone")
+        st.dataframe(forecast_summary(forecasts, metric, horizon), use_container_width=True)
+
+    show_when_ready(models_task, render_forecasts, "⏳ Fitting forecast models per zone...")
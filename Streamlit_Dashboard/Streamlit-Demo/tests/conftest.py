@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Make the shared waris package (Streamlit-Demo/waris) importable
+WARIS_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if WARIS_ROOT not in sys.path:
+    sys.path.insert(0, WARIS_ROOT)
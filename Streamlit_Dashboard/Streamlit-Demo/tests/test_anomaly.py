@@ -0,0 +1,34 @@
+import numpy as np
+
+from waris.anomaly import AnomalyEngine
+
+ZONES = 300
+
+
+def noise_engine(months, seed=0):
+    """An engine fed months of Gaussian noise for every zone and metric; returns it and the rng"""
+    rng = np.random.default_rng(seed)
+    engine = AnomalyEngine(threshold=3.5)
+    engine._add_zones(list(range(ZONES)))
+    scored = 0
+    for month in range(months):
+        scored += int((engine.seen >= engine.warmup).sum())
+        engine.step(month, 100 + rng.normal(size=(ZONES, len(engine.metrics))))
+    return engine, rng, scored
+
+
+def test_false_alarm_rate_on_noise_is_near_nominal():
+    engine, _, scored = noise_engine(120)
+    # Two-sided normal tail beyond 3.5 is 0.047%; allow twice that for sampling noise
+    assert len(engine._events) / scored < 2 * 0.00047
+
+
+def test_spike_is_detected():
+    engine, rng, _ = noise_engine(36)
+    values = 100 + rng.normal(size=(ZONES, len(engine.metrics)))
+    values[7, 0] += 15
+    before = len(engine._events)
+    engine.step(36, values)
+    events = engine._events[before:]
+    assert (7, 36, engine.metrics[0]) in [event[:3] for event in events]
+    assert next(event for event in events if event[:3] == (7, 36, engine.metrics[0]))[-1] == 'Spike'
@@ -0,0 +1,61 @@
+import numpy as np
+
+from waris import cache
+from waris.cache import CacheManager
+
+ENTRY = np.zeros(125)  # 1000 bytes
+BUDGET = 4 * ENTRY.nbytes
+
+
+def put(manager, key):
+    manager.put('test', key, ENTRY.copy(), tenant='default')
+
+
+def get(manager, key):
+    return manager.get('test', key, tenant='default')[0]
+
+
+def test_lru_evicts_least_recently_used():
+    manager = CacheManager(BUDGET, 'lru')
+    for key in 'abcd':
+        put(manager, key)
+    get(manager, 'a')
+    put(manager, 'e')
+    assert [get(manager, key) for key in 'abcde'] == [True, False, True, True, True]
+
+
+def test_lfu_evicts_least_frequently_used():
+    manager = CacheManager(BUDGET, 'lfu')
+    for key in 'abcd':
+        put(manager, key)
+    for key in 'abc':
+        get(manager, key)
+        get(manager, key)
+    put(manager, 'e')
+    assert [get(manager, key) for key in 'abcde'] == [True, True, True, False, True]
+
+
+def test_lfu_never_evicts_an_entry_on_insert():
+    manager = CacheManager(BUDGET, 'lfu')
+    for key in 'abcd':
+        put(manager, key)
+        for _ in range(5):
+            get(manager, key)
+    for i in range(10):
+        put(manager, f'new{i}')
+        assert get(manager, f'new{i}')
+
+
+def test_lfu_ages_out_entries_hit_long_ago(monkeypatch):
+    monkeypatch.setattr(cache, 'AGING_PUTS', 2)
+    manager = CacheManager(BUDGET, 'lfu')
+    for key in 'abcd':
+        put(manager, key)
+        for _ in range(20):
+            get(manager, key)
+    # A new dataset version: new keys, used on every rerun
+    for i in range(20):
+        put(manager, f'new{i}')
+        for _ in range(3):
+            get(manager, f'new{i}')
+    assert not any(manager.get('test', key, count=False, tenant='default')[0] for key in 'abcd')
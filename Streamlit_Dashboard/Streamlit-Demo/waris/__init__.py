@@ -0,0 +1,30 @@
+"""
+Shared WARIS compute helpers used by the Streamlit dashboard scripts
+
+The names below are imported on first use, so importing a light submodule
+(waris.schema, waris.kpis in the batch workers) does not load Streamlit.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'DATA_PATH': 'waris.data',
+    'dataset_version': 'waris.data',
+    'get_dataset': 'waris.data',
+    'load_data': 'waris.data',
+    'load_dataset': 'waris.data',
+    'read_waris': 'waris.data',
+    'aggregate': 'waris.cube',
+    'build_cube': 'waris.cube',
+    'load_cube': 'waris.cube',
+    'period_rollup': 'waris.cube',
+    'slice_cube': 'waris.cube',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module 'waris' has no attribute {name!r}")
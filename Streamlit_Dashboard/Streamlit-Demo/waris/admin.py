@@ -0,0 +1,52 @@
+"""
+Access gate for the Admin page
+
+The Admin page clears process-wide caches and starts and stops the memory
+profiler, which affects every session on the server, so it is closed to
+dashboard visitors unless the deployment opens it:
+
+    WARIS_ADMIN     1 to open the Admin page to everyone (local or internal deployments)
+    admin_token     secret in .streamlit/secrets.toml; ?admin_token=<value> opens the
+                    page for that session
+
+A session that passed the token keeps access for its lifetime; the token is
+removed from the URL so it is not shared along with a link.
+"""
+
+import hmac
+import os
+
+import streamlit as st
+
+OPEN = os.environ.get('WARIS_ADMIN', '').lower() in ('1', 'true', 'yes')
+TOKEN_PARAM = 'admin_token'
+SECRET_KEY = 'admin_token'
+STATE_KEY = '_admin_granted'
+
+
+def _secret_token():
+    try:
+        return st.secrets.get(SECRET_KEY)
+    except Exception:
+        # No secrets file at all
+        return None
+
+
+def allowed():
+    """Whether this session may use the Admin page"""
+    if OPEN or st.session_state.get(STATE_KEY):
+        return True
+    token, supplied = _secret_token(), st.query_params.get(TOKEN_PARAM)
+    if token and supplied and hmac.compare_digest(str(supplied).encode(), str(token).encode()):
+        st.session_state[STATE_KEY] = True
+        del st.query_params[TOKEN_PARAM]
+        return True
+    return False
+
+
+def require_admin():
+    """Stop the page unless this session may use the Admin page"""
+    if not allowed():
+        st.error("🔒 The Admin page is disabled. Set WARIS_ADMIN=1 on the server, "
+                 "or open it with ?admin_token=<token> when admin_token is set in the secrets.")
+        st.stop()
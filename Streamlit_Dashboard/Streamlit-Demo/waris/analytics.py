@@ -0,0 +1,36 @@
+"""
+CPU-heavy analytics run in the process pool (see waris.executor)
+
+These are plain module-level functions so they can be pickled by reference
+and executed in a worker process.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def zone_correlation(frame, metrics):
+    """Per-zone correlation matrix of the selected metrics"""
+    return frame[metrics + ['Zone']].groupby('Zone')[metrics].corr()
+
+
+def correlation_matrix(frame):
+    """Correlation matrix of every numeric column"""
+    numeric_cols = frame.select_dtypes(include=[np.number]).columns
+    return frame[numeric_cols].corr()
+
+
+def ols_trendline(x, y):
+    """Ordinary least squares fit of y on x, returned as a sorted line to plot"""
+    import statsmodels.api as sm
+
+    data = pd.DataFrame({'x': x, 'y': y}).dropna().sort_values('x')
+    model = sm.OLS(data['y'], sm.add_constant(data['x'])).fit()
+    return pd.DataFrame({
+        'x': data['x'].to_numpy(),
+        'y': model.fittedvalues.to_numpy(),
+    }), {
+        'intercept': model.params['const'],
+        'slope': model.params['x'],
+        'r_squared': model.rsquared,
+    }
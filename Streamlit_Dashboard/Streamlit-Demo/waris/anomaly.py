@@ -0,0 +1,254 @@
+"""
+Streaming per-zone anomaly detection for the monthly measures
+
+For every zone and metric the engine keeps an exponentially weighted mean
+and variance, plus a window of its recent one-step residuals (value minus
+the EWMA mean before the update). Each new month is scored against that
+state before being folded in: the EWMA z-score is the residual over the
+EWMA standard deviation, and the robust z-score is the residual's distance
+from the window median in units of the window's scaled MAD. A month whose
+robust z-score exceeds the threshold is recorded as a (zone, month, metric)
+event. The MAD of a 12-24 month window is itself a noisy estimate, so the
+threshold is widened to the Student-t quantile with the MAD's effective
+degrees of freedom (``small_sample_threshold``): on Gaussian noise the
+false-alarm rate stays at the nominal rate for the threshold (about 0.05%
+of zone-months for 3.5) instead of roughly 15 times that.
+
+Months are processed one at a time, every zone at once, and only months
+after the last one seen are processed when the dataset gains rows, so a
+data drop costs one update per new month rather than a rescan.
+
+    WARIS_ANOMALY_ALPHA     EWMA smoothing factor (default 0.2)
+    WARIS_ANOMALY_Z         robust z-score threshold (default 3.5)
+    WARIS_ANOMALY_WINDOW    residual window in months (default 24)
+"""
+
+import hashlib
+import os
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from waris import tenants
+from waris.cache import cached
+from waris.cube import cube_for, period_rollup
+from waris.data import add_refresh_hook, load_dataset
+
+ANOMALY_METRICS = [
+    'Total Operating Revenues',
+    'Total Operating Expenditures',
+    'Total Collection',
+    'Collection Efficiency',
+]
+ALPHA = float(os.environ.get('WARIS_ANOMALY_ALPHA', 0.2))
+THRESHOLD = float(os.environ.get('WARIS_ANOMALY_Z', 3.5))
+WINDOW = int(os.environ.get('WARIS_ANOMALY_WINDOW', 24))
+WARMUP = 12
+
+# MAD of a normal sample is 0.6745 sigma
+MAD_SCALE = 1.4826
+# A MAD over n residuals is worth about 0.37 n normal observations
+MAD_EFFICIENCY = 0.37
+# Floor on the MAD scale: a flat history (MAD 0) still flags a real departure instead of dividing by zero
+MIN_SCALE = 1e-6
+
+EVENT_COLUMNS = ['Zone', 'Date', 'Metric', 'Value', 'Expected', 'EWMA Z', 'Robust Z', 'Direction']
+
+
+def small_sample_threshold(z, df):
+    """Student-t quantile matching the normal tail beyond z, for df degrees of freedom
+
+    Cornish-Fisher expansion of the t quantile; it tends to z as df grows.
+    """
+    df = np.maximum(df, 1.0)
+    return (z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+class AnomalyEngine:
+    """Incremental EWMA / robust z-score state for every zone and metric"""
+
+    def __init__(self, metrics=ANOMALY_METRICS, alpha=ALPHA, threshold=THRESHOLD, window=WINDOW, warmup=WARMUP):
+        self.metrics = list(metrics)
+        self.alpha = alpha
+        self.threshold = threshold
+        self.window = window
+        self.warmup = warmup
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all state and events"""
+        k = len(self.metrics)
+        self.zones = []
+        self._zone_rows = {}
+        self.mean = np.full((0, k), np.nan)
+        self.var = np.zeros((0, k))
+        self.seen = np.zeros((0, k), dtype=int)
+        self.residuals = np.full((0, k, self.window), np.nan)
+        self.last_date = None
+        self.version = None
+        self.prefix_digest = None
+        self._events = []
+
+    def _add_zones(self, zones):
+        new = [zone for zone in zones if zone not in self._zone_rows]
+        if not new:
+            return
+        k = len(self.metrics)
+        for zone in new:
+            self._zone_rows[zone] = len(self.zones)
+            self.zones.append(zone)
+        self.mean = np.vstack([self.mean, np.full((len(new), k), np.nan)])
+        self.var = np.vstack([self.var, np.zeros((len(new), k))])
+        self.seen = np.vstack([self.seen, np.zeros((len(new), k), dtype=int)])
+        self.residuals = np.concatenate([self.residuals, np.full((len(new), k, self.window), np.nan)])
+
+    def score(self, values):
+        """EWMA and robust z-scores of one month's (zones x metrics) values against the current state
+
+        Also returns the robust z-score each cell must exceed, given how many
+        residuals its window holds.
+        """
+        residual = values - self.mean
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            ewma_z = residual / np.sqrt(self.var)
+            median = np.nanmedian(self.residuals, axis=2)
+            mad = np.nanmedian(np.abs(self.residuals - median[..., None]), axis=2)
+            scale = np.maximum(MAD_SCALE * mad, MIN_SCALE)
+            robust_z = (residual - median) / scale
+        ready = self.seen >= self.warmup
+        ewma_z[~ready | ~np.isfinite(ewma_z)] = np.nan
+        robust_z[~ready | ~np.isfinite(robust_z)] = np.nan
+        limit = small_sample_threshold(self.threshold, MAD_EFFICIENCY * np.sum(~np.isnan(self.residuals), axis=2))
+        return residual, ewma_z, robust_z, median, scale, limit
+
+    def step(self, date, values):
+        """Score one month of (zones x metrics) values, record events and fold the month in"""
+        residual, ewma_z, robust_z, median, scale, limit = self.score(values)
+
+        with np.errstate(invalid='ignore'):
+            flagged = np.abs(robust_z) > limit
+        for row, col in zip(*np.nonzero(flagged)):
+            self._events.append((
+                self.zones[row], date, self.metrics[col], values[row, col], self.mean[row, col],
+                ewma_z[row, col], robust_z[row, col], 'Spike' if residual[row, col] > 0 else 'Drop',
+            ))
+
+        observed = ~np.isnan(values)
+        first = observed & (self.seen == 0)
+        update = observed & ~first
+
+        # Winsorize flagged months so one spike does not drag the baseline along
+        bound = limit * scale
+        clipped = np.where(np.isfinite(bound), np.clip(residual, median - bound, median + bound), residual)
+        clipped = np.where(update, clipped, 0.0)
+        self.var = np.where(update, (1 - self.alpha) * (self.var + self.alpha * clipped ** 2), self.var)
+        self.mean = np.where(update, self.mean + self.alpha * clipped, self.mean)
+        self.mean = np.where(first, values, self.mean)
+
+        rows, cols = np.nonzero(update)
+        self.residuals[rows, cols, self.seen[rows, cols] % self.window] = residual[rows, cols]
+        self.seen += observed
+        self.last_date = date
+
+    def update(self, monthly):
+        """Process the months of a monthly (Date, Zone) frame that come after the last one seen"""
+        if self.last_date is not None:
+            monthly = monthly[monthly['Date'] > self.last_date]
+        if monthly.empty:
+            return 0
+        self._add_zones(sorted(monthly['Zone'].unique()))
+
+        months = 0
+        for date, month in monthly.groupby('Date', sort=True):
+            values = np.full((len(self.zones), len(self.metrics)), np.nan)
+            rows = month['Zone'].map(self._zone_rows).to_numpy()
+            values[rows] = month[self.metrics].to_numpy(dtype=float)
+            self.step(date, values)
+            months += 1
+        return months
+
+    def ingest(self, monthly, version):
+        """Bring the engine up to a dataset version, incrementally when only months were appended"""
+        if self.last_date is None or _digest(monthly, self.last_date) != self.prefix_digest:
+            self.reset()
+        self.update(monthly)
+        self.version = version
+        self.prefix_digest = _digest(monthly, self.last_date)
+
+    def events(self):
+        """Flagged events as a frame indexed by (Zone, Date, Metric)"""
+        events = pd.DataFrame(self._events, columns=EVENT_COLUMNS)
+        return events.set_index(['Zone', 'Date', 'Metric']).sort_index()
+
+
+def _digest(monthly, last_date):
+    """Content hash of the months up to last_date, to tell appends from revisions"""
+    if last_date is None:
+        return None
+    prefix = monthly.loc[monthly['Date'] <= last_date, ['Date', 'Zone'] + ANOMALY_METRICS]
+    hashed = pd.util.hash_pandas_object(prefix, index=False).to_numpy()
+    return hashlib.blake2b(hashed.tobytes(), digest_size=16).hexdigest()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def engine_for(path, dataset):
+    """The path's streaming engine, brought up to date with a Dataset version"""
+    with _engines_lock:
+        engine = _engines.setdefault(path, AnomalyEngine())
+    with engine.lock:
+        if engine.version != dataset.version:
+            engine.ingest(period_rollup(cube_for(path, dataset), 'Monthly'), dataset.version)
+        return engine
+
+
+def events_for(path, dataset):
+    """Event index for a specific Dataset version (e.g. one about to be swapped in)"""
+    return _versioned_events(path, dataset.version, dataset)
+
+
+@cached('anomaly events', max_entries=2)
+def _versioned_events(path, version, _dataset):
+    return engine_for(path, _dataset).events()
+
+
+# Score the appended months of a new dataset version before it is swapped in
+add_refresh_hook(events_for)
+
+
+def load_events(path=None):
+    """Event index for the dataset version currently being served"""
+    path = path or tenants.current_path()
+    dataset = load_dataset(path)
+    if dataset.frame.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS).set_index(['Zone', 'Date', 'Metric'])
+    return events_for(path, dataset)
+
+
+def lookup_events(events, zones=None, date_range=None, years=None, metrics=None):
+    """Events for the page filters, most recent first"""
+    if events.empty:
+        # An empty index has no datetime Date level to filter on
+        return events.reset_index()
+    if zones is not None and 'All' not in zones:
+        events = events[events.index.get_level_values('Zone').isin(zones)]
+
+    dates = events.index.get_level_values('Date')
+    mask = np.ones(len(events), dtype=bool)
+    if date_range is not None and len(date_range) == 2:
+        mask &= (dates.date >= date_range[0]) & (dates.date <= date_range[1])
+    if years:
+        mask &= dates.year.isin(years)
+    if metrics:
+        mask &= events.index.get_level_values('Metric').isin(metrics)
+
+    events = events[mask].reset_index()
+    events = events.sort_values('Robust Z', key=np.abs, ascending=False)
+    return events.sort_values('Date', ascending=False, kind='stable')
@@ -0,0 +1,298 @@
+"""
+Read-only HTTP API over the cached WARIS aggregates
+
+Serves the numbers the pages show: the headline KPIs, the per-zone
+performance table and the period time series, computed by the same
+waris.filters / waris.kpis / waris.cube functions and from the same caches
+(the served dataset and its aggregate cube). Scripts can
+read them with a plain HTTP client instead of driving a Streamlit session.
+
+    GET /kpis          headline KPIs (one row)
+    GET /zones         zone performance table
+    GET /timeseries    revenue, expenditure and efficiency per period (and zone)
+    GET /health        status and dataset version (never cached)
+
+Filters are query parameters, repeated for several values: start and end
+(ISO dates, once each), zone, year and month (names, abbreviations or
+numbers; an unknown month is a 400). /timeseries also takes
+level (Monthly, Quarterly or Yearly) and by_zone (1 or 0). With several
+tenants (waris.tenants), tenant picks the utility (default: the first one).
+
+    curl 'http://127.0.0.1:8600/zones?zone=Zone%20A&zone=Zone%20B&year=2023'
+
+Bodies are JSON ({"version", "endpoint", "filters", "rows"}) or, with
+format=arrow or an ``Accept: application/vnd.apache.arrow.stream`` header,
+an Arrow IPC stream (needs pyarrow). Bodies are gzip-compressed when the
+client accepts it. Every response carries an ETag derived from the dataset
+version and the request, so a client sending it back in If-None-Match gets
+304 Not Modified without anything being recomputed. Encoded bodies are kept
+in the shared memory-bounded cache ('api responses'). With
+WARIS_BACKEND=duckdb, /zones and /timeseries are single SQL queries over the
+data file (waris.sqlbackend).
+
+Run it next to the dashboard, or inside the Streamlit process by setting
+WARIS_API_PORT before the server starts (streamlit_app.py):
+
+    python -m waris.api --port 8600
+
+    WARIS_API_HOST   address to bind (default 127.0.0.1, local clients only)
+    WARIS_API_PORT   port; when set, streamlit_app.py starts the API in-process
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from waris import sqlbackend, tenants
+from waris.cache import cached
+from waris.cube import load_cube, period_rollup, slice_cube
+from waris.data import get_dataset
+from waris.filters import MONTH_NAMES, month_name
+from waris.kpis import kpi_summary_from_cube, zone_metrics
+
+logger = logging.getLogger(__name__)
+
+HOST = os.environ.get('WARIS_API_HOST', '127.0.0.1')
+PORT = int(os.environ.get('WARIS_API_PORT') or 8600)
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+JSON_TYPE = 'application/json'
+LEVELS = ['Monthly', 'Quarterly', 'Yearly']
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+# Parameters taking one value; repeating them is rejected rather than picking one
+SINGLE_VALUED = ['start', 'end', 'level', 'by_zone', 'format', 'tenant']
+
+_server_lock = threading.Lock()
+_server = None
+
+
+def parse_filters(query):
+    """Normalized filters from the parsed query string; raises ValueError on bad values"""
+    def values(name):
+        return [value for value in query.get(name, []) if value != '']
+
+    start, end = values('start'), values('end')
+    date_range = None
+    if start or end:
+        dataset = get_dataset()
+        date_range = (
+            pd.Timestamp(start[0]).date() if start else dataset.frame['Date'].min().date(),
+            pd.Timestamp(end[0]).date() if end else dataset.frame['Date'].max().date(),
+        )
+    try:
+        years = sorted(int(year) for year in values('year'))
+    except ValueError:
+        raise ValueError("year must be an integer")
+    return {
+        'date_range': date_range,
+        'zones': sorted(values('zone')) or None,
+        'years': years or None,
+        'months': sorted({month_name(month) for month in values('month')}, key=MONTH_NAMES.index) or None,
+    }
+
+
+def kpi_table(filters, query):
+    cube = slice_cube(load_cube(), filters['date_range'], filters['zones'], filters['years'], filters['months'])
+    return pd.DataFrame([kpi_summary_from_cube(cube)._asdict()])
+
+
+def zone_table(filters, query):
+    if sqlbackend.enabled():
+        return sqlbackend.zone_metrics(tenants.current_path(), **filters).reset_index()
+    cube = slice_cube(load_cube(), filters['date_range'], filters['zones'], filters['years'], filters['months'])
+    return zone_metrics(cube).reset_index()
+
+
+def timeseries_table(filters, query):
+    level = (query.get('level') or ['Monthly'])[-1].capitalize()
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+    by_zone = (query.get('by_zone') or ['1'])[-1].lower() not in ('0', 'false', 'no')
+    if sqlbackend.enabled():
+        return sqlbackend.period_rollup(tenants.current_path(), level, by_zone, **filters)
+    cube = slice_cube(load_cube(), filters['date_range'], filters['zones'], filters['years'], filters['months'])
+    return period_rollup(cube, level, by_zone=by_zone)
+
+
+ENDPOINTS = {
+    '/kpis': kpi_table,
+    '/zones': zone_table,
+    '/timeseries': timeseries_table,
+}
+
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(endpoint, version, filters, frame, fmt):
+    """Response body of a result frame as JSON or an Arrow IPC stream"""
+    if fmt == 'arrow':
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(frame, preserve_index=False).replace_schema_metadata({
+            'waris.version': version, 'waris.endpoint': endpoint,
+        })
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    header = json.dumps({'version': version, 'endpoint': endpoint, 'filters': filters}, default=_json_default)
+    rows = frame.to_json(orient='records', date_format='iso')
+    return (header[:-1] + ', "rows": ' + rows + '}').encode('utf-8')
+
+
+@cached('api responses', max_entries=256)
+def _response(path, version, endpoint, params, fmt, compress, _query):
+    filters = parse_filters(_query)
+    body = encode(endpoint, version, filters, ENDPOINTS[endpoint](filters, _query), fmt)
+    if compress and len(body) >= MIN_COMPRESS_BYTES:
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
+
+
+def etag(version, endpoint, params, fmt):
+    digest = hashlib.sha1(repr((version, endpoint, params, fmt)).encode('utf-8')).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    """GET/HEAD handler; every other method gets 501 from BaseHTTPRequestHandler"""
+
+    server_version = 'WARIS-API/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_HEAD(self):
+        self.handle_get(head=True)
+
+    def do_GET(self):
+        self.handle_get(head=False)
+
+    def send_body(self, status, body, content_type=JSON_TYPE, headers=(), head=False):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message, head=False):
+        self.send_body(status, json.dumps({'error': message}).encode('utf-8'), head=head)
+
+    def handle_get(self, head):
+        url = urlsplit(self.path)
+        endpoint = url.path.rstrip('/') or '/'
+        query = parse_qs(url.query)
+        repeated = [name for name in SINGLE_VALUED if len(query.get(name, [])) > 1]
+        if repeated:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, f"{repeated[0]} may only be given once", head)
+
+        # Left in the query, so the tenant is part of the cache key and ETag
+        name = (query.get('tenant') or [next(iter(tenants.registry()))])[-1]
+        if name not in tenants.registry():
+            return self.send_error_json(HTTPStatus.NOT_FOUND, f"unknown tenant {name}", head)
+        with tenants.use(name) as tenant:
+            self.handle_tenant_get(tenant, endpoint, query, head)
+
+    def handle_tenant_get(self, tenant, endpoint, query, head):
+        try:
+            dataset = get_dataset(tenant.path)
+        except Exception as e:
+            return self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, f"dataset unavailable: {e}", head)
+
+        if endpoint == '/health':
+            body = json.dumps({'status': 'ok', 'tenant': tenant.name, 'version': dataset.version,
+                               'rows': len(dataset.frame)})
+            return self.send_body(HTTPStatus.OK, body.encode('utf-8'), headers=[('Cache-Control', 'no-store')],
+                                  head=head)
+        if endpoint not in ENDPOINTS:
+            return self.send_error_json(HTTPStatus.NOT_FOUND, f"unknown endpoint {endpoint}", head)
+
+        accept = self.headers.get('Accept', '')
+        fmt = (query.pop('format', None) or ['arrow' if ARROW_TYPE in accept else 'json'])[-1].lower()
+        if fmt not in ('json', 'arrow'):
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, "format must be json or arrow", head)
+        if fmt == 'arrow':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                return self.send_error_json(HTTPStatus.NOT_ACCEPTABLE, "Arrow output needs pyarrow", head)
+
+        # The cache key and ETag only depend on the normalized request
+        params = tuple(sorted((name, tuple(sorted(values))) for name, values in query.items()))
+        tag = etag(dataset.version, endpoint, params, fmt)
+        headers = [('ETag', tag), ('Cache-Control', 'no-cache'), ('Vary', 'Accept, Accept-Encoding'),
+                   ('X-WARIS-Version', dataset.version)]
+        if tag in [value.strip() for value in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        compress = 'gzip' in self.headers.get('Accept-Encoding', '')
+        try:
+            body, encoding = _response(tenant.path, dataset.version, endpoint, params, fmt, compress, query)
+        except ValueError as e:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, str(e), head)
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        self.send_body(HTTPStatus.OK, body, ARROW_TYPE if fmt == 'arrow' else JSON_TYPE, headers, head)
+
+
+def make_server(host=HOST, port=PORT):
+    """An API server bound to host:port (port 0 picks a free one); call serve_forever() on it"""
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def start_api(host=HOST, port=PORT):
+    """Serve the API from a background thread, once per process; returns the server"""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = make_server(host, port)
+            threading.Thread(target=_server.serve_forever, name='waris-api', daemon=True).start()
+            logger.info("WARIS API listening on http://%s:%s", *_server.server_address[:2])
+        return _server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the WARIS aggregates as a read-only JSON/Arrow API")
+    parser.add_argument('--host', default=HOST, help=f"address to bind (default {HOST})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"port to listen on (default {PORT})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = make_server(args.host, args.port)
+    print(f"Serving the WARIS API on http://{args.host}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
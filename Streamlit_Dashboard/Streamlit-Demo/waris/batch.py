@@ -0,0 +1,186 @@
+"""
+Nightly executive KPIs for a directory of WARIS extracts
+
+Computes the Home.py executive KPIs (total and net revenue, collection
+efficiency, collection rate, zone leaders, revenue growth) for every WARIS
+file in a directory, one utility per file, in a process pool, and writes
+them to one Parquet summary with a row per file.
+
+Each worker streams its file in chunks of --chunk-rows rows, reading only
+the columns the KPIs need, and keeps nothing but per-(Zone, Year) sums
+between chunks, so a worker's memory is bounded by the chunk size and the
+number of zones and years, not by the file size. Workers are replaced after
+--tasks-per-worker files to return what the allocator holds on to. Workers
+only import pandas, waris.schema and waris.kpis (no Streamlit, no caches).
+A file that cannot be read is reported in the summary's error column and
+the run carries on; the exit status is non-zero if any file failed.
+
+    python -m waris.batch /data/extracts --out kpis.parquet --workers 4
+    python -m waris.batch /data/extracts --out kpis.parquet --recursive --chunk-rows 100000
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from waris import schema
+from waris.kpis import KPIs, kpi_summary_from_totals, kpi_totals
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EXTENSIONS = ('.csv', '.parquet')
+KPI_COLUMNS = [
+    'Zone', 'Year', 'Month',
+    'Total Operating Revenues', 'Total Operating Expenditures',
+    'Total Billing', 'Total Collection', 'Collection Efficiency',
+]
+CHUNK_ROWS = 250_000
+TASKS_PER_WORKER = 8
+SUMMARY_COLUMNS = (
+    ['utility', 'path', 'rows', 'zones', 'years', 'first_month', 'last_month']
+    + list(KPIs._fields)
+    + ['yoy_revenue_growth', 'best_efficiency_zone', 'best_efficiency', 'worst_efficiency_zone',
+       'worst_efficiency', 'highest_revenue_zone', 'highest_revenue', 'seconds', 'worker_peak_rss_mb', 'error']
+)
+
+
+def find_files(directory, recursive=False):
+    """WARIS files (.csv, .parquet) under directory, sorted"""
+    pattern = os.path.join(directory, '**', '*') if recursive else os.path.join(directory, '*')
+    return sorted(path for path in glob.glob(pattern, recursive=recursive)
+                  if os.path.isfile(path) and path.lower().endswith(EXTENSIONS))
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """The KPI columns of a CSV or Parquet file, chunk_rows rows at a time"""
+    return schema.read_chunks(path, KPI_COLUMNS, chunk_rows)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+def file_kpis(path, chunk_rows=CHUNK_ROWS):
+    """Summary row (a dict of SUMMARY_COLUMNS) for one WARIS file"""
+    started = time.perf_counter()
+    row = dict.fromkeys(SUMMARY_COLUMNS)
+    row.update(utility=os.path.splitext(os.path.basename(path))[0], path=os.path.abspath(path))
+    try:
+        totals = None
+        first = last = None
+        for chunk in read_chunks(path, chunk_rows):
+            chunk = chunk.dropna(subset=['Zone', 'Year', 'Month'])
+            chunk_totals = kpi_totals(chunk)
+            totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+            months = chunk['Year'].astype('int64') * 12 + chunk['Month'].astype('int64') - 1
+            if len(months):
+                first = months.min() if first is None else min(first, months.min())
+                last = months.max() if last is None else max(last, months.max())
+        if totals is None or totals['Rows'].sum() == 0:
+            raise ValueError("no rows")
+
+        row.update(kpi_summary_from_totals(totals)._asdict())
+        row.update(
+            rows=int(totals['Rows'].sum()),
+            zones=row['total_zones'],
+            years=totals.index.get_level_values('Year').nunique(),
+            first_month=pd.Timestamp(year=int(first // 12), month=int(first % 12) + 1, day=1),
+            last_month=pd.Timestamp(year=int(last // 12), month=int(last % 12) + 1, day=1),
+        )
+
+        # Year over year: the last year in the file against the one before it
+        yearly_revenue = totals.groupby(level='Year')['Total Operating Revenues'].sum().sort_index()
+        if len(yearly_revenue) > 1 and yearly_revenue.iloc[-2] > 0:
+            row['yoy_revenue_growth'] = (yearly_revenue.iloc[-1] / yearly_revenue.iloc[-2] - 1) * 100
+
+        # Zone leaders, as on the Home page's executive summary
+        zones = totals.groupby(level='Zone').sum()
+        efficiency = (zones['Efficiency Sum'] / zones['Efficiency Count']).dropna()
+        if len(efficiency):
+            row.update(
+                best_efficiency_zone=str(efficiency.idxmax()), best_efficiency=efficiency.max(),
+                worst_efficiency_zone=str(efficiency.idxmin()), worst_efficiency=efficiency.min(),
+            )
+        revenue = zones['Total Operating Revenues']
+        row.update(highest_revenue_zone=str(revenue.idxmax()), highest_revenue=revenue.max())
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = time.perf_counter() - started
+    row['worker_peak_rss_mb'] = peak_rss_mb()
+    return row
+
+
+def run(paths, workers=None, chunk_rows=CHUNK_ROWS, tasks_per_worker=TASKS_PER_WORKER, progress=None):
+    """KPI summary frame for the files, computed in a process pool
+
+    progress(done, total, row) is called as each file finishes.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+    # Recycling workers needs a non-fork start method
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             max_tasks_per_child=tasks_per_worker) as pool:
+        futures = [pool.submit(file_kpis, path, chunk_rows) for path in paths]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows.append(row)
+            if progress is not None:
+                progress(done, len(paths), row)
+    summary = pd.DataFrame(rows, columns=SUMMARY_COLUMNS).astype(
+        {'rows': 'Int64', 'zones': 'Int64', 'years': 'Int64', 'total_zones': 'Int64'})
+    return summary.sort_values('utility', kind='stable', ignore_index=True)
+
+
+def report_progress(done, total, row):
+    status = f"ERROR {row['error']}" if row['error'] else f"{row['rows']:,} rows"
+    print(f"[{done}/{total}] {row['utility']}: {status} in {row['seconds']:.1f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute the executive KPIs of every WARIS file in a directory")
+    parser.add_argument('directory', help="directory of WARIS extracts (.csv, .parquet), one utility per file")
+    parser.add_argument('--out', default='waris_kpis.parquet', help="Parquet summary to write")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows read at a time per worker; bounds worker memory (default {CHUNK_ROWS:,})")
+    parser.add_argument('--tasks-per-worker', type=int, default=TASKS_PER_WORKER,
+                        help=f"files a worker handles before it is replaced (default {TASKS_PER_WORKER})")
+    parser.add_argument('--recursive', action='store_true', help="also look in subdirectories")
+    parser.add_argument('--quiet', action='store_true', help="don't report progress")
+    args = parser.parse_args(argv)
+
+    paths = find_files(args.directory, args.recursive)
+    if not paths:
+        parser.error(f"no .csv or .parquet files in {args.directory}")
+
+    started = time.perf_counter()
+    summary = run(paths, args.workers, args.chunk_rows, args.tasks_per_worker,
+                  progress=None if args.quiet else report_progress)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    tmp_path = args.out + '.tmp'
+    summary.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, args.out)
+
+    failed = summary['error'].notna().sum()
+    print(f"{args.out}: {len(summary) - failed} of {len(summary)} files in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Memory-bounded cache shared by the dashboard pages
+
+Every cached aggregate, figure and export lives in one process-wide
+CacheManager. Each entry's approximate size is tracked, and once the total
+goes over the budget the least recently used (or least frequently used)
+entries are evicted, whichever cache they belong to. Hit, miss and
+eviction counters are kept per named cache for the admin page.
+
+Entries belong to the tenant current when they are stored (waris.tenants)
+and are only found by that tenant. Each tenant also has a budget of its
+own: a tenant over its budget evicts its own entries, and when the global
+budget is exceeded the entries go from the tenant furthest over its share,
+so one large tenant cannot push the others out.
+
+    WARIS_CACHE_BUDGET_MB   global budget in megabytes (default 256)
+    WARIS_CACHE_POLICY      'lru' (default) or 'lfu'
+
+Under LFU, hit counts are halved every AGING_PUTS puts, so entries that
+were popular long ago (an old dataset version's) age out, and an entry is
+never evicted by its own insertion.
+
+Caches created with ``disk=True`` also read through and write to the
+optional on-disk tier (waris.diskcache) before computing. Their disk keys
+also hash the function's bytecode and diskcache.CACHE_VERSION, so entries
+written by a previous deploy of the function are not served by the new one.
+
+Cached values are shared between sessions, not copied; treat them as
+read-only.
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from waris import diskcache, tenants
+from waris.executor import task_key
+from waris.singleflight import group
+
+BUDGET_BYTES = int(float(os.environ.get('WARIS_CACHE_BUDGET_MB', 256)) * 1024 * 1024)
+POLICY = os.environ.get('WARIS_CACHE_POLICY', 'lru').lower()
+# LFU aging: every this many puts, all hit counts are halved
+AGING_PUTS = 128
+
+
+def sizeof(value):
+    """Approximate in-memory size of a cached value, in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    try:
+        # Figures and other objects: their pickled size is a fair estimate
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'hits', 'expires_at')
+
+    def __init__(self, value, size, expires_at):
+        self.value = value
+        self.size = size
+        # The miss that stored it counts as a use
+        self.hits = 1
+        self.expires_at = expires_at
+
+
+class CacheManager:
+    """Process-wide store with a global byte budget and LRU/LFU eviction"""
+
+    def __init__(self, budget_bytes=BUDGET_BYTES, policy=POLICY):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.budget_bytes = budget_bytes
+        self.policy = policy
+        self.used_bytes = 0
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._counts = {}
+        self._tenants = {}
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def _cache_stats(self, cache):
+        if cache not in self._stats:
+            self._stats[cache] = {
+                'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0,
+                'evictions': 0, 'expirations': 0, 'rejected': 0,
+            }
+        return self._stats[cache]
+
+    def _tenant_stats(self, tenant):
+        if tenant not in self._tenants:
+            self._tenants[tenant] = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+        return self._tenants[tenant]
+
+    def _remove(self, full_key, reason=None):
+        entry = self._entries.pop(full_key)
+        tenant, cache = full_key[:2]
+        self.used_bytes -= entry.size
+        self._counts[tenant, cache] -= 1
+        for stats in (self._cache_stats(cache), self._tenant_stats(tenant)):
+            stats['entries'] -= 1
+            stats['bytes'] -= entry.size
+            if reason in stats:
+                stats[reason] += 1
+
+    def tenant_budget(self, tenant):
+        return tenants.budget_bytes(tenant, self.budget_bytes)
+
+    def get(self, cache, key, count=True, tenant=None):
+        """Return (found, value) for key in the named cache of the (current) tenant"""
+        tenant = tenant or tenants.current_name()
+        full_key = (tenant, cache, key)
+        with self._lock:
+            stats = self._cache_stats(cache)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.expires_at is not None and entry.expires_at <= time.monotonic():
+                self._remove(full_key, 'expirations')
+                entry = None
+            if entry is None:
+                if count:
+                    stats['misses'] += 1
+                    self._tenant_stats(tenant)['misses'] += 1
+                return False, None
+            if count:
+                stats['hits'] += 1
+                self._tenant_stats(tenant)['hits'] += 1
+            entry.hits += 1
+            self._entries.move_to_end(full_key)
+            return True, entry.value
+
+    def put(self, cache, key, value, ttl=None, max_entries=None, tenant=None):
+        """Store value for the (current) tenant, evicting entries if a budget is exceeded"""
+        size = sizeof(value)
+        tenant = tenant or tenants.current_name()
+        full_key = (tenant, cache, key)
+        with self._lock:
+            stats = self._cache_stats(cache)
+            tenant_stats = self._tenant_stats(tenant)
+            tenant_budget = self.tenant_budget(tenant)
+            if size > tenant_budget:
+                # Would evict everything else and still not fit - serve it uncached
+                stats['rejected'] += 1
+                return
+            if full_key in self._entries:
+                self._remove(full_key)
+
+            self._puts += 1
+            if self.policy == 'lfu' and self._puts % AGING_PUTS == 0:
+                # Halve the counts so entries hit long ago (an old dataset version) stop pinning the cache
+                for entry in self._entries.values():
+                    entry.hits //= 2
+
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[full_key] = _Entry(value, size, expires_at)
+            self.used_bytes += size
+            self._counts[tenant, cache] = self._counts.get((tenant, cache), 0) + 1
+            for counters in (stats, tenant_stats):
+                counters['entries'] += 1
+                counters['bytes'] += size
+
+            # max_entries applies to each tenant's copy of the cache
+            if max_entries is not None and self._counts[tenant, cache] > max_entries:
+                oldest = next(k for k in self._entries if k[:2] == (tenant, cache))
+                self._remove(oldest, 'evictions')
+            # The entry just stored is never its own victim
+            while tenant_stats['bytes'] > tenant_budget:
+                self._remove(self._victim(tenant, full_key), 'evictions')
+            while self.used_bytes > self.budget_bytes:
+                self._remove(self._victim(self._heaviest_tenant(), full_key), 'evictions')
+
+    def _heaviest_tenant(self):
+        """Tenant using the largest share of its own budget"""
+        return max((tenant for tenant, stats in self._tenants.items() if stats['entries']),
+                   key=lambda tenant: self._tenants[tenant]['bytes'] / max(self.tenant_budget(tenant), 1))
+
+    def _victim(self, tenant, keep=None):
+        keys = [k for k in self._entries if k[0] == tenant and k != keep]
+        if not keys:
+            return keep
+        if self.policy == 'lfu':
+            # Fewest (aged) hits first; ties go to the least recently used
+            return min(keys, key=lambda k: self._entries[k].hits)
+        return keys[0]
+
+    def clear(self, cache=None, tenant=None):
+        """Drop every entry, or only those of one named cache and/or tenant"""
+        with self._lock:
+            for full_key in [k for k in self._entries
+                             if (cache is None or k[1] == cache) and (tenant is None or k[0] == tenant)]:
+                self._remove(full_key)
+
+    def value_ids(self):
+        """ids of every cached value (tells shared objects from per-session ones)"""
+        with self._lock:
+            return {id(entry.value) for entry in self._entries.values()}
+
+    def stats(self):
+        """Per-cache counters as a DataFrame, one row per named cache"""
+        with self._lock:
+            rows = [dict(cache=name, **stats) for name, stats in self._stats.items()]
+        table = pd.DataFrame(rows, columns=[
+            'cache', 'entries', 'bytes', 'hits', 'misses',
+            'evictions', 'expirations', 'rejected',
+        ])
+        lookups = table['hits'] + table['misses']
+        table['hit_rate'] = (table['hits'] / lookups.where(lookups > 0)).round(3)
+        return table
+
+    def tenant_stats(self):
+        """Per-tenant usage against its budget as a DataFrame, one row per tenant"""
+        with self._lock:
+            rows = [dict(tenant=name, budget=self.tenant_budget(name), **stats)
+                    for name, stats in self._tenants.items()]
+        return pd.DataFrame(rows, columns=['tenant', 'budget', 'entries', 'bytes', 'hits', 'misses', 'evictions'])
+
+
+manager = CacheManager()
+
+
+def _hash_code(code, digest):
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            # A nested function: its repr holds a memory address, so hash its code instead
+            _hash_code(const, digest)
+        else:
+            digest.update(repr(const).encode())
+
+
+def code_version(func):
+    """Digest of func's bytecode and constants (nested functions included) and the disk CACHE_VERSION"""
+    digest = hashlib.blake2b(f'v{diskcache.CACHE_VERSION}'.encode(), digest_size=8)
+    _hash_code(inspect.unwrap(func).__code__, digest)
+    return digest.hexdigest()
+
+
+def cached(name, ttl=None, max_entries=None, disk=False):
+    """Decorator: cache results in the shared manager under the named cache
+
+    A drop-in for ``@st.cache_data``: arguments are hashed by content
+    (DataFrames included), arguments whose name starts with an underscore are
+    left out of the key, and concurrent misses for the same key are
+    single-flighted so only one caller computes the value. With ``disk=True``
+    a miss is looked up in the on-disk tier before computing.
+    """
+    flight = group(name)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        version = code_version(func) if disk else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = task_key(func, *[
+                value for arg, value in bound.arguments.items() if not arg.startswith('_')
+            ])
+            tenant = tenants.current_name()
+            found, value = manager.get(name, key, tenant=tenant)
+            if found:
+                return value
+
+            def compute():
+                # Another caller may have filled the entry while we waited
+                found, value = manager.get(name, key, count=False, tenant=tenant)
+                if found:
+                    return value
+                disk_key = f'{key}-{version}' if disk else None
+                found, value = diskcache.load(name, disk_key) if disk else (False, None)
+                if not found:
+                    value = func(*args, **kwargs)
+                    if disk:
+                        diskcache.store(name, disk_key, value)
+                manager.put(name, key, value, ttl=ttl, max_entries=max_entries, tenant=tenant)
+                return value
+
+            # Each tenant computes (and accounts) its own copy
+            return flight.do((tenant, key), compute)
+
+        wrapper.clear = lambda: manager.clear(name)
+        return wrapper
+    return decorator
@@ -0,0 +1,145 @@
+"""
+(Date, Zone) aggregate cube shared by the dashboard pages
+
+The cube holds one row per zone and month with the summed measures plus
+the sums, squared sums and row counts needed to rebuild the averaged
+measures and their spread, so any coarser roll-up (zone totals, quarters,
+years, the headline KPIs) is computed from the cube instead of the full
+row-level frame. These columns are mergeable: folds of disjoint chunks of
+rows add up to the fold of all of them (waris.outofcore relies on this).
+"""
+
+import pandas as pd
+
+from waris.cache import cached
+from waris import tenants
+from waris.data import add_refresh_hook, load_dataset
+from waris.filters import filter_frame
+
+SUM_MEASURES = [
+    'Total Operating Revenues',
+    'Total Operating Expenditures',
+    'Total Collection',
+    'Total Billing',
+    'Net_Revenue',
+]
+MEAN_MEASURES = [
+    'Collection Efficiency',
+    'Operation & Maintenance Cost Coverage',
+]
+COUNT_COLUMNS = [f'{measure} Count' for measure in MEAN_MEASURES]
+SQUARE_COLUMNS = [f'{measure} Squares' for measure in MEAN_MEASURES]
+FOLD_COLUMNS = SUM_MEASURES + MEAN_MEASURES + COUNT_COLUMNS + SQUARE_COLUMNS + ['Rows']
+
+PERIOD_KEYS = {
+    'Monthly': ['Date'],
+    'Quarterly': ['Year', 'Quarter'],
+    'Yearly': ['Year'],
+}
+
+
+def fold_rows(df):
+    """Per-(Date, Zone) sums, counts and squared sums of rows, indexed by (Date, Zone)
+
+    Folds of separate chunks merge with ``DataFrame.add(..., fill_value=0)``.
+    """
+    grouped = df.groupby(['Date', 'Zone'])
+    folded = grouped[SUM_MEASURES + MEAN_MEASURES].sum()
+    counts = grouped[MEAN_MEASURES].count()
+    counts.columns = COUNT_COLUMNS
+    squares = df[MEAN_MEASURES].pow(2).groupby([df['Date'], df['Zone']]).sum()
+    squares.columns = SQUARE_COLUMNS
+    folded = folded.join(counts).join(squares)
+    folded['Rows'] = grouped.size()
+    return folded
+
+
+def finish_cube(folded):
+    """Cube frame from a (merged) fold, with the calendar columns the filters use"""
+    cube = folded.reset_index()
+    cube[COUNT_COLUMNS + ['Rows']] = cube[COUNT_COLUMNS + ['Rows']].astype('int64')
+
+    cube['Year'] = cube['Date'].dt.year
+    cube['Quarter'] = cube['Date'].dt.quarter
+    cube['Month_Name'] = cube['Date'].dt.month_name()
+    return cube
+
+
+def build_cube(df):
+    """Fold the row-level frame into per-(Date, Zone) sums and counts"""
+    return finish_cube(fold_rows(df))
+
+
+def load_cube(path=None):
+    """Aggregate cube for the dataset version currently being served"""
+    path = path or tenants.current_path()
+    dataset = load_dataset(path)
+    if dataset.frame.empty:
+        return pd.DataFrame()
+    return cube_for(path, dataset)
+
+
+def cube_for(path, dataset):
+    """Aggregate cube for a specific Dataset version (e.g. one about to be swapped in)"""
+    if dataset.cube is not None:
+        # Streamed out of core: the dataset was only ever held as its cube
+        return dataset.cube
+    from waris import sqlbackend
+
+    if sqlbackend.enabled():
+        return _sql_cube(path, dataset.version, tuple(FOLD_COLUMNS))
+    return _versioned_cube(path, dataset.version, tuple(FOLD_COLUMNS), dataset.frame)
+
+
+# Keyed on (path, version): a refreshed file gets a new cube, and the cube
+# for the previous version falls out of the cache. The version is a content
+# hash, so other processes on the host can load the cube from the disk tier;
+# the column layout is part of the key so entries of an older layout are not
+# reused.
+@cached('aggregate cube', max_entries=2, disk=True)
+def _versioned_cube(path, version, columns, _df):
+    return build_cube(_df)
+
+
+@cached('sql cube', max_entries=2, disk=True)
+def _sql_cube(path, version, columns):
+    from waris import sqlbackend
+
+    return sqlbackend.cube(path)
+
+
+# Build the cube for a new dataset version before it is swapped in
+add_refresh_hook(cube_for)
+
+
+def slice_cube(cube, date_range=None, zones=None, years=None, months=None):
+    """Apply the page filters (date range, zones, years, months) to the cube"""
+    return filter_frame(cube, date_range, zones, years, months)
+
+
+def aggregate(cube, by):
+    """Group the cube by the given keys, turning the stored sums back into means"""
+    grouped = cube.groupby(by)[SUM_MEASURES + MEAN_MEASURES + COUNT_COLUMNS + ['Rows']].sum()
+    for measure, count in zip(MEAN_MEASURES, COUNT_COLUMNS):
+        grouped[measure] = grouped[measure] / grouped[count]
+    return grouped.drop(columns=COUNT_COLUMNS).reset_index()
+
+
+def period_rollup(cube, level='Monthly', by_zone=True):
+    """Roll the cube up to Monthly, Quarterly or Yearly periods with a period-start Date"""
+    keys = PERIOD_KEYS[level] + (['Zone'] if by_zone else [])
+    return add_period_dates(aggregate(cube, keys), level)
+
+
+def add_period_dates(rolled, level):
+    """Add the period-start Date to a Quarterly or Yearly roll-up (Monthly ones already have it)"""
+    if level == 'Quarterly':
+        rolled['Date'] = pd.to_datetime(pd.DataFrame({
+            'year': rolled['Year'],
+            'month': (rolled['Quarter'] - 1) * 3 + 1,
+            'day': 1,
+        }))
+    elif level == 'Yearly':
+        rolled['Date'] = pd.to_datetime(rolled['Year'], format='%Y')
+
+    return rolled
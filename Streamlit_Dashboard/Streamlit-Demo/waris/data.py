@@ -0,0 +1,197 @@
+"""
+WARIS dataset loading shared by every dashboard page
+
+The loaded frame is held as a versioned Dataset per file. The version is a
+hash of the file's bytes; the file's modification time and size (its
+signature) are checked on each call. When the signature changes, the
+current frame keeps being served while a background thread reloads and
+validates the new file, runs the refresh hooks (which pre-build dependent
+caches for the new version) and then swaps the new Dataset in atomically.
+Caches keyed on the version drop the old aggregates by themselves, and the
+optional disk tier (waris.diskcache) lets other processes skip the parse.
+
+Loaders called without a path serve the current tenant's file
+(waris.tenants); with a single tenant that is WARIS_DATA_PATH. Files too
+large to load are streamed into their aggregate cube instead
+(waris.outofcore), and the Dataset then carries that cube. A path may also
+be the root of a partitioned layout (waris.partitions); its manifest then
+stands in for the file, and a new version only reads the new partitions.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+import streamlit as st
+
+from waris import diskcache, partitions, tenants
+from waris.schema import add_derived_columns, validate
+from waris.singleflight import coalesce
+
+logger = logging.getLogger(__name__)
+
+# Repository-level Data/ directory (Streamlit-Demo/waris -> repo root)
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'Data'))
+DATA_PATH = os.environ.get('WARIS_DATA_PATH', os.path.join(DATA_DIR, 'WARIS.csv'))
+
+
+# cube is only set for datasets streamed out of core (waris.outofcore)
+Dataset = namedtuple('Dataset', ['frame', 'version', 'signature', 'loaded_at', 'cube'], defaults=(None,))
+
+_datasets = {}
+_refreshing = set()
+_rejected = {}
+_datasets_lock = threading.Lock()
+_refresh_hooks = []
+
+
+def read_waris(path=DATA_PATH):
+    """Read the WARIS CSV (or Parquet extract, or partitioned root) and add the derived columns used by the pages"""
+    if partitions.is_partitioned(path):
+        return partitions.load(path)
+    df = pd.read_parquet(path) if path.lower().endswith('.parquet') else pd.read_csv(path)
+    validate(df)
+    return add_derived_columns(df)
+
+
+def file_signature(path=DATA_PATH):
+    """Cheap change detector for the file on disk (modification time and size)"""
+    stat = os.stat(partitions.version_file(path))
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def file_digest(path=DATA_PATH, chunk_size=1 << 20):
+    """Content hash of the file, used as the dataset version"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(partitions.version_file(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def add_refresh_hook(hook):
+    """Call hook(path, dataset) for every new version before it is swapped in"""
+    _refresh_hooks.append(hook)
+
+
+@coalesce('dataset')
+def _load_dataset(path):
+    from waris import outofcore
+
+    signature = file_signature(path)
+    version = file_digest(path)
+    # Parsing is not keyed by code, so the disk entries also carry the tier's version
+    disk_key = f'{version}-v{diskcache.CACHE_VERSION}'
+    cube = None
+    if outofcore.should_stream(path):
+        found, cube = diskcache.load('streamed cube', disk_key)
+        if not found:
+            cube = partitions.load(path, stream=True) if partitions.is_partitioned(path) else outofcore.stream_cube(path)
+        df = outofcore.cube_frame(cube)
+    else:
+        found, df = diskcache.load('dataset', disk_key)
+        if not found:
+            df = read_waris(path)
+    if file_signature(path) != signature:
+        raise ValueError("file changed while it was being read")
+    if not found:
+        if cube is None:
+            diskcache.store('dataset', disk_key, df)
+        else:
+            diskcache.store('streamed cube', disk_key, cube)
+
+    dataset = Dataset(df, version, signature, time.time(), cube)
+    # Hooks fill the caches of the tenant owning the file, also from the refresh thread
+    with tenants.use(tenants.tenant_for_path(path) or tenants.current_name()):
+        for hook in _refresh_hooks:
+            try:
+                hook(path, dataset)
+            except Exception as e:
+                logger.error("Refresh hook failed for %s: %s", path, e)
+    return dataset
+
+
+def _refresh(path, signature):
+    try:
+        dataset = _load_dataset(path)
+    except Exception as e:
+        # Keep serving the current version; only retry once the file changes again
+        logger.warning("Refresh of %s failed, keeping the current version: %s", path, e)
+        with _datasets_lock:
+            _rejected[path] = signature
+            _refreshing.discard(path)
+        return
+    except BaseException:
+        with _datasets_lock:
+            _refreshing.discard(path)
+        raise
+
+    # Swap before clearing the flag, under one lock: a reader in between would
+    # see the old signature with no refresh running and start another reload
+    with _datasets_lock:
+        _datasets[path] = dataset
+        _refreshing.discard(path)
+    logger.info("Swapped in %s version %s", path, dataset.version)
+
+
+def get_dataset(path=None):
+    """Current Dataset for path, refreshing it in the background when the file changes
+
+    Only the very first load of a file blocks; after that callers always get
+    the version already in memory. Without a path, the current tenant's file.
+    """
+    path = path or tenants.current_path()
+    with _datasets_lock:
+        current = _datasets.get(path)
+    if current is None:
+        dataset = _load_dataset(path)
+        with _datasets_lock:
+            return _datasets.setdefault(path, dataset)
+
+    try:
+        signature = file_signature(path)
+    except OSError:
+        # The file is being replaced or was removed - keep the current version
+        return current
+
+    with _datasets_lock:
+        stale = signature != current.signature and _rejected.get(path) != signature
+        if stale and path not in _refreshing:
+            _refreshing.add(path)
+            threading.Thread(
+                target=_refresh, args=(path, signature), name='waris-refresh', daemon=True
+            ).start()
+    return current
+
+
+def served_frames():
+    """Frames (and streamed cubes) of every dataset currently being served (shared by all sessions)"""
+    with _datasets_lock:
+        return [frame for dataset in _datasets.values()
+                for frame in (dataset.frame, dataset.cube) if frame is not None]
+
+
+def dataset_version(path=None):
+    """Version of the dataset currently being served"""
+    return get_dataset(path).version
+
+
+def load_dataset(path=None):
+    """Current Dataset, or an empty one after reporting the error on the page"""
+    try:
+        return get_dataset(path)
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return Dataset(pd.DataFrame(), None, None, None)
+
+
+def load_data(path=None):
+    """Load and preprocess the WARIS dataset
+
+    The frame is shared by every session; treat it as read-only.
+    """
+    return load_dataset(path).frame
@@ -0,0 +1,193 @@
+"""
+Optional on-disk cache tier shared by every Streamlit process on a host
+
+Set WARIS_DISK_CACHE_DIR to turn it on. Entries are stored under
+content-addressed keys (a hash of the function and the content of its
+arguments, or of the data file's bytes), so every replica computes the same
+key for the same inputs and reuses what another replica already wrote. A new
+replica therefore starts hot.
+
+DataFrames are written as Arrow IPC files and read back through a memory map;
+other values (figures, small results) are pickled and also read through a
+memory map. Writes go to a temporary file in the same directory and are
+renamed into place, so readers never see a partial entry.
+
+    WARIS_DISK_CACHE_DIR   cache directory (unset: tier disabled)
+    WARIS_DISK_CACHE_MB    size budget, oldest entries pruned first (default 1024)
+
+Entries outlive deploys. Keys of @cached(disk=True) functions include their
+bytecode, and every key includes CACHE_VERSION: bump it when a change the
+bytecode does not show (a helper a cached function calls, how the data file
+is parsed, the layout of a stored value) makes the entries on disk stale.
+
+Pruning walks the whole directory, so it runs every PRUNE_EVERY writes or
+PRUNE_SECONDS after the last prune, not after every write; the tier can go
+over its budget by that many entries in between.
+
+Only point it at a directory the dashboard processes own: entries are
+unpickled on load.
+"""
+
+import logging
+import mmap
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get('WARIS_DISK_CACHE_DIR') or None
+BUDGET_BYTES = int(float(os.environ.get('WARIS_DISK_CACHE_MB', 1024)) * 1024 * 1024)
+# Part of every key: bump to orphan the entries written by earlier code
+CACHE_VERSION = 1
+PRUNE_EVERY = 32
+PRUNE_SECONDS = 60
+
+_stats = {}
+_stats_lock = threading.Lock()
+_prune_state = {'writes': 0, 'last': time.monotonic()}
+
+
+def enabled():
+    """Whether the disk tier is configured"""
+    return CACHE_DIR is not None
+
+
+def _count(cache, counter):
+    with _stats_lock:
+        stats = _stats.setdefault(cache, {'hits': 0, 'misses': 0, 'writes': 0, 'errors': 0})
+        stats[counter] += 1
+
+
+def _entry_dir(cache):
+    return os.path.join(CACHE_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '-', cache))
+
+
+def _read_arrow(path):
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def _read_pickle(path):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return pickle.loads(mapped)
+
+
+def load(cache, key):
+    """Return (found, value) for key in the named cache"""
+    if not enabled():
+        return False, None
+    base = os.path.join(_entry_dir(cache), key)
+    for suffix, reader in (('.arrow', _read_arrow), ('.pkl', _read_pickle)):
+        path = base + suffix
+        if not os.path.exists(path):
+            continue
+        try:
+            value = reader(path)
+        except Exception as e:
+            logger.warning("Dropping unreadable disk cache entry %s: %s", path, e)
+            _count(cache, 'errors')
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            break
+        _count(cache, 'hits')
+        return True, value
+    _count(cache, 'misses')
+    return False, None
+
+
+def _write_arrow(value, f):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(value)
+    with pa.ipc.new_file(f, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _write_pickle(value, f):
+    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def store(cache, key, value):
+    """Write value for key atomically; failures are logged, never raised"""
+    if not enabled():
+        return
+    entry_dir = _entry_dir(cache)
+    os.makedirs(entry_dir, exist_ok=True)
+
+    writers = [('.pkl', _write_pickle)]
+    if isinstance(value, pd.DataFrame):
+        writers.insert(0, ('.arrow', _write_arrow))
+
+    for suffix, writer in writers:
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix='.tmp-', suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(value, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(entry_dir, key + suffix))
+        except Exception as e:
+            os.unlink(tmp_path)
+            logger.debug("Could not write %s%s for %s: %s", key, suffix, cache, e)
+            continue
+        _count(cache, 'writes')
+        if _prune_due():
+            prune()
+        return
+    _count(cache, 'errors')
+
+
+def _prune_due():
+    """Whether this write should prune: every PRUNE_EVERY writes or PRUNE_SECONDS"""
+    with _stats_lock:
+        _prune_state['writes'] += 1
+        now = time.monotonic()
+        if _prune_state['writes'] < PRUNE_EVERY and now - _prune_state['last'] < PRUNE_SECONDS:
+            return False
+        _prune_state['writes'], _prune_state['last'] = 0, now
+        return True
+
+
+def prune(budget_bytes=None):
+    """Delete the least recently written entries until the tier fits its budget"""
+    if not enabled():
+        return
+    budget_bytes = BUDGET_BYTES if budget_bytes is None else budget_bytes
+    entries = []
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            if name.startswith('.tmp-'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def stats():
+    """Per-cache disk counters as a DataFrame, one row per named cache"""
+    with _stats_lock:
+        rows = [dict(cache=name, **counters) for name, counters in _stats.items()]
+    return pd.DataFrame(rows, columns=['cache', 'hits', 'misses', 'writes', 'errors'])
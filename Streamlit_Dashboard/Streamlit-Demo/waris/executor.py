@@ -0,0 +1,202 @@
+"""
+Bounded process pool for CPU-heavy analytics
+
+Correlation matrices, trendline fits and forecasts run in worker processes
+instead of the session's script thread, so one heavy computation does not
+stall every other session on the same server. Submitted tasks are keyed by
+function and arguments: identical requests share one Future, and finished
+Futures stay in a small LRU so results come back from the cache.
+task_stats() counts how many submissions were coalesced onto a running
+task or served from a finished one.
+
+Workers are started by a forkserver (spawn where there is none), never
+forked from the multithreaded server, and import only the modules of the
+functions they run: waris.analytics and waris.fitting, which leave out
+Streamlit and the caches.
+"""
+
+import hashlib
+import importlib.machinery
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import types
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+import pandas as pd
+import streamlit as st
+
+MAX_WORKERS = int(os.environ.get('WARIS_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_TASKS = 64
+POLL_SECONDS = 1.0
+PRELOAD = ['waris.analytics', 'waris.fitting']
+
+_pool = None
+_pool_lock = threading.Lock()
+_tasks = OrderedDict()
+_tasks_lock = threading.Lock()
+_stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'cached': 0}
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(PRELOAD)
+            else:
+                context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _pool
+
+
+# Stands in for __main__ while workers start: Streamlit installs the page
+# script as __main__, and a new worker would re-run it to rebuild __main__.
+# A module named '__main__' is never re-imported by multiprocessing.
+_blank_main = types.ModuleType('__main__')
+_blank_main.__spec__ = importlib.machinery.ModuleSpec('__main__', None)
+
+
+def _pool_submit(func, *args):
+    """Submit to the pool; workers it starts do not run the page script"""
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = _blank_main
+    try:
+        return get_pool().submit(func, *args)
+    finally:
+        # A rerun may have installed its own script meanwhile; keep that one
+        if sys.modules['__main__'] is _blank_main:
+            sys.modules['__main__'] = main
+
+
+def _fingerprint(value, digest):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(pickle.dumps(value.columns if isinstance(value, pd.DataFrame) else value.name))
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _fingerprint(item, digest)
+    else:
+        digest.update(pickle.dumps(value))
+
+
+def task_key(func, *args):
+    """Stable key for func(*args), hashing DataFrames by content"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{func.__module__}.{func.__qualname__}'.encode())
+    _fingerprint(args, digest)
+    return digest.hexdigest()
+
+
+def submit(func, *args):
+    """Return the Future for func(*args), starting it in the pool at most once"""
+    key = task_key(func, *args)
+    with _tasks_lock:
+        _stats['calls'] += 1
+        future = _tasks.get(key)
+        if future is not None and not (future.done() and future.exception() is not None):
+            _stats['cached' if future.done() else 'coalesced'] += 1
+            _tasks.move_to_end(key)
+            return future
+
+        _stats['executions'] += 1
+        future = _pool_submit(func, *args)
+        _tasks[key] = future
+
+        # Keep the result cache bounded, dropping the oldest finished tasks
+        for old_key in list(_tasks):
+            if len(_tasks) <= MAX_TASKS:
+                break
+            if _tasks[old_key].done():
+                del _tasks[old_key]
+    return future
+
+
+def task_stats():
+    """Submission counters, plus the number of tasks still in flight"""
+    with _tasks_lock:
+        in_flight = sum(not future.done() for future in _tasks.values())
+        return dict(_stats, in_flight=in_flight)
+
+
+def pending_tasks():
+    """Futures that are still queued or running"""
+    with _tasks_lock:
+        return [future for future in _tasks.values() if not future.done()]
+
+
+def wait_for_pending(timeout=None):
+    """Block until every submitted task has finished (used by the warm-up)"""
+    return wait(pending_tasks(), timeout=timeout)
+
+
+def gather(futures):
+    """One Future resolving to {name: result} once every Future in the dict is done"""
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def _done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [future.exception() for future in futures.values() if future.exception() is not None]
+        if errors:
+            combined.set_exception(errors[0])
+        else:
+            combined.set_result({name: future.result() for name, future in futures.items()})
+
+    if not futures:
+        combined.set_result({})
+    for future in futures.values():
+        future.add_done_callback(_done)
+    return combined
+
+
+def then(future, func):
+    """Future for func(result) once future is done; errors propagate unchanged"""
+    chained = Future()
+
+    def _done(done):
+        if done.exception() is not None:
+            chained.set_exception(done.exception())
+            return
+        try:
+            chained.set_result(func(done.result()))
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(_done)
+    return chained
+
+
+def show_when_ready(future, render, message="⏳ Computing..."):
+    """Render an offloaded result, showing a placeholder until it is ready
+
+    While the task runs, only this fragment polls; the rest of the page stays
+    interactive. Once the result lands, one full rerun re-registers the
+    fragment without the polling interval.
+    """
+    polling = not future.done()
+
+    @st.fragment(run_every=POLL_SECONDS if polling else None)
+    def _section():
+        if not future.done():
+            st.info(message)
+            return
+        if polling:
+            # The result just landed - rerun once so the fragment stops polling
+            st.rerun()
+        if future.exception() is not None:
+            st.error(f"Computation failed: {future.exception()}")
+            return
+        render(future.result())
+
+    _section()
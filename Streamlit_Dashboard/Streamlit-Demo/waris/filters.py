@@ -0,0 +1,97 @@
+"""
+Filter engine shared by every dashboard script
+
+All the dashboards narrow the data the same way: a date range, a list of
+zones (where 'All' means every zone), years and month names. The same
+mask works on the row-level frame and on the aggregate cube, which carry
+the same Date, Zone, Year and Month_Name columns. Dates are compared as
+timestamps rather than converting every row to a Python date.
+
+``load_filtered`` returns the filtered rows of the served dataset, cached
+per dataset version and filter combination, so every session and page
+asking for the same view shares one result. Filtered frames are shared
+between sessions, not copied; treat them as read-only. With
+WARIS_BACKEND=duckdb the filters run as SQL over the file instead
+(waris.sqlbackend).
+"""
+
+import pandas as pd
+
+from waris.cache import cached
+from waris import tenants
+from waris.data import load_dataset
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+def month_name(value):
+    """Full month name (as in Month_Name) for a name, a three-letter abbreviation or a number 1-12
+
+    Raises ValueError for anything else, which would otherwise match no row.
+    """
+    text = str(value).strip()
+    if text.isdigit() and 1 <= int(text) <= 12:
+        return MONTH_NAMES[int(text) - 1]
+    for name in MONTH_NAMES:
+        if text.lower() in (name.lower(), name[:3].lower()):
+            return name
+    raise ValueError(f"unknown month {value!r}: use a month name, its abbreviation or a number 1-12")
+
+
+def filter_mask(frame, date_range=None, zones=None, years=None, months=None):
+    """Boolean mask of the rows inside the date range and the selected zones, years and months"""
+    mask = pd.Series(True, index=frame.index)
+
+    if date_range is not None and len(date_range) == 2:
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+        mask &= frame['Date'].between(start, end)
+
+    if zones is not None and 'All' not in zones:
+        mask &= frame['Zone'].isin(zones)
+
+    if years:
+        mask &= frame['Year'].isin(years)
+
+    if months:
+        mask &= frame['Month_Name'].isin(months)
+
+    return mask
+
+
+def filter_frame(frame, date_range=None, zones=None, years=None, months=None):
+    """Rows of frame passing the filters (the frame itself when nothing is filtered out)"""
+    mask = filter_mask(frame, date_range, zones, years, months)
+    return frame if mask.all() else frame[mask]
+
+
+def load_filtered(date_range=None, zones=None, years=None, months=None, path=None):
+    """Filtered rows of the dataset version currently being served"""
+    path = path or tenants.current_path()
+    dataset = load_dataset(path)
+    if dataset.frame.empty:
+        return dataset.frame
+    # Order doesn't change the result, so equal selections share a cache entry
+    selection = (
+        tuple(date_range) if date_range is not None and len(date_range) == 2 else None,
+        tuple(sorted(zones)) if zones is not None else None,
+        tuple(sorted(years)) if years else None,
+        tuple(sorted(months)) if months else None,
+    )
+    from waris import sqlbackend
+
+    if sqlbackend.enabled() and dataset.cube is None:
+        return _sql_filtered_rows(path, dataset.version, *selection)
+    return _filtered_rows(path, dataset.version, *selection, dataset.frame)
+
+
+@cached('filtered rows', max_entries=32)
+def _filtered_rows(path, version, date_range, zones, years, months, _df):
+    return filter_frame(_df, date_range, zones, years, months)
+
+
+@cached('sql rows', max_entries=32)
+def _sql_filtered_rows(path, version, date_range, zones, years, months):
+    from waris import sqlbackend
+
+    return sqlbackend.rows(path, date_range, zones, years, months)
@@ -0,0 +1,141 @@
+"""
+Model fits that run in the process pool
+
+The per-zone statsmodels fits and the warm starts of both models. Kept free
+of Streamlit and the caches (numpy and waris.holtwinters only; statsmodels is
+imported by the fits themselves), so pool workers started with forkserver or
+spawn import these functions without loading the app. waris.forecast submits
+them and caches their results.
+
+    WARIS_FORECAST_DRIFT    mean squared forecast error on appended months, in
+                            squared sigmas, above which a zone is refitted (default 4)
+"""
+
+import os
+import warnings
+
+import numpy as np
+
+from waris.holtwinters import SEASON_LENGTH, fit_batch, merge, take, update
+
+MIN_MONTHS = 4
+DRIFT_THRESHOLD = float(os.environ.get('WARIS_FORECAST_DRIFT', 4.0))
+
+ETS_PARAMS = [
+    'smoothing_level', 'smoothing_trend', 'smoothing_seasonal',
+    'initial_level', 'initial_trend', 'initial_seasons',
+]
+
+
+def fit_zone(values, method):
+    """Fit one zone's model and return its parameters (run in the process pool)"""
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    values = np.asarray(values, dtype=float)
+    if len(values) < MIN_MONTHS:
+        return None
+    seasonal = len(values) >= 2 * SEASON_LENGTH
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if method == 'SARIMA':
+            order = (1, 1, 1)
+            seasonal_order = (0, 1, 1, SEASON_LENGTH) if seasonal else (0, 0, 0, 0)
+            fit = SARIMAX(values, order=order, seasonal_order=seasonal_order).fit(disp=False)
+            return {
+                'method': method,
+                'order': order,
+                'seasonal_order': seasonal_order,
+                'params': np.asarray(fit.params),
+            }
+
+        fit = ExponentialSmoothing(
+            values,
+            trend='add',
+            seasonal='add' if seasonal else None,
+            seasonal_periods=SEASON_LENGTH if seasonal else None,
+            initialization_method='estimated',
+        ).fit()
+        return {
+            'method': method,
+            'seasonal': seasonal,
+            'params': {name: fit.params[name] for name in ETS_PARAMS},
+            'sigma': float(np.std(fit.resid)),
+        }
+
+
+def forecast_zone(values, model, horizon):
+    """Forecast one zone from fitted parameters: (mean, lower, upper) arrays"""
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    values = np.asarray(values, dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        if model['method'] == 'SARIMA':
+            results = SARIMAX(
+                values, order=model['order'], seasonal_order=model['seasonal_order']
+            ).smooth(model['params'])
+            prediction = results.get_forecast(horizon)
+            interval = np.asarray(prediction.conf_int(alpha=0.05))
+            return np.asarray(prediction.predicted_mean), interval[:, 0], interval[:, 1]
+
+        params = model['params']
+        seasonal = model['seasonal']
+        fit = ExponentialSmoothing(
+            values,
+            trend='add',
+            seasonal='add' if seasonal else None,
+            seasonal_periods=SEASON_LENGTH if seasonal else None,
+            initialization_method='known',
+            initial_level=params['initial_level'],
+            initial_trend=params['initial_trend'],
+            initial_seasonal=params['initial_seasons'] if seasonal else None,
+        ).fit(
+            smoothing_level=params['smoothing_level'],
+            smoothing_trend=params['smoothing_trend'],
+            smoothing_seasonal=params['smoothing_seasonal'] if seasonal else None,
+            optimized=False,
+        )
+        mean = np.asarray(fit.forecast(horizon))
+        spread = 1.96 * model['sigma'] * np.sqrt(np.arange(1, horizon + 1))
+        return mean, mean - spread, mean + spread
+
+
+def warm_start_zone(values, model, known_months, method):
+    """Reuse a zone's fitted parameters on its extended history unless it drifted
+
+    Returns (model, refitted). The previous model forecasts the months added
+    since it was fitted; if their mean squared error, in units of the
+    forecast's standard error, exceeds DRIFT_THRESHOLD the zone is refitted.
+    """
+    values = np.asarray(values, dtype=float)
+    seasonal = len(values) >= 2 * SEASON_LENGTH
+    if model is None or len(values) < known_months or seasonal != (known_months >= 2 * SEASON_LENGTH):
+        return fit_zone(values, method), True
+    new = values[known_months:]
+    if not len(new):
+        return model, False
+
+    mean, lower, upper = forecast_zone(values[:known_months], model, len(new))
+    scale = (upper - lower) / (2 * 1.96)
+    drift = np.mean(((new - mean) / scale) ** 2)
+    if not drift <= DRIFT_THRESHOLD:
+        return fit_zone(values, method), True
+    return model, False
+
+
+def warm_start_batch(fit, Y, rows, force):
+    """Extend a batch fit over appended months, refitting new and drifted zones
+
+    rows maps each zone of Y to its row in fit (-1 for new zones); force marks
+    zones whose earlier history changed. Returns (fit, refitted mask).
+    """
+    Y = np.asarray(Y, dtype=float)
+    updated, drift = update(take(fit, rows), Y[:, fit.months:])
+    with np.errstate(invalid='ignore'):
+        refit = force | (drift > DRIFT_THRESHOLD)
+    if refit.any():
+        updated = merge(updated, refit, fit_batch(Y[refit]))
+    return updated, refit
@@ -0,0 +1,268 @@
+"""
+Per-zone forecasting for revenue, expenditure and collection efficiency
+
+The default model is the vectorized Holt-Winters in waris.holtwinters, fitted
+for all zones at once as a single pool task. The statsmodels models (additive
+Holt-Winters exponential smoothing or seasonal ARIMA) are fitted once per zone
+in the process pool, in parallel across zones; the pool tasks live in
+waris.fitting. Only the fitted parameters are kept, cached by dataset version
+(in memory and in the optional disk tier), so showing a forecast re-runs the
+model's filter with fixed parameters instead of refitting it.
+
+When a new month arrives, fits are warm-started from the state persisted for
+the previous version: level, trend and season are carried forward over the
+appended months and only new, revised or drifting zones are refitted.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from waris import diskcache, tenants
+from waris.cache import cached, code_version, manager
+from waris.cube import MEAN_MEASURES, cube_for, period_rollup
+from waris.data import add_refresh_hook
+from waris.executor import gather, submit, task_key, then
+from waris.fitting import forecast_zone, warm_start_batch, warm_start_zone
+from waris.holtwinters import SEASON_LENGTH, batch_forecast, fit_batch
+
+FORECAST_METRICS = [
+    'Total Operating Revenues',
+    'Total Operating Expenditures',
+    'Collection Efficiency',
+]
+BATCH_METHOD = 'Holt-Winters (batch)'
+FORECAST_METHODS = [BATCH_METHOD, 'Exponential Smoothing', 'SARIMA']
+
+# Warm starts: full refit after this many appended months (per-zone drift: waris.fitting)
+REFIT_MONTHS = int(os.environ.get('WARIS_FORECAST_REFIT_MONTHS', 12))
+
+
+def zone_matrix(monthly, metric):
+    """Months x zones matrix of one metric on a regular monthly index
+
+    Gaps inside a zone's history are interpolated; months before a zone's
+    first or after its last observation stay NaN.
+    """
+    matrix = monthly.pivot_table(index='Date', columns='Zone', values=metric)
+    matrix = matrix.asfreq('MS')
+    return matrix.interpolate(limit_area='inside')
+
+
+def _digest(values):
+    return hashlib.blake2b(np.ascontiguousarray(values, dtype=float).tobytes(), digest_size=16).hexdigest()
+
+
+def _state_key(metric, method, tenant):
+    return task_key(_state_key, metric, method, tenant, diskcache.CACHE_VERSION)
+
+
+def load_state(metric, method, tenant=None):
+    """Persisted warm-start state for one metric and model of the (current) tenant, or None"""
+    tenant = tenant or tenants.current_name()
+    key = _state_key(metric, method, tenant)
+    found, state = manager.get('forecast state', key, tenant=tenant)
+    if not found:
+        found, state = diskcache.load('forecast state', key)
+        if found:
+            manager.put('forecast state', key, state, tenant=tenant)
+    return state if found else None
+
+
+def forecast_status(metric, method):
+    """How the latest fit for a metric and model was produced, or None"""
+    state = load_state(metric, method)
+    if state is None:
+        return None
+    return dict(state['update'], version=state['version'], months=state['months'])
+
+
+def _save_state(metric, method, state, tenant):
+    key = _state_key(metric, method, tenant)
+    manager.put('forecast state', key, state, tenant=tenant)
+    diskcache.store('forecast state', key, state)
+    with _tracked_lock:
+        _tracked.add((tenant, metric, method))
+
+
+_tracked = set()
+_tracked_lock = threading.Lock()
+
+
+def _batch_task(state, matrix):
+    """Pool task (and months appended) for the batch model: warm start or full fit"""
+    Y = matrix.to_numpy().T
+    months = len(matrix)
+    if state is None or state['start'] != matrix.index[0] or months < state['months'] \
+            or months - state['refit_months'] >= REFIT_MONTHS \
+            or (months >= 2 * SEASON_LENGTH) != (state['months'] >= 2 * SEASON_LENGTH):
+        return then(submit(fit_batch, Y), lambda fit: (fit, np.ones(len(Y), dtype=bool))), True
+
+    previous = {zone: row for row, zone in enumerate(state['zones'])}
+    rows = np.array([previous.get(zone, -1) for zone in matrix.columns])
+    known = state['months']
+    force = np.array([
+        row < 0 or state['digests'][row] != _digest(Y[i, :known])
+        for i, row in enumerate(rows)
+    ])
+    return submit(warm_start_batch, state['models'], Y, rows, force), False
+
+
+def fit_models(matrix, metric, method, version):
+    """Future for the fitted models, cached by dataset version
+
+    For the batch method this is one BatchFit covering every zone, fitted as
+    a single pool task. Otherwise it is {zone: fitted parameters}: every zone
+    is submitted to the process pool as its own task and the combined result
+    is stored once all of them have finished.
+
+    Fits are warm-started from the state persisted for the previous version:
+    when months were only appended, the stored state is carried forward over
+    the new months and only new, revised or drifting zones are refitted. A
+    full refit happens every REFIT_MONTHS appended months.
+    """
+    # _finish runs on a pool callback thread; keep the caller's tenant
+    tenant = tenants.current_name()
+    key = task_key(fit_models, version, metric, method, code_version(fit_models))
+    found, models = manager.get('forecast models', key, tenant=tenant)
+    if not found:
+        found, models = diskcache.load('forecast models', key)
+        if found:
+            manager.put('forecast models', key, models, tenant=tenant)
+    if found:
+        future = Future()
+        future.set_result(models)
+        return future
+
+    state = load_state(metric, method, tenant)
+    months = len(matrix)
+    if method == BATCH_METHOD:
+        task, full = _batch_task(state, matrix)
+    else:
+        full = state is None or months - state['refit_months'] >= REFIT_MONTHS
+        previous = {} if full else state['models']
+        known = {} if full else state['lengths']
+        digests = {} if full else state['digests']
+        series = {zone: matrix[zone].dropna().to_numpy() for zone in matrix.columns}
+        task = gather({
+            zone: submit(
+                warm_start_zone, values,
+                previous.get(zone) if digests.get(zone) == _digest(values[:known.get(zone, 0)]) else None,
+                known.get(zone, 0), method,
+            )
+            for zone, values in series.items()
+        })
+
+    def _finish(result):
+        if method == BATCH_METHOD:
+            models, refit = result
+            Y = matrix.to_numpy().T
+            lengths = [months] * len(Y)
+            digests = [_digest(row) for row in Y]
+        else:
+            models = {zone: model for zone, (model, _) in result.items()}
+            refit = np.array([refitted for _, refitted in result.values()])
+            lengths = {zone: len(values) for zone, values in series.items()}
+            digests = {zone: _digest(values) for zone, values in series.items()}
+
+        appended = months - state['months'] if state is not None and not full else 0
+        _save_state(metric, method, {
+            'version': version,
+            'start': matrix.index[0],
+            'months': months,
+            'zones': list(matrix.columns),
+            'lengths': lengths,
+            'digests': digests,
+            'models': models,
+            'refit_months': months if full else state['refit_months'],
+            'update': {
+                'mode': 'full refit' if full else 'incremental',
+                'appended_months': appended,
+                'refit_zones': int(np.sum(refit)),
+                'zones': len(matrix.columns),
+            },
+        }, tenant)
+        manager.put('forecast models', key, models, tenant=tenant)
+        diskcache.store('forecast models', key, models)
+        return models
+
+    return then(task, _finish)
+
+
+def refresh_forecasts(path, dataset):
+    """Bring every forecast with persisted state up to date with a new dataset version
+
+    Registered as a dataset refresh hook: the (mostly incremental) fits are
+    submitted before the new version is swapped in, so the forecast view is
+    current within seconds of a data drop. Hooks run as the file's tenant,
+    so only that tenant's forecasts are refitted.
+    """
+    tenant = tenants.current_name()
+    with _tracked_lock:
+        tracked = [(metric, method) for owner, metric, method in _tracked if owner == tenant]
+    if not tracked:
+        return
+    monthly = period_rollup(cube_for(path, dataset), 'Monthly')
+    for metric, method in tracked:
+        fit_models(zone_matrix(monthly, metric), metric, method, dataset.version)
+
+
+add_refresh_hook(refresh_forecasts)
+
+
+@cached('forecasts')
+def forecast_frame(version, metric, method, horizon, _matrix, _models):
+    """Actual history plus forecast and 95% interval for every zone, in long form"""
+    history = _matrix.stack().dropna().rename(metric).reset_index()
+    history['Series'] = 'Actual'
+
+    if method == BATCH_METHOD:
+        zones = list(_matrix.columns)
+        mean, lower, upper = batch_forecast(_models, horizon)
+        dates = np.tile(pd.date_range(_matrix.index[-1], periods=horizon + 1, freq='MS')[1:], len(zones))
+    else:
+        zones, dates, bands = [], [], []
+        for zone in _matrix.columns:
+            model = _models.get(zone)
+            if model is None:
+                continue
+            series = _matrix[zone].dropna()
+            zones.append(zone)
+            dates.append(pd.date_range(series.index[-1], periods=horizon + 1, freq='MS')[1:])
+            bands.append(forecast_zone(series.to_numpy(), model, horizon))
+        if not zones:
+            return history
+        dates = np.concatenate(dates)
+        mean, lower, upper = (np.stack(band) for band in zip(*bands))
+
+    forecast = pd.DataFrame({
+        'Date': dates,
+        'Zone': np.repeat(zones, horizon),
+        'Series': 'Forecast',
+        metric: mean.ravel(),
+        'Lower': lower.ravel(),
+        'Upper': upper.ravel(),
+    }).dropna(subset=[metric])
+    return pd.concat([history, forecast], ignore_index=True)
+
+
+def forecast_summary(forecasts, metric, horizon):
+    """Last year's actuals against the forecast horizon, per zone"""
+    how = 'mean' if metric in MEAN_MEASURES else 'sum'
+    actual = forecasts[forecasts['Series'] == 'Actual']
+    recent = actual.groupby('Zone').tail(SEASON_LENGTH).groupby('Zone')[metric].agg(how)
+    ahead = forecasts[forecasts['Series'] == 'Forecast'].groupby('Zone')[metric].agg(how)
+    summary = pd.DataFrame({
+        f'Last {SEASON_LENGTH} Months ({how})': recent,
+        f'Next {horizon} Months ({how})': ahead,
+    })
+    if how == 'sum':
+        # Compare like with like: scale last year's total to the horizon
+        summary['Change (%)'] = (ahead / (recent * horizon / SEASON_LENGTH) - 1) * 100
+    else:
+        summary['Change (%)'] = (ahead / recent - 1) * 100
+    return summary.round(2).reset_index()
@@ -0,0 +1,211 @@
+"""
+Vectorized additive Holt-Winters for every zone at once
+
+The recursions run on a (zones x months) matrix: one Python loop over time,
+with every zone - and every candidate parameter set during the search -
+updated as array operations. Missing months are handled by substituting the
+one-step forecast for the observation, which leaves level, trend and season
+unchanged and adds nothing to the error.
+
+A fit is also a resumable state: update() continues the recursions over
+newly appended months with the fitted parameters, without a new search.
+"""
+
+import itertools
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+SEASON_LENGTH = 12
+
+# Coarse grid for the batched parameter search, refined around each zone's best
+ALPHAS = [0.05, 0.2, 0.35, 0.5, 0.65, 0.8, 0.95]
+BETAS = [0.0, 0.05, 0.1, 0.2, 0.35]
+GAMMAS = [0.0, 0.1, 0.2, 0.35, 0.5]
+
+BatchFit = namedtuple('BatchFit', [
+    'params',     # (zones, 3) alpha, beta, gamma
+    'level',      # (zones,) level after the last month
+    'trend',      # (zones,) trend after the last month
+    'season',     # (zones, season_length) seasonal slot j applies to months t with t % m == j
+    'sse',        # (zones,) sum of squared one-step errors
+    'observed',   # (zones,) number of observed (non-missing) months
+    'fitted',     # (zones, months) one-step-ahead fitted values
+    'months',     # number of months fitted
+])
+
+
+def initial_state(Y, season_length=SEASON_LENGTH):
+    """Classical start values (level, trend, seasonals) and whether a season is fitted
+
+    Uses the means of the first two seasons when there are at least two full
+    seasons, otherwise a non-seasonal start from the first observations.
+    """
+    Y = np.asarray(Y, dtype=float)
+    zones, months = Y.shape
+    seasonal = months >= 2 * season_length
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        fallback = np.nanmean(Y, axis=1)
+        if seasonal:
+            first = np.nanmean(Y[:, :season_length], axis=1)
+            second = np.nanmean(Y[:, season_length:2 * season_length], axis=1)
+            trend = (second - first) / season_length
+            trend = np.where(np.isnan(trend), 0.0, trend)
+            # Level one month before the first observation (first is centred mid-season)
+            level = first - trend * (season_length + 1) / 2
+            seasonals = Y[:, :season_length] - first[:, None]
+            seasonals = np.where(np.isnan(seasonals), 0.0, seasonals)
+            seasonals -= seasonals.mean(axis=1, keepdims=True)
+        else:
+            level = Y[:, 0]
+            trend = Y[:, 1] - Y[:, 0] if months > 1 else np.zeros(zones)
+            trend = np.where(np.isnan(trend), 0.0, trend)
+            seasonals = np.zeros((zones, season_length))
+
+    level = np.where(np.isnan(level), fallback, level)
+    return level, trend, seasonals, seasonal
+
+
+def run(Y, alpha, beta, gamma, level, trend, seasonals, keep_fitted=False):
+    """Run the additive recursions for every zone and parameter set
+
+    alpha, beta and gamma broadcast against (zones,), e.g. shape (sets, 1)
+    for one grid shared by all zones or (sets, zones) for per-zone grids.
+    Returns (level, trend, season, sse, fitted) with that broadcast shape.
+    """
+    Y = np.asarray(Y, dtype=float)
+    zones, months = Y.shape
+    season_length = seasonals.shape[-1]
+    shape = np.broadcast_shapes(np.shape(alpha), np.shape(beta), np.shape(gamma), (zones,))
+
+    l = np.broadcast_to(level, shape).copy()
+    b = np.broadcast_to(trend, shape).copy()
+    s = np.broadcast_to(seasonals, shape + (season_length,)).copy()
+    sse = np.zeros(shape)
+    fitted = np.empty(shape + (months,)) if keep_fitted else None
+
+    for t in range(months):
+        j = t % season_length
+        s_j = s[..., j]
+        forecast = l + b + s_j
+        y = Y[:, t]
+        y = np.where(np.isnan(y), forecast, y)
+
+        error = y - forecast
+        new_level = alpha * (y - s_j) + (1 - alpha) * (l + b)
+        s[..., j] = gamma * (y - l - b) + (1 - gamma) * s_j
+        b = beta * (new_level - l) + (1 - beta) * b
+        l = new_level
+
+        sse += error ** 2
+        if keep_fitted:
+            fitted[..., t] = forecast
+
+    return l, b, s, sse, fitted
+
+
+def fit_batch(Y, season_length=SEASON_LENGTH, alphas=ALPHAS, betas=BETAS, gammas=GAMMAS, refine=True):
+    """Fit additive Holt-Winters to every row of a (zones x months) matrix
+
+    Every (alpha, beta, gamma) in the grid is evaluated for every zone in a
+    single pass; with refine, a 3x3x3 grid at half the spacing around each
+    zone's best point is evaluated in a second pass.
+    """
+    Y = np.asarray(Y, dtype=float)
+    zones, months = Y.shape
+    level, trend, seasonals, seasonal = initial_state(Y, season_length)
+    if not seasonal:
+        gammas = [0.0]
+
+    grid = np.array(list(itertools.product(alphas, betas, gammas)))
+    *_, sse, _ = run(Y, grid[:, [0]], grid[:, [1]], grid[:, [2]], level, trend, seasonals)
+    best = grid[np.argmin(sse, axis=0)]
+
+    if refine:
+        steps = np.array([
+            np.diff(sorted(values)).min() / 2 if len(values) > 1 else 0.0
+            for values in (alphas, betas, gammas)
+        ])
+        offsets = np.array(list(itertools.product([-1, 0, 1], repeat=3))) * steps
+        candidates = np.clip(best[None, :, :] + offsets[:, None, :], 0.0, 1.0)
+        candidates[..., 0] = np.clip(candidates[..., 0], 0.01, 1.0)
+        *_, sse, _ = run(
+            Y, candidates[..., 0], candidates[..., 1], candidates[..., 2], level, trend, seasonals
+        )
+        best = candidates[np.argmin(sse, axis=0), np.arange(zones)]
+
+    l, b, s, sse, fitted = run(
+        Y, best[:, 0], best[:, 1], best[:, 2], level, trend, seasonals, keep_fitted=True
+    )
+    return BatchFit(best, l, b, s, sse, (~np.isnan(Y)).sum(axis=1), fitted, months)
+
+
+def sigma(fit):
+    """Root mean squared one-step error per zone"""
+    return np.sqrt(fit.sse / np.maximum(fit.observed, 1))
+
+
+def update(fit, Y_new):
+    """Continue a fit over newly appended months, keeping its parameters
+
+    Returns the extended fit and each zone's drift score: the mean squared
+    one-step error on the new months in units of the fit's sigma (about 1
+    while the model still describes the zone, NaN with no new observations).
+    """
+    Y_new = np.asarray(Y_new, dtype=float)
+    season_length = fit.season.shape[1]
+
+    # run() indexes seasonal slots from its first month; rotate to continue the calendar
+    shift = fit.months % season_length
+    season = np.roll(fit.season, -shift, axis=1)
+    alpha, beta, gamma = fit.params.T
+    l, b, s, sse, fitted = run(Y_new, alpha, beta, gamma, fit.level, fit.trend, season, keep_fitted=True)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        drift = np.nanmean(((Y_new - fitted) / sigma(fit)[:, None]) ** 2, axis=1)
+
+    extended = BatchFit(
+        fit.params, l, b, np.roll(s, shift, axis=1),
+        fit.sse + sse, fit.observed + (~np.isnan(Y_new)).sum(axis=1),
+        np.concatenate([fit.fitted, fitted], axis=1), fit.months + Y_new.shape[1],
+    )
+    return extended, drift
+
+
+def take(fit, rows):
+    """Fit restricted to the given zone rows; a row index of -1 gives an all-NaN zone"""
+    rows = np.asarray(rows)
+    missing = rows < 0
+    fields = {}
+    for name, value in fit._asdict().items():
+        if name == 'months':
+            fields[name] = value
+            continue
+        picked = np.asarray(value, dtype=float)[np.where(missing, 0, rows)]
+        picked[missing] = np.nan
+        fields[name] = picked
+    return BatchFit(**fields)
+
+
+def merge(fit, mask, other):
+    """Copy of fit with the zones selected by mask replaced by the zones of other"""
+    fields = fit._asdict()
+    for name, value in fields.items():
+        if name != 'months':
+            value = value.copy()
+            value[mask] = getattr(other, name)
+            fields[name] = value
+    return BatchFit(**fields)
+
+
+def batch_forecast(fit, horizon):
+    """Forecast every zone horizon months past the fitted period: (mean, lower, upper)"""
+    steps = np.arange(1, horizon + 1)
+    slots = (fit.months + steps - 1) % fit.season.shape[1]
+    mean = fit.level[:, None] + steps * fit.trend[:, None] + fit.season[:, slots]
+    spread = 1.96 * sigma(fit)[:, None] * np.sqrt(steps)
+    return mean, mean - spread, mean + spread
@@ -0,0 +1,172 @@
+"""
+KPI math shared by every dashboard script
+
+The headline KPIs come from per-(Zone, Year) sums: of the (sliced)
+aggregate cube on the pages, or built chunk by chunk when a file is too
+large to load (batch runs). kpi_summary() on a row-level frame gives the
+same numbers. The zone tables and monthly totals are rolled up from the
+cube too, so they cost a pass over zones x months instead of over every row.
+waris.cube is imported by those functions only: batch workers use the KPI
+math without loading Streamlit and the caches.
+"""
+
+from collections import namedtuple
+
+import pandas as pd
+
+# Columns of the zone table, before the derived Net Revenue and Collection Rate
+ZONE_METRICS = [
+    'Total Operating Revenues',
+    'Total Operating Expenditures',
+    'Collection Efficiency',
+    'Operation & Maintenance Cost Coverage',
+    'Total Collection',
+    'Total Billing',
+]
+
+KPIs = namedtuple('KPIs', [
+    'total_revenue', 'total_expenditure', 'net_revenue',
+    'avg_efficiency', 'efficiency_variance',
+    'total_billing', 'total_collection', 'collection_rate',
+    'total_zones', 'avg_revenue_per_zone', 'revenue_growth',
+])
+
+
+def kpi_summary(frame):
+    """Headline KPIs of a filtered row-level frame
+
+    revenue_growth compares the total revenue with the second-to-last year
+    of the selection, as the dashboards always have.
+    """
+    total_revenue = frame['Total Operating Revenues'].sum()
+    total_expenditure = frame['Total Operating Expenditures'].sum()
+    total_billing = frame['Total Billing'].sum()
+    total_collection = frame['Total Collection'].sum()
+    total_zones = frame['Zone'].nunique()
+
+    revenue_growth = 0
+    if len(frame) > 1:
+        yearly_revenue = frame.groupby('Year')['Total Operating Revenues'].sum()
+        prev_period_revenue = yearly_revenue.iloc[-2] if len(yearly_revenue) > 1 else 0
+        if prev_period_revenue > 0:
+            revenue_growth = (total_revenue - prev_period_revenue) / prev_period_revenue * 100
+
+    return KPIs(
+        total_revenue=total_revenue,
+        total_expenditure=total_expenditure,
+        net_revenue=total_revenue - total_expenditure,
+        avg_efficiency=frame['Collection Efficiency'].mean(),
+        efficiency_variance=frame['Collection Efficiency'].std(),
+        total_billing=total_billing,
+        total_collection=total_collection,
+        collection_rate=(total_collection / total_billing * 100) if total_billing > 0 else 0,
+        total_zones=total_zones,
+        avg_revenue_per_zone=total_revenue / total_zones if total_zones > 0 else 0,
+        revenue_growth=revenue_growth,
+    )
+
+
+# Per-(Zone, Year) sums that the headline KPIs can be rebuilt from
+TOTAL_COLUMNS = [
+    'Total Operating Revenues', 'Total Operating Expenditures', 'Total Billing', 'Total Collection',
+    'Efficiency Sum', 'Efficiency Squares', 'Efficiency Count', 'Rows',
+]
+
+
+def kpi_totals(frame):
+    """Per-(Zone, Year) sums of a row-level frame (or chunk); sum them to combine chunks"""
+    efficiency = frame['Collection Efficiency']
+    totals = frame[['Zone', 'Year', 'Total Operating Revenues', 'Total Operating Expenditures',
+                    'Total Billing', 'Total Collection']].assign(**{
+        'Efficiency Sum': efficiency,
+        'Efficiency Squares': efficiency ** 2,
+        'Efficiency Count': efficiency.notna().astype('int64'),
+        'Rows': 1,
+    })
+    return totals.groupby(['Zone', 'Year'])[TOTAL_COLUMNS].sum()
+
+
+def cube_totals(cube):
+    """kpi_totals() of the rows a (sliced) aggregate cube was folded from"""
+    totals = cube.rename(columns={
+        'Collection Efficiency': 'Efficiency Sum',
+        'Collection Efficiency Squares': 'Efficiency Squares',
+        'Collection Efficiency Count': 'Efficiency Count',
+    })
+    return totals.groupby(['Zone', 'Year'])[TOTAL_COLUMNS].sum()
+
+
+def kpi_summary_from_cube(cube):
+    """kpi_summary() of the rows a (sliced) aggregate cube was folded from"""
+    return kpi_summary_from_totals(cube_totals(cube))
+
+
+def kpi_summary_from_totals(totals):
+    """kpi_summary() rebuilt from kpi_totals(), for data that never fits in memory at once"""
+    totals = totals[totals['Rows'] > 0]
+    sums = totals.sum()
+    total_revenue = sums['Total Operating Revenues']
+    total_expenditure = sums['Total Operating Expenditures']
+    total_billing = sums['Total Billing']
+    total_collection = sums['Total Collection']
+    total_zones = totals.index.get_level_values('Zone').nunique()
+
+    count = sums['Efficiency Count']
+    avg_efficiency = sums['Efficiency Sum'] / count if count else float('nan')
+    efficiency_variance = float('nan')
+    if count > 1:
+        variance = (sums['Efficiency Squares'] - sums['Efficiency Sum'] ** 2 / count) / (count - 1)
+        efficiency_variance = max(variance, 0) ** 0.5
+
+    revenue_growth = 0
+    if sums['Rows'] > 1:
+        yearly_revenue = totals.groupby(level='Year')['Total Operating Revenues'].sum()
+        prev_period_revenue = yearly_revenue.iloc[-2] if len(yearly_revenue) > 1 else 0
+        if prev_period_revenue > 0:
+            revenue_growth = (total_revenue - prev_period_revenue) / prev_period_revenue * 100
+
+    return KPIs(
+        total_revenue=total_revenue,
+        total_expenditure=total_expenditure,
+        net_revenue=total_revenue - total_expenditure,
+        avg_efficiency=avg_efficiency,
+        efficiency_variance=efficiency_variance,
+        total_billing=total_billing,
+        total_collection=total_collection,
+        collection_rate=(total_collection / total_billing * 100) if total_billing > 0 else 0,
+        total_zones=total_zones,
+        avg_revenue_per_zone=total_revenue / total_zones if total_zones > 0 else 0,
+        revenue_growth=revenue_growth,
+    )
+
+
+def zone_metrics(cube):
+    """Per-zone performance table (indexed by Zone) from a sliced cube"""
+    from waris.cube import aggregate
+
+    return zone_table(aggregate(cube, 'Zone'))
+
+
+def zone_table(zone_totals):
+    """Per-zone performance table from the cube aggregated by Zone"""
+    metrics = zone_totals.set_index('Zone')[ZONE_METRICS].round(2)
+    metrics['Net Revenue'] = metrics['Total Operating Revenues'] - metrics['Total Operating Expenditures']
+    metrics['Collection Rate'] = (metrics['Total Collection'] / metrics['Total Billing'] * 100).round(2)
+    return metrics
+
+
+def monthly_totals(cube):
+    """Revenue, expenditure, mean collection efficiency and net revenue per month, across zones"""
+    from waris.cube import period_rollup
+
+    rolled = period_rollup(cube, 'Monthly', by_zone=False)
+    monthly = pd.DataFrame({
+        'Year': rolled['Date'].dt.year,
+        'Month': rolled['Date'].dt.month,
+        'Total Operating Revenues': rolled['Total Operating Revenues'],
+        'Total Operating Expenditures': rolled['Total Operating Expenditures'],
+        'Collection Efficiency': rolled['Collection Efficiency'],
+        'Date': rolled['Date'],
+    })
+    monthly['Net Revenue'] = monthly['Total Operating Revenues'] - monthly['Total Operating Expenditures']
+    return monthly
@@ -0,0 +1,236 @@
+"""
+Opt-in per-session memory profiling
+
+When profiling is on, every rerun of a page records, for the session that
+ran it:
+
+- the deep size (``memory_usage(deep=True)`` for frames) of each named
+  DataFrame, Series, Index and array the page holds when it finishes, and
+  of the frames kept in st.session_state (``track_objects(globals())`` at
+  the end of the page), and of the node values its waris.reactive graphs
+  memoize;
+- the memory each ``waris.timing`` section allocated and kept (net) and
+  its high-water mark above its start (peak), from tracemalloc.
+
+Objects that are the served dataset, a cached value or found in more
+than one session are reported as shared, so the per-session footprint only counts
+what each session holds on its own. The admin page shows the sessions,
+their objects and sections, and the top allocating source lines.
+
+tracemalloc traces every allocation in the process, which slows reruns
+noticeably; turn it on while investigating, not in production. Section
+figures are process-wide, so they are approximate while other sessions
+rerun at the same time.
+
+    WARIS_MEMPROFILE          1 to start profiling with the server (default off)
+    WARIS_MEMPROFILE_FRAMES   stack frames kept per allocation (default 1)
+"""
+
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+FRAMES = int(os.environ.get('WARIS_MEMPROFILE_FRAMES', 1))
+MAX_SESSIONS = 200
+SESSION_TTL = 30 * 60
+TRACKED_TYPES = (pd.DataFrame, pd.Series, pd.Index, np.ndarray)
+
+_enabled = False
+_local = threading.local()
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def enable():
+    """Start tracing allocations and recording reruns"""
+    global _enabled
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(FRAMES)
+    _enabled = True
+
+
+def disable():
+    """Stop tracing and drop everything recorded"""
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    with _sessions_lock:
+        _sessions.clear()
+
+
+def active():
+    return _enabled and tracemalloc.is_tracing()
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+def _expire(now):
+    """Forget sessions not seen for SESSION_TTL, and the oldest beyond MAX_SESSIONS"""
+    stale = [sid for sid, record in _sessions.items() if now - record['updated'] > SESSION_TTL]
+    for sid in stale:
+        del _sessions[sid]
+    if len(_sessions) > MAX_SESSIONS:
+        for sid in sorted(_sessions, key=lambda sid: _sessions[sid]['updated'])[:len(_sessions) - MAX_SESSIONS]:
+            del _sessions[sid]
+
+
+def begin(page):
+    """Start recording a rerun of the page for the current session (called by timing.start_run)"""
+    _local.rerun = None
+    if not active():
+        return
+    session_id = _session_id()
+    if session_id is None:
+        return
+    now = time.time()
+    rerun = {'objects': {}, 'sections': [], 'net': 0, 'peak': 0, 'finished': None}
+    with _sessions_lock:
+        _expire(now)
+        record = _sessions.setdefault(session_id, {'pages': {}, 'updated': now})
+        record['pages'][page] = rerun
+        record['updated'] = now
+    _local.rerun = rerun
+    _local.stack = []
+    _local.rerun_frame = open_frame()
+
+
+def end():
+    """Finish the current rerun's record (called by timing.finish_run)"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return
+    rerun['net'], rerun['peak'] = _close(_local.rerun_frame)
+    rerun['finished'] = time.time()
+    _local.rerun = None
+
+
+def open_frame():
+    """Open a memory frame for a section; returns it for close_frame()"""
+    if getattr(_local, 'rerun', None) is None:
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    # Fold the peak so far into the enclosing frames before resetting it for this one
+    for frame in _local.stack:
+        frame[1] = max(frame[1], peak)
+    tracemalloc.reset_peak()
+    frame = [current, current]
+    _local.stack.append(frame)
+    return frame
+
+
+def _close(frame):
+    current, peak = tracemalloc.get_traced_memory()
+    if _local.stack and _local.stack[-1] is frame:
+        _local.stack.pop()
+    return current - frame[0], max(frame[1], peak) - frame[0]
+
+
+def close_frame(name, frame):
+    """Close a frame opened by open_frame() and record it as the named section"""
+    rerun = getattr(_local, 'rerun', None)
+    if frame is None or rerun is None:
+        return
+    net, peak = _close(frame)
+    rerun['sections'].append((name, net, peak))
+
+
+def track_objects(namespace):
+    """Record the deep size of each DataFrame/Series/Index/array in the namespace and session state"""
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return
+    from waris.cache import manager, sizeof
+    from waris.data import served_frames
+
+    shared = manager.value_ids() | {id(frame) for frame in served_frames()}
+    objects = {name: value for name, value in namespace.items()
+               if isinstance(value, TRACKED_TYPES) and not name.startswith('_')}
+    try:
+        import streamlit as st
+        from waris.reactive import Graph
+        objects.update({f'session_state.{key}': value for key, value in st.session_state.items()
+                        if isinstance(value, TRACKED_TYPES)})
+        # Node values memoized by waris.reactive, unless the page already holds them under another name
+        held = {id(value) for value in objects.values()}
+        for graph in [value for value in st.session_state.values() if isinstance(value, Graph)]:
+            objects.update({f'graph.{graph.page}.{name}': value for name, value in graph.values().items()
+                            if isinstance(value, TRACKED_TYPES) and id(value) not in held})
+    except Exception:
+        pass
+    for name, value in objects.items():
+        rows = value.shape[0] if value.ndim else 1
+        rerun['objects'][name] = (sizeof(value), id(value), id(value) in shared, type(value).__name__, rows)
+
+
+def objects():
+    """Every recorded object: Session, Page, Object, Type, Rows, Bytes, Shared"""
+    with _sessions_lock:
+        rows = [
+            (sid, page, name, kind, length, size, oid, cached)
+            for sid, record in _sessions.items()
+            for page, rerun in record['pages'].items()
+            for name, (size, oid, cached, kind, length) in rerun['objects'].items()
+        ]
+    frame = pd.DataFrame(rows, columns=['Session', 'Page', 'Object', 'Type', 'Rows', 'Bytes', 'id', 'cached'])
+    frame['Shared'] = frame['cached'] | (frame.groupby('id')['Session'].transform('nunique') > 1)
+    return frame.drop(columns=['id', 'cached']).sort_values('Bytes', ascending=False, ignore_index=True)
+
+
+def sections():
+    """Every recorded section: Session, Page, Section, Net (bytes), Peak (bytes)"""
+    with _sessions_lock:
+        rows = [
+            (sid, page, name, net, peak)
+            for sid, record in _sessions.items()
+            for page, rerun in record['pages'].items()
+            for name, net, peak in [('Total rerun', rerun['net'], rerun['peak'])] + rerun['sections']
+            if rerun['finished'] is not None or name != 'Total rerun'
+        ]
+    return pd.DataFrame(rows, columns=['Session', 'Page', 'Section', 'Net', 'Peak'])
+
+
+def sessions():
+    """One row per session: pages, private and shared object bytes, largest rerun peak, last seen"""
+    with _sessions_lock:
+        rows = [
+            (sid, ', '.join(record['pages']), max((r['peak'] for r in record['pages'].values()), default=0),
+             pd.Timestamp(record['updated'], unit='s'))
+            for sid, record in _sessions.items()
+        ]
+    frame = pd.DataFrame(rows, columns=['Session', 'Pages', 'Rerun Peak', 'Last Seen'])
+    held = objects()
+    for column, shared in [('Private Bytes', False), ('Shared Bytes', True)]:
+        totals = held[held['Shared'] == shared].groupby('Session')['Bytes'].sum()
+        frame[column] = frame['Session'].map(totals).fillna(0).astype('int64')
+    return frame[['Session', 'Pages', 'Private Bytes', 'Shared Bytes', 'Rerun Peak', 'Last Seen']].sort_values(
+        'Private Bytes', ascending=False, ignore_index=True)
+
+
+def top_allocators(limit=15, group_by='lineno'):
+    """Source lines (or files) holding the most traced memory right now"""
+    columns = ['Location', 'Bytes', 'Blocks']
+    if not tracemalloc.is_tracing():
+        return pd.DataFrame(columns=columns)
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+    ])
+    rows = [(str(stat.traceback[0]) if group_by == 'lineno' else stat.traceback[0].filename, stat.size, stat.count)
+            for stat in snapshot.statistics(group_by)[:limit]]
+    return pd.DataFrame(rows, columns=columns)
+
+
+if os.environ.get('WARIS_MEMPROFILE', '').lower() in ('1', 'true'):
+    enable()
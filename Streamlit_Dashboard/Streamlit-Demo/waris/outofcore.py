@@ -0,0 +1,142 @@
+"""
+Out-of-core aggregation for WARIS files too large to load
+
+A file larger than WARIS_STREAM_MB is never read whole. It is streamed in
+chunks (CSV) or record batches (Parquet) of only the columns the pages use,
+and each chunk is folded into the (Date, Zone) cube's mergeable sums,
+counts and squared sums (waris.cube.fold_rows), which are added up across
+chunks. Memory is bounded by the chunk size and the number of zones x
+months, not by the file size.
+
+The served Dataset then carries that cube, and its frame is the zone-month
+frame rebuilt from it (``cube_frame``) with the columns read_waris() adds,
+so the pages run from the cube alone. Columns beyond the required measures
+are not kept. Row-level drill-downs (the Data Explorer's raw table and
+exports) go through ``load_rows``, which scans the file again for the
+selection only: Parquet row groups whose Year and Zone statistics fall
+outside the filters are skipped without being read, only the matching
+files of a partitioned layout (waris.partitions) are opened, and a scan
+stops once it has ROW_LIMIT rows. With WARIS_BACKEND=duckdb the scan is a
+SQL query instead (waris.sqlbackend).
+
+    WARIS_STREAM_MB     stream files larger than this many megabytes (default 1024)
+    WARIS_CHUNK_ROWS    rows per chunk or record batch (default 250000)
+    WARIS_ROW_LIMIT     most rows a drill-down scan returns (default 100000)
+"""
+
+import os
+
+import pandas as pd
+
+from waris import partitions, tenants
+from waris.cache import cached
+from waris.cube import COUNT_COLUMNS, MEAN_MEASURES, SUM_MEASURES, finish_cube, fold_rows
+from waris.data import load_dataset
+from waris.filters import filter_frame, load_filtered
+from waris.schema import CHUNK_ROWS, REQUIRED_COLUMNS, add_derived_columns, read_chunks
+
+STREAM_BYTES = int(float(os.environ.get('WARIS_STREAM_MB', 1024)) * 1024 * 1024)
+ROW_LIMIT = int(os.environ.get('WARIS_ROW_LIMIT', 100_000))
+
+
+def should_stream(path):
+    """Whether the file (or partitioned dataset) is too large to load and is aggregated out of core"""
+    size = partitions.total_bytes(path) if partitions.is_partitioned(path) else os.path.getsize(path)
+    return size > STREAM_BYTES
+
+
+def fold_chunk(chunk):
+    """fold_rows() of a chunk of raw WARIS rows"""
+    chunk = chunk.dropna(subset=['Zone', 'Year', 'Month'])
+    return fold_rows(chunk.assign(
+        Date=pd.to_datetime(chunk[['Year', 'Month']].assign(DAY=1)),
+        Net_Revenue=chunk['Total Operating Revenues'] - chunk['Total Operating Expenditures'],
+    ))
+
+
+def stream_cube(path, chunk_rows=CHUNK_ROWS):
+    """The aggregate cube of a file, folded chunk by chunk"""
+    folded = None
+    for chunk in read_chunks(path, REQUIRED_COLUMNS, chunk_rows):
+        part = fold_chunk(chunk)
+        folded = part if folded is None else folded.add(part, fill_value=0)
+    if folded is None or folded.empty:
+        raise ValueError("no rows")
+    return finish_cube(folded.sort_index())
+
+
+def cube_frame(cube):
+    """Zone-month frame of a cube, with the columns and derived metrics of read_waris()"""
+    frame = cube[['Zone', 'Year'] + [m for m in SUM_MEASURES if m != 'Net_Revenue']].copy()
+    frame['Month'] = cube['Date'].dt.month
+    for measure, count in zip(MEAN_MEASURES, COUNT_COLUMNS):
+        frame[measure] = cube[measure] / cube[count]
+    return add_derived_columns(frame)
+
+
+def _parquet_filter(zones=None, years=None, date_range=None):
+    """Row-group pruning expression for the zone, year and date filters (None: no pruning)"""
+    import pyarrow.dataset as ds
+
+    expression = None
+    if zones is not None and 'All' not in zones:
+        expression = ds.field('Zone').isin(list(zones))
+    if years:
+        clause = ds.field('Year').isin([int(year) for year in years])
+        expression = clause if expression is None else expression & clause
+    if date_range is not None and len(date_range) == 2:
+        clause = (ds.field('Year') >= pd.Timestamp(date_range[0]).year) & \
+                 (ds.field('Year') <= pd.Timestamp(date_range[1]).year)
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def scan_rows(path, date_range=None, zones=None, years=None, months=None, limit=ROW_LIMIT):
+    """Rows of the file passing the filters, at most limit of them, without loading the file
+
+    Revenue_Growth is left out: a chunk does not hold a zone's whole history.
+    """
+    rows, found = [], 0
+    if partitions.is_partitioned(path):
+        chunks = (pd.read_parquet(file) for file in partitions.select(path, date_range, zones, years, months))
+    else:
+        expression = _parquet_filter(zones, years, date_range) if path.lower().endswith('.parquet') else None
+        chunks = read_chunks(path, expression=expression)
+    for chunk in chunks:
+        chunk = add_derived_columns(chunk.dropna(subset=['Zone', 'Year', 'Month']))
+        chunk = filter_frame(chunk, date_range, zones, years, months).drop(columns='Revenue_Growth')
+        rows.append(chunk.head(limit - found))
+        found += len(rows[-1])
+        if found >= limit:
+            break
+    if not rows:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return pd.concat(rows, ignore_index=True)
+
+
+def load_rows(date_range=None, zones=None, years=None, months=None, path=None):
+    """Row-level data of the served dataset for the filters
+
+    The cached filtered rows of an in-memory dataset, or a pruned scan
+    (at most ROW_LIMIT rows) of a dataset streamed out of core.
+    """
+    path = path or tenants.current_path()
+    dataset = load_dataset(path)
+    if dataset.cube is None:
+        return load_filtered(date_range, zones, years, months, path)
+    return _scanned_rows(
+        path, dataset.version,
+        tuple(date_range) if date_range is not None and len(date_range) == 2 else None,
+        tuple(sorted(zones)) if zones is not None else None,
+        tuple(sorted(years)) if years else None,
+        tuple(sorted(months)) if months else None,
+    )
+
+
+@cached('row scans', max_entries=8)
+def _scanned_rows(path, version, date_range, zones, years, months):
+    from waris import sqlbackend
+
+    if sqlbackend.enabled():
+        return sqlbackend.rows(path, date_range, zones, years, months, limit=ROW_LIMIT)
+    return scan_rows(path, date_range, zones, years, months)
@@ -0,0 +1,237 @@
+"""
+Partitioned WARIS dataset layout: Year=/Zone= directories of Parquet files
+
+    root/
+        _manifest.json
+        Year=2023/Zone=Zone%20A/2023-05-3f1c9a0b2e7d.parquet
+        Year=2023/Zone=Zone%20A/2023-06-9b0e41c7d2aa.parquet
+        ...
+
+Each file holds one zone's rows for one month (a month written in several
+chunks may span several files), named after its content hash so a live file
+is never overwritten. ``_manifest.json`` lists every file with its zone,
+year, month, row count and size. It is replaced atomically once the files of
+a write are in place, so readers see either the old or the new set. The
+manifest stands in for the dataset file in waris.data: its signature is the
+change detector and its hash the version, so telling whether anything
+changed never lists a directory or reads data.
+
+Point WARIS_DATA_PATH (or a tenant's path) at the root to serve it. A new
+version only reads the files added or replaced since the version in memory
+and splices them into the previous frame (or cube, when streamed out of
+core), so adding a month reads one month. Row scans (waris.outofcore)
+only open the files whose zone, year and month pass the filters.
+
+Writing a source replaces the (zone, month) partitions it holds and leaves
+every other partition alone:
+
+    python -m waris.partitions ../../Data/WARIS.csv /data/waris    # convert a file
+    python -m waris.partitions june.csv /data/waris                # add (or restate) a month
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+from urllib.parse import quote
+
+import pandas as pd
+
+MANIFEST = '_manifest.json'
+CHUNK_ROWS = 250_000
+
+_Loaded = namedtuple('_Loaded', ['files', 'stream', 'value'])
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def is_partitioned(path):
+    """Whether path is the root of a partitioned dataset"""
+    return os.path.isdir(path)
+
+
+def version_file(path):
+    """File whose signature and content stand for the dataset at path (the manifest of a root)"""
+    return os.path.join(path, MANIFEST) if is_partitioned(path) else path
+
+
+def read_manifest(root):
+    """{relative path: entry} for every file of the dataset"""
+    with open(os.path.join(root, MANIFEST), encoding='utf-8') as f:
+        return json.load(f)['files']
+
+
+def total_bytes(root):
+    """Size of the dataset's files on disk, from the manifest"""
+    return sum(entry['bytes'] for entry in read_manifest(root).values())
+
+
+def _key(entry):
+    return entry['zone'], entry['year'], entry['month']
+
+
+def _frame_keys(frame):
+    """(zone, year, month) of each row of a frame or cube"""
+    return pd.MultiIndex.from_arrays([
+        frame['Zone'].astype(str), frame['Date'].dt.year, frame['Date'].dt.month,
+    ])
+
+
+def select(root, date_range=None, zones=None, years=None, months=None):
+    """Paths of the files that can hold rows passing the filters, in manifest order"""
+    if date_range is not None and len(date_range) == 2:
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+    zones = None if zones is None or 'All' in zones else {str(zone) for zone in zones}
+    years = {int(year) for year in years} if years else None
+    months = set(months) if months else None
+
+    paths = []
+    for rel, entry in read_manifest(root).items():
+        month_start = pd.Timestamp(year=entry['year'], month=entry['month'], day=1)
+        if zones is not None and entry['zone'] not in zones:
+            continue
+        if years is not None and entry['year'] not in years:
+            continue
+        if months is not None and month_start.month_name() not in months:
+            continue
+        if date_range is not None and len(date_range) == 2 and not start <= month_start <= end:
+            continue
+        paths.append(os.path.join(root, rel))
+    return paths
+
+
+def load(root, stream=False):
+    """The dataset's frame, or its cube when streamed, reading only files new since the last load
+
+    Partitions whose files were added, replaced or removed are dropped from
+    the previous result and read again; everything else is reused.
+    """
+    from waris.cube import finish_cube
+    from waris.outofcore import fold_chunk
+    from waris.schema import REQUIRED_COLUMNS, add_derived_columns, validate
+
+    files = read_manifest(root)
+    with _loaded_lock:
+        last = _loaded.get(root)
+    kept = None
+    if last is not None and last.stream == stream:
+        changed = set(files).symmetric_difference(last.files)
+        affected = {_key(files.get(rel) or last.files[rel]) for rel in changed}
+        kept = last.value[~_frame_keys(last.value).isin(list(affected))] if affected else last.value
+        to_read = [rel for rel, entry in files.items() if _key(entry) in affected]
+    else:
+        to_read = list(files)
+
+    if stream:
+        folded = None
+        for rel in to_read:
+            part = fold_chunk(pd.read_parquet(os.path.join(root, rel), columns=REQUIRED_COLUMNS))
+            folded = part if folded is None else folded.add(part, fill_value=0)
+        parts = [] if folded is None else [finish_cube(folded)]
+        if kept is not None:
+            parts.insert(0, kept)
+        if not parts or sum(len(part) for part in parts) == 0:
+            raise ValueError("no rows")
+        value = pd.concat(parts, ignore_index=True).sort_values(['Date', 'Zone'], ignore_index=True)
+    else:
+        parts = [pd.read_parquet(os.path.join(root, rel)) for rel in to_read]
+        if kept is not None:
+            parts.insert(0, kept)
+        frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        validate(frame)
+        # Derived columns (growth in particular) span partitions; recompute them in date order
+        value = add_derived_columns(frame.sort_values(['Year', 'Month', 'Zone'], kind='stable', ignore_index=True))
+
+    with _loaded_lock:
+        _loaded[root] = _Loaded(files, stream, value)
+    return value
+
+
+def _replace_atomically(directory, final_name, write):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        final_path = os.path.join(directory, final_name(tmp_path))
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return final_path
+
+
+def _write_partition(root, zone, year, month, rows):
+    """Write one (zone, month) file, named after its content; returns (relative path, entry)"""
+    from waris.data import file_digest
+
+    directory = os.path.join(root, f'Year={year}', f'Zone={quote(zone, safe="")}')
+    os.makedirs(directory, exist_ok=True)
+    path = _replace_atomically(
+        directory,
+        lambda tmp_path: f'{year:04d}-{month:02d}-{file_digest(tmp_path)[:12]}.parquet',
+        lambda f: rows.to_parquet(f, index=False),
+    )
+    entry = {'zone': zone, 'year': year, 'month': month, 'rows': len(rows), 'bytes': os.path.getsize(path)}
+    return os.path.relpath(path, root).replace(os.sep, '/'), entry
+
+
+def write(source, root, chunk_rows=CHUNK_ROWS):
+    """Write a WARIS file into the layout under root, replacing the partitions it holds
+
+    Returns (files written, files removed).
+    """
+    from waris.schema import read_chunks
+
+    os.makedirs(root, exist_ok=True)
+    files = read_manifest(root) if os.path.exists(os.path.join(root, MANIFEST)) else {}
+    written = {}
+    for chunk in read_chunks(source, chunk_rows=chunk_rows):
+        chunk = chunk.dropna(subset=['Zone', 'Year', 'Month'])
+        for (zone, year, month), rows in chunk.groupby(
+                [chunk['Zone'].astype(str), chunk['Year'].astype('int64'), chunk['Month'].astype('int64')]):
+            rel, entry = _write_partition(root, zone, int(year), int(month), rows)
+            written[rel] = entry
+
+    replaced = {_key(entry) for entry in written.values()}
+    removed = [rel for rel, entry in files.items() if _key(entry) in replaced and rel not in written]
+    files = {rel: entry for rel, entry in files.items() if rel not in removed}
+    files.update(written)
+    # Sorted keys: the same files always give the same manifest bytes, hence the same version
+    _replace_atomically(
+        root, lambda tmp_path: MANIFEST,
+        lambda f: f.write(json.dumps({'files': files}, sort_keys=True, indent=1).encode('utf-8')),
+    )
+
+    # Readers of the previous manifest may still open these; they are gone only after the swap
+    for rel in removed:
+        try:
+            os.remove(os.path.join(root, rel))
+        except OSError:
+            pass
+    return written, removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a WARIS file into a Year=/Zone= partitioned Parquet layout")
+    parser.add_argument('source', help="WARIS file (.csv or .parquet) to write")
+    parser.add_argument('root', help="root directory of the partitioned dataset (created if missing)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"rows read from the source at a time (default {CHUNK_ROWS})")
+    args = parser.parse_args(argv)
+
+    written, removed = write(args.source, args.root, args.chunk_rows)
+    partitions = {_key(entry) for entry in written.values()}
+    print(f"Wrote {len(written)} files for {len(partitions)} zone-months to {args.root}"
+          f" ({len(removed)} replaced files removed)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Dependency-tracked values for page reruns
+
+Streamlit reruns a page from the top whenever any widget changes. A page
+asks its session's graph for each derived value instead of computing it
+directly:
+
+    graph = session_graph('Home')
+    filtered_df = graph.node('filtered_df', load_filtered, date_range, selected_zones)
+    zone_metrics = graph.node('zone_metrics', compute_zone_metrics, filtered_df)
+
+The arguments are the node's inputs. When they are the same as on the
+session's previous rerun, the node returns its memoized value without
+calling the function; otherwise it recomputes. Passing one node's value
+into another makes it an upstream dependency: an unchanged node returns the
+very same object, so its dependants are skipped too, and a change (say, of
+the zone drill-down) only recomputes the nodes downstream of that widget.
+
+Widget values and other plain values are compared by equality. Frames,
+arrays, figures and other objects are compared by identity, so pass the
+cached or upstream object itself rather than a copy. Every node also
+depends on the version of the dataset being served: when a new version is
+swapped in, the session's memo is dropped.
+
+The memo lives in st.session_state and holds the last value of each node
+for that session; values may be shared with other nodes and caches, so
+treat them as read-only.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from waris.data import load_dataset
+
+STATE_KEY = '_waris_graph_{}'
+# Compared by identity: their == is elementwise or too costly to run every rerun
+IDENTITY_TYPES = (pd.DataFrame, pd.Series, pd.Index, np.ndarray)
+
+
+def _same(old, new):
+    """Whether an input is unchanged since the previous rerun"""
+    if old is new:
+        return True
+    if type(old) is not type(new) or isinstance(new, IDENTITY_TYPES):
+        return False
+    if isinstance(new, (list, tuple)):
+        return len(old) == len(new) and all(_same(a, b) for a, b in zip(old, new))
+    if isinstance(new, dict):
+        return old.keys() == new.keys() and all(_same(old[key], new[key]) for key in new)
+    try:
+        return bool(old == new)
+    except Exception:
+        return False
+
+
+class Graph:
+    """One session's memo of a page's nodes"""
+
+    def __init__(self, page, version):
+        self.page = page
+        self.version = version
+        self.memo = {}
+        self.computed = []
+        self.reused = []
+
+    def node(self, name, func, *args, **kwargs):
+        """Value of the named node: func(*args, **kwargs), recomputed only when an input changed"""
+        entry = self.memo.get(name)
+        if entry is not None and _same(entry[0], args) and _same(entry[1], kwargs):
+            self.reused.append(name)
+            return entry[2]
+        value = func(*args, **kwargs)
+        self.memo[name] = (args, kwargs, value)
+        self.computed.append(name)
+        return value
+
+    def values(self):
+        """Memoized value of every node"""
+        return {name: entry[2] for name, entry in self.memo.items()}
+
+    def invalidate(self, name=None):
+        """Forget one node's value (or all of them), so it recomputes on next use"""
+        if name is None:
+            self.memo.clear()
+        else:
+            self.memo.pop(name, None)
+
+
+def session_graph(page, path=None):
+    """The current session's graph for the page, reset when the served dataset version changes
+
+    Call it once near the top of the page, on every rerun.
+    """
+    key = STATE_KEY.format(page)
+    version = load_dataset(path).version
+    graph = st.session_state.get(key)
+    if graph is None or graph.version != version:
+        graph = Graph(page, version)
+        st.session_state[key] = graph
+    graph.computed, graph.reused = [], []
+    return graph
@@ -0,0 +1,75 @@
+"""
+WARIS file layout: the required columns, the derived columns and chunked reads
+
+Kept free of Streamlit and the caches so that processes which only read
+files (the batch KPI workers, waris.batch) import pandas and this module
+and nothing else. waris.data and waris.outofcore build on them.
+
+    WARIS_CHUNK_ROWS    rows per chunk or record batch (default 250000)
+"""
+
+import os
+
+import pandas as pd
+
+CHUNK_ROWS = int(os.environ.get('WARIS_CHUNK_ROWS', 250_000))
+
+REQUIRED_COLUMNS = [
+    'Zone', 'Year', 'Month',
+    'Total Operating Revenues', 'Total Operating Expenditures',
+    'Total Collection', 'Total Billing',
+    'Collection Efficiency', 'Operation & Maintenance Cost Coverage',
+]
+
+
+def validate(df):
+    """Reject frames the pages cannot render (missing columns, no rows)"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    if df.empty:
+        raise ValueError("no rows")
+
+
+def add_derived_columns(df):
+    """Add the calendar and ratio columns the pages use to raw WARIS rows, in place"""
+    df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
+    df['Year'] = df['Date'].dt.year
+    df['Month_Name'] = df['Date'].dt.month_name()
+    df['Quarter'] = df['Date'].dt.quarter
+
+    # Calculate additional metrics
+    df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
+    df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
+    df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
+    df['Collection_Rate'] = (df['Total Collection'] / df['Total Billing'] * 100).round(2)
+
+    return df
+
+
+def _check_columns(path, names, columns):
+    missing = [col for col in columns if col not in names]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)}: missing columns: {', '.join(missing)}")
+
+
+def read_chunks(path, columns=None, chunk_rows=CHUNK_ROWS, expression=None):
+    """The columns of a CSV or Parquet file (all when None), chunk_rows rows at a time
+
+    expression is a pyarrow.dataset filter for Parquet files; row groups
+    whose statistics cannot match it are skipped. CSV files are read in full.
+    """
+    if path.lower().endswith('.parquet'):
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format='parquet')
+        if columns is not None:
+            _check_columns(path, dataset.schema.names, columns)
+        for batch in dataset.to_batches(columns=columns, filter=expression, batch_size=chunk_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+        return
+
+    if columns is not None:
+        _check_columns(path, pd.read_csv(path, nrows=0).columns, columns)
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
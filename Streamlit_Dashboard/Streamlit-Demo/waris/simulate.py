@@ -0,0 +1,147 @@
+"""
+Monte Carlo revenue and collection scenarios sampled from zone history
+
+Each scenario draws, for every zone and simulated month, one of that zone's
+historical months from the (Date, Zone) cube, keeping billing, revenue,
+expenditure and collection efficiency of the same month together so their
+correlation is preserved. The draw is scaled around the zone's mean by the
+volatility factor and then shifted by the stress parameters (billing change,
+efficiency change in points, cost change). Collection is billing times the
+simulated efficiency. Since these transforms only depend on which month was
+drawn, they are applied once per zone and historical month.
+
+The draws are (scenarios x zones x months) NumPy arrays of month indices
+from one seeded generator, processed in scenario chunks that stay under
+CHUNK_ELEMENTS values, so 100k scenarios run interactively. Only the
+summaries (portfolio and per-zone percentiles, histogram) are kept, cached
+by the dataset version and the scenario parameters.
+"""
+
+import numpy as np
+import pandas as pd
+
+from waris.cache import cached
+from waris.cube import aggregate
+
+POOL_MEASURES = [
+    'Total Billing',
+    'Total Operating Revenues',
+    'Total Operating Expenditures',
+    'Collection Efficiency',
+]
+CHUNK_ELEMENTS = 4_000_000
+PERCENTILES = [5, 25, 50, 75, 95]
+HISTOGRAM_BINS = 60
+
+
+def sampling_pools(cube):
+    """Per-zone padded arrays of historical monthly values: (zones, measures, months) and counts"""
+    monthly = aggregate(cube, ['Zone', 'Date']).dropna(subset=POOL_MEASURES)
+    zones = sorted(monthly['Zone'].unique())
+    counts = monthly.groupby('Zone').size().reindex(zones).to_numpy()
+
+    pools = np.full((len(zones), len(POOL_MEASURES), counts.max() if len(zones) else 0), np.nan)
+    position = monthly.groupby('Zone').cumcount().to_numpy()
+    rows = monthly['Zone'].map({zone: i for i, zone in enumerate(zones)}).to_numpy()
+    for m, measure in enumerate(POOL_MEASURES):
+        pools[rows, m, position] = monthly[measure].to_numpy(dtype=float)
+    return zones, pools, counts
+
+
+def outcomes(pools, billing_change, efficiency_change, cost_change, volatility):
+    """Revenue, collection and expenditure for every zone's historical month under the scenario
+
+    The stress and volatility transforms depend only on which historical
+    month is drawn, so they are applied once here. Returns a (3, zones *
+    pool months) table, one flat row per output for fast gathers.
+    """
+    means = np.nanmean(pools, axis=2, keepdims=True)
+    sampled = {measure: means[:, m] + volatility * (pools[:, m] - means[:, m])
+               for m, measure in enumerate(POOL_MEASURES)}
+
+    billing = sampled['Total Billing'] * (1 + billing_change)
+    efficiency = np.clip(sampled['Collection Efficiency'] + efficiency_change, 0, 100)
+    return np.stack([
+        sampled['Total Operating Revenues'] * (1 + billing_change),
+        billing * efficiency / 100,
+        sampled['Total Operating Expenditures'] * (1 + cost_change),
+    ]).reshape(3, -1).astype(np.float32)
+
+
+def simulate_chunk(rng, table, counts, scenarios, months):
+    """Per-scenario, per-zone totals over the horizon: (scenarios, zones, 3)
+
+    Draws a (scenarios, zones, months) array of historical month indices and
+    sums the drawn outcomes over the months.
+    """
+    zones = len(counts)
+    pool_months = table.shape[1] // max(zones, 1)
+    draw = (rng.random((scenarios, zones, months), dtype=np.float32) * counts[None, :, None]).astype(np.intp)
+    draw += (np.arange(zones) * pool_months)[None, :, None]
+    return np.stack([np.take(row, draw).sum(axis=2) for row in table], axis=-1).astype(np.float64)
+
+
+@cached('scenario summaries', max_entries=32)
+def run_scenarios(version, selected_zones, scenarios, months, billing_change, efficiency_change, cost_change,
+                  volatility, seed, _cube):
+    """Summaries of a scenario run, cached by dataset version, zones and parameters
+
+    selected_zones (a sorted tuple) names the zones _cube was sliced to; it keys the
+    cache, since _cube itself is not hashed.
+
+    Returns a dict with 'portfolio' (percentiles and mean of the portfolio's
+    revenue, collection, expenditure and net revenue over the horizon), 'zones'
+    (per-zone percentiles of net revenue and deficit probability),
+    'histogram' (net revenue bins) and 'baseline' (historical totals scaled
+    to the horizon).
+    """
+    zones, pools, counts = sampling_pools(_cube)
+    table = outcomes(pools, billing_change, efficiency_change, cost_change, volatility)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, CHUNK_ELEMENTS // max(1, len(zones) * months))
+
+    portfolio_totals = np.empty((scenarios, 3))
+    zone_net = np.empty((scenarios, len(zones)), dtype=np.float32)
+    for start in range(0, scenarios, chunk):
+        stop = min(start + chunk, scenarios)
+        simulated = simulate_chunk(rng, table, counts, stop - start, months)
+        portfolio_totals[start:stop] = simulated.sum(axis=1)
+        zone_net[start:stop] = simulated[..., 0] - simulated[..., 2]
+
+    totals = pd.DataFrame(portfolio_totals, columns=['Revenue', 'Collection', 'Expenditure'])
+    totals['Net Revenue'] = totals['Revenue'] - totals['Expenditure']
+    portfolio = pd.DataFrame(
+        np.percentile(totals, PERCENTILES, axis=0).T,
+        index=pd.Index(totals.columns, name='Measure'),
+        columns=[f'P{p}' for p in PERCENTILES],
+    )
+    portfolio['Mean'] = totals.mean()
+    portfolio['Probability Below Zero'] = (totals < 0).mean() * 100
+
+    zone_summary = pd.DataFrame(
+        np.percentile(zone_net, PERCENTILES, axis=0).T,
+        index=pd.Index(zones, name='Zone'),
+        columns=[f'P{p}' for p in PERCENTILES],
+    )
+    zone_summary['Mean'] = zone_net.mean(axis=0)
+    zone_summary['Deficit Probability'] = (zone_net < 0).mean(axis=0) * 100
+
+    counts_, edges = np.histogram(totals['Net Revenue'], bins=HISTOGRAM_BINS)
+    histogram = pd.DataFrame({
+        'Net Revenue': (edges[:-1] + edges[1:]) / 2,
+        'Scenarios': counts_,
+    })
+
+    history = np.nansum(pools, axis=2) / counts[:, None] * months
+    baseline = {
+        'Revenue': history[:, POOL_MEASURES.index('Total Operating Revenues')].sum(),
+        'Expenditure': history[:, POOL_MEASURES.index('Total Operating Expenditures')].sum(),
+    }
+    baseline['Net Revenue'] = baseline['Revenue'] - baseline['Expenditure']
+
+    return {
+        'portfolio': portfolio.reset_index(),
+        'zones': zone_summary.reset_index(),
+        'histogram': histogram,
+        'baseline': baseline,
+    }
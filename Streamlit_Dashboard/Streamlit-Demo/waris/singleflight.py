@@ -0,0 +1,119 @@
+"""
+Single-flight deduplication of identical concurrent computations
+
+When a new data file lands, many sessions miss the shared caches at the
+same moment. A SingleFlight group lets the first caller for a key do the
+work while concurrent callers with the same key wait for that result
+instead of recomputing it. Results are shared between the coalesced
+callers, so treat them as read-only.
+"""
+
+import functools
+import inspect
+import threading
+
+
+class _Call:
+    """One in-flight computation and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one computation"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) for key, or wait for the caller already running it"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Counters for this group"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+            }
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name):
+    """Return the process-wide SingleFlight group with this name"""
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name)
+        return _groups[name]
+
+
+def coalesce(name):
+    """Decorator: concurrent calls with identical (hashable) arguments share one computation
+
+    Apply it outside ``@st.cache_data`` so sessions that miss the cache together
+    wait for one load instead of each starting their own. As with
+    ``st.cache_data``, arguments whose name starts with an underscore are left
+    out of the key.
+    """
+    flight = group(name)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Bind defaults so load_data() and load_data(DATA_PATH) share a key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__qualname__, tuple(
+                (name, value) for name, value in bound.arguments.items()
+                if not name.startswith('_')
+            ))
+            return flight.do(key, func, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Counters for every group, keyed by group name"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {flight.name: flight.stats() for flight in groups}
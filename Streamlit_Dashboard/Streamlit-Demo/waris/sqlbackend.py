@@ -0,0 +1,261 @@
+"""
+Optional embedded SQL backend: filters and aggregates pushed down to DuckDB
+
+With WARIS_BACKEND=duckdb, the filter-then-groupby work is run as SQL over
+the data file itself (CSV, Parquet or a partitioned root) in an in-process
+DuckDB database instead of over the pandas frame:
+
+- the filtered rows behind ``load_filtered`` (the pages' selections, the
+  correlation inputs and the Data Explorer slices): the page filters become
+  a WHERE clause;
+- the aggregate cube behind ``load_cube``: one GROUP BY (Date, Zone);
+- zone metrics and Monthly/Quarterly/Yearly roll-ups for a selection
+  (``zone_metrics``, ``period_rollup``), used by the JSON API, which then
+  never touch the cube or the rows;
+- the drill-down scans of datasets served out of core.
+
+Results have the same columns as their pandas counterparts and go through
+the same caches. Only the matching partitions of a partitioned root are
+handed to DuckDB. Every session shares one database and a bounded pool of
+its connections (cursors), so concurrent reruns run their queries in
+parallel without opening a database each. No server is involved; DuckDB is
+an optional dependency (``pip install duckdb``).
+
+    WARIS_BACKEND       'pandas' (default) or 'duckdb'
+    WARIS_SQL_POOL      connections in the shared pool (default 4)
+    WARIS_SQL_THREADS   DuckDB worker threads per query (default: DuckDB's own)
+
+``python -m benchmarks.backends`` compares both backends.
+"""
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from waris import partitions
+from waris.cube import (
+    COUNT_COLUMNS, MEAN_MEASURES, PERIOD_KEYS, SQUARE_COLUMNS, SUM_MEASURES, add_period_dates, finish_cube,
+)
+from waris.kpis import zone_table
+from waris.schema import REQUIRED_COLUMNS
+
+BACKENDS = ('pandas', 'duckdb')
+BACKEND = os.environ.get('WARIS_BACKEND', 'pandas').lower()
+POOL_SIZE = int(os.environ.get('WARIS_SQL_POOL', 4))
+THREADS = os.environ.get('WARIS_SQL_THREADS') or None
+
+if BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown WARIS_BACKEND: {BACKEND} (expected one of {', '.join(BACKENDS)})")
+if BACKEND == 'duckdb':
+    # Fail when the backend is selected, not at the first query of some page
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("WARIS_BACKEND=duckdb needs the duckdb package (pip install duckdb)") from None
+
+# Cube keys as expressions over the rows
+KEY_EXPRESSIONS = {
+    'Date': 'Date',
+    'Zone': 'Zone',
+    'Year': 'year(Date)',
+    'Quarter': 'quarter(Date)',
+    'Month_Name': 'monthname(Date)',
+}
+
+
+def enabled():
+    """Whether the SQL backend is selected"""
+    return BACKEND == 'duckdb'
+
+
+class ConnectionPool:
+    """Bounded pool of connections to one in-process DuckDB database, shared by every session"""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._database = None
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {'checkouts': 0, 'waits': 0}
+
+    def _acquire(self):
+        with self._lock:
+            self._stats['checkouts'] += 1
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._created < self.size:
+                if self._database is None:
+                    self._database = duckdb.connect(':memory:')
+                    if THREADS:
+                        self._database.execute(f'SET threads TO {int(THREADS)}')
+                self._created += 1
+                # A cursor is a separate connection to the same database, usable from its own thread
+                return self._database.cursor()
+            self._stats['waits'] += 1
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the enclosed block"""
+        connection = self._acquire()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, size=self.size, open=self._created)
+
+
+pool = ConnectionPool()
+
+
+def _identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def source(path, date_range=None, zones=None, years=None, months=None):
+    """Table function reading the dataset at path, or None when no partition matches the filters"""
+    if partitions.is_partitioned(path):
+        files = partitions.select(path, date_range, zones, years, months)
+        if not files:
+            return None
+        return f"read_parquet([{', '.join(_literal(file) for file in files)}], union_by_name = true)"
+    if path.lower().endswith('.parquet'):
+        return f'read_parquet({_literal(path)})'
+    return f'read_csv_auto({_literal(path)}, header = true)'
+
+
+def _rows_sql(table, growth=False):
+    """Rows of the table with the columns read_waris() derives"""
+    revenue, expenditure = _identifier('Total Operating Revenues'), _identifier('Total Operating Expenditures')
+    columns = [
+        'year(Date) AS Year',
+        'monthname(Date) AS Month_Name',
+        'quarter(Date) AS Quarter',
+        f'{revenue} - {expenditure} AS Net_Revenue',
+        '"Collection Efficiency" / 100 * "Operation & Maintenance Cost Coverage" AS Efficiency_Score',
+        'round("Total Collection" / "Total Billing" * 100, 2) AS Collection_Rate',
+    ]
+    if growth:
+        # Over everything read, as read_waris computes it before any filter (of a partitioned
+        # root only the selected partitions are read, so a selection's first month has none)
+        columns.append(f'({revenue} / lag({revenue}) OVER (PARTITION BY Zone ORDER BY Date) - 1) * 100'
+                       ' AS Revenue_Growth')
+    return f"""
+        WITH raw AS (
+            SELECT *, CAST(make_date(CAST(Year AS BIGINT), CAST(Month AS BIGINT), 1) AS TIMESTAMP) AS Date
+            FROM {table}
+        ), waris_rows AS (
+            SELECT * EXCLUDE (Year), {', '.join(columns)}
+            FROM raw
+        )
+    """
+
+
+def where(date_range=None, zones=None, years=None, months=None):
+    """WHERE clause and parameters for the page filters, as waris.filters.filter_mask applies them"""
+    clauses, params = ['Date IS NOT NULL', 'Zone IS NOT NULL'], []
+
+    def members(expression, values):
+        if not values:
+            clauses.append('FALSE')
+            return
+        clauses.append(f"{expression} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    if date_range is not None and len(date_range) == 2:
+        clauses.append('Date BETWEEN ? AND ?')
+        params += [pd.Timestamp(date_range[0]).to_pydatetime(), pd.Timestamp(date_range[1]).to_pydatetime()]
+    if zones is not None and 'All' not in zones:
+        members('Zone', [str(zone) for zone in zones])
+    if years:
+        members('year(Date)', [int(year) for year in years])
+    if months:
+        members('monthname(Date)', list(months))
+    return ' AND '.join(clauses), params
+
+
+def query(sql, params=()):
+    """Run a query on a pooled connection and return the result as a DataFrame"""
+    with pool.connection() as connection:
+        return connection.execute(sql, list(params)).df()
+
+
+def rows(path, date_range=None, zones=None, years=None, months=None, limit=None):
+    """Filtered rows with the derived columns, like load_filtered (at most limit rows)"""
+    table = source(path, date_range, zones, years, months)
+    if table is None:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    condition, params = where(date_range, zones, years, months)
+    # DuckDB scans in parallel: order the rows so a capped scan returns the same (earliest) ones every run
+    sql = _rows_sql(table, growth=True) + f'SELECT * FROM waris_rows WHERE {condition} ORDER BY Date, Zone'
+    if limit is not None:
+        sql += f' LIMIT {int(limit)}'
+    return query(sql, params)
+
+
+def _measure_columns():
+    columns = [f'COALESCE(SUM({_identifier(m)}), 0) AS {_identifier(m)}' for m in SUM_MEASURES + MEAN_MEASURES]
+    columns += [f'COUNT({_identifier(m)}) AS {_identifier(c)}' for m, c in zip(MEAN_MEASURES, COUNT_COLUMNS)]
+    columns += [f'COALESCE(SUM({_identifier(m)} * {_identifier(m)}), 0) AS {_identifier(s)}'
+                for m, s in zip(MEAN_MEASURES, SQUARE_COLUMNS)]
+    return columns + ['COUNT(*) AS Rows']
+
+
+def cube(path, date_range=None, zones=None, years=None, months=None):
+    """Aggregate cube (build_cube) of the filtered rows, grouped in the engine"""
+    table = source(path, date_range, zones, years, months)
+    condition, params = where(date_range, zones, years, months)
+    if table is None:
+        return finish_cube(pd.DataFrame(
+            columns=['Date', 'Zone'] + SUM_MEASURES + MEAN_MEASURES + COUNT_COLUMNS + SQUARE_COLUMNS + ['Rows'],
+        ).astype({'Date': 'datetime64[ns]'}).set_index(['Date', 'Zone']))
+    sql = _rows_sql(table) + f"""
+        SELECT Date, Zone, {', '.join(_measure_columns())}
+        FROM waris_rows WHERE {condition}
+        GROUP BY Date, Zone ORDER BY Date, Zone
+    """
+    return finish_cube(query(sql, params).set_index(['Date', 'Zone']))
+
+
+def aggregate(path, by, date_range=None, zones=None, years=None, months=None):
+    """waris.cube.aggregate(slice_cube(cube, filters), by), computed in the engine"""
+    by = [by] if isinstance(by, str) else list(by)
+    table = source(path, date_range, zones, years, months)
+    if table is None:
+        return pd.DataFrame(columns=by + SUM_MEASURES + MEAN_MEASURES + ['Rows'])
+    condition, params = where(date_range, zones, years, months)
+    keys = [f'{KEY_EXPRESSIONS[key]} AS {_identifier(key)}' for key in by]
+    measures = [f'COALESCE(SUM({_identifier(m)}), 0) AS {_identifier(m)}' for m in SUM_MEASURES]
+    measures += [f'SUM({_identifier(m)}) / NULLIF(COUNT({_identifier(m)}), 0) AS {_identifier(m)}'
+                 for m in MEAN_MEASURES]
+    order = ', '.join(str(position) for position in range(1, len(by) + 1))
+    sql = _rows_sql(table) + f"""
+        SELECT {', '.join(keys + measures)}, COUNT(*) AS Rows
+        FROM waris_rows WHERE {condition}
+        GROUP BY {order} ORDER BY {order}
+    """
+    return query(sql, params)
+
+
+def zone_metrics(path, date_range=None, zones=None, years=None, months=None):
+    """waris.kpis.zone_metrics of the filtered cube, computed in the engine"""
+    return zone_table(aggregate(path, 'Zone', date_range, zones, years, months))
+
+
+def period_rollup(path, level='Monthly', by_zone=True, date_range=None, zones=None, years=None, months=None):
+    """waris.cube.period_rollup of the filtered cube, computed in the engine"""
+    keys = PERIOD_KEYS[level] + (['Zone'] if by_zone else [])
+    return add_period_dates(aggregate(path, keys, date_range, zones, years, months), level)
@@ -0,0 +1,191 @@
+"""
+Deterministic synthetic WARIS data for scale and performance testing
+
+Generates WARIS-shaped monthly records (Zone, Year, Month, billing,
+collection, revenue, expenditure and its cost breakdown) for any number of
+zones and years. Each zone gets a size, a growth rate, a seasonal profile
+and a baseline collection efficiency; monthly values follow that profile
+with autocorrelated noise, so billing, collection, revenue and costs move
+together the way they do in real utility data. The same seed and sizes
+always produce the same rows.
+
+Zones are generated in blocks and written as they are produced, so memory
+stays bounded even at 10,000 zones x 50 years (6 million rows).
+
+    python -m waris.synthetic --zones 100 --years 10 --out ../../Data/WARIS.csv
+    python -m waris.synthetic --zones 10000 --years 50 --out big.parquet
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+MIN_ZONES, MAX_ZONES = 10, 10_000
+MIN_YEARS, MAX_YEARS = 1, 50
+LAST_YEAR = 2024
+BLOCK_ZONES = 500
+
+COLUMNS = [
+    'Zone', 'Year', 'Month',
+    'Total Billing', 'Total Water & Sewerage Billing', 'Total Collection', 'Collection Efficiency',
+    'Total Operating Revenues', 'Total Operating Expenditures',
+    'Staff Costs', 'Maintenance Costs', 'Administrative Costs', 'Other Costs',
+    'Operation & Maintenance Cost Coverage',
+]
+
+# Share of operating expenditure by cost line (maintenance also varies with the season)
+COST_SHARES = {
+    'Staff Costs': 0.42,
+    'Maintenance Costs': 0.25,
+    'Administrative Costs': 0.18,
+}
+
+
+def _ar1(rng, shape, phi, scale):
+    """Autocorrelated monthly noise along the last axis"""
+    shocks = rng.normal(0, scale, shape)
+    noise = np.empty(shape)
+    noise[..., 0] = shocks[..., 0] / np.sqrt(1 - phi ** 2)
+    for t in range(1, shape[-1]):
+        noise[..., t] = phi * noise[..., t - 1] + shocks[..., t]
+    return noise
+
+
+def generate_block(rng, first_zone, zones, years, start_year=None, zone_width=5):
+    """WARIS rows for zones [first_zone, first_zone + zones) over the given years"""
+    start_year = LAST_YEAR - years + 1 if start_year is None else start_year
+    months = 12 * years
+    t = np.arange(months)
+    month_of_year = t % 12
+
+    # Zone profiles
+    size = rng.lognormal(mean=0.0, sigma=0.8, size=zones)
+    base_billing = 80_000 * size
+    growth = rng.normal(0.04, 0.025, zones) / 12
+    amplitude = rng.uniform(0.04, 0.18, zones)
+    peak = rng.integers(0, 12, zones)
+    efficiency_base = np.clip(rng.beta(8, 2.5, zones) * 100, 45, 98)
+    efficiency_trend = rng.normal(0.3, 0.4, zones) / 12
+    cost_ratio = rng.uniform(0.65, 1.05, zones)
+    water_share = rng.uniform(0.88, 0.97, zones)
+    other_income = rng.uniform(0.02, 0.08, zones)
+
+    season = np.cos(2 * np.pi * (month_of_year[None, :] - peak[:, None]) / 12)
+    trend = np.exp(growth[:, None] * t[None, :])
+
+    billing = base_billing[:, None] * trend * (1 + amplitude[:, None] * season)
+    billing *= np.exp(_ar1(rng, (zones, months), 0.6, 0.04))
+
+    # Collection dips when bills peak and drifts with each zone's trend
+    efficiency = (
+        efficiency_base[:, None]
+        + efficiency_trend[:, None] * t[None, :]
+        - 3.0 * amplitude[:, None] / 0.18 * season
+        + _ar1(rng, (zones, months), 0.5, 2.0)
+    )
+    efficiency = np.clip(efficiency, 20, 100)
+    collection = billing * efficiency / 100
+
+    revenue = billing * (1 + other_income[:, None]) * rng.uniform(0.93, 1.0, (zones, months))
+
+    # Costs follow the zone's scale rather than the month's bills, with their own noise
+    expenditure = cost_ratio[:, None] * base_billing[:, None] * trend
+    expenditure *= np.exp(_ar1(rng, (zones, months), 0.4, 0.05))
+    maintenance_season = 1 + 0.15 * np.cos(2 * np.pi * (month_of_year[None, :] - peak[:, None] - 6) / 12)
+    costs = {
+        name: expenditure * share * (maintenance_season if name == 'Maintenance Costs' else 1)
+        for name, share in COST_SHARES.items()
+    }
+    costs['Other Costs'] = np.maximum(expenditure - sum(costs.values()), 0)
+    expenditure = sum(costs.values())
+
+    zone_names = np.array([f'Zone {i + 1:0{zone_width}d}' for i in range(first_zone, first_zone + zones)])
+    frame = pd.DataFrame({
+        'Zone': np.repeat(zone_names, months),
+        'Year': np.tile(start_year + t // 12, zones),
+        'Month': np.tile(month_of_year + 1, zones),
+        'Total Billing': billing.ravel(),
+        'Total Water & Sewerage Billing': (billing * water_share[:, None]).ravel(),
+        'Total Collection': collection.ravel(),
+        'Collection Efficiency': efficiency.ravel(),
+        'Total Operating Revenues': revenue.ravel(),
+        'Total Operating Expenditures': expenditure.ravel(),
+        **{name: values.ravel() for name, values in costs.items()},
+        'Operation & Maintenance Cost Coverage': (revenue / expenditure * 100).ravel(),
+    })
+    return frame[COLUMNS].round(2)
+
+
+def generate(zones, years, seed=0, start_year=None, block_zones=BLOCK_ZONES):
+    """Yield WARIS frames block by block (deterministic for a given seed and sizes)"""
+    if not MIN_ZONES <= zones <= MAX_ZONES:
+        raise ValueError(f"zones must be between {MIN_ZONES} and {MAX_ZONES}")
+    if not MIN_YEARS <= years <= MAX_YEARS:
+        raise ValueError(f"years must be between {MIN_YEARS} and {MAX_YEARS}")
+    rng = np.random.default_rng(seed)
+    width = len(str(zones))
+    for first in range(0, zones, block_zones):
+        yield generate_block(rng, first, min(block_zones, zones - first), years, start_year, width)
+
+
+def generate_frame(zones, years, seed=0, start_year=None):
+    """The whole synthetic dataset as one DataFrame"""
+    return pd.concat(generate(zones, years, seed, start_year), ignore_index=True)
+
+
+def write(path, zones, years, seed=0, start_year=None):
+    """Write a synthetic dataset to path (.csv or .parquet), block by block; returns the row count"""
+    fmt = os.path.splitext(path)[1].lower()
+    if fmt not in ('.csv', '.parquet'):
+        raise ValueError(f"Unsupported output format: {fmt} (use .csv or .parquet)")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+
+    rows = 0
+    writer = None
+    try:
+        for i, block in enumerate(generate(zones, years, seed, start_year)):
+            if fmt == '.csv':
+                block.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            else:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(block, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression='zstd')
+                writer.write_table(table)
+            rows += len(block)
+    finally:
+        if writer is not None:
+            writer.close()
+    # Readers (and the dashboard's refresh check) never see a half-written file
+    os.replace(tmp_path, path)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic WARIS data for scale testing")
+    parser.add_argument('--zones', type=int, default=100, help=f"number of zones ({MIN_ZONES}-{MAX_ZONES})")
+    parser.add_argument('--years', type=int, default=5, help=f"number of years ({MIN_YEARS}-{MAX_YEARS})")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default 0)")
+    parser.add_argument('--start-year', type=int, default=None, help=f"first year (default: ends in {LAST_YEAR})")
+    parser.add_argument('--out', nargs='+', default=['WARIS.csv'],
+                        help="output file(s); .csv and/or .parquet")
+    args = parser.parse_args(argv)
+
+    for path in args.out:
+        started = time.perf_counter()
+        try:
+            rows = write(path, args.zones, args.years, args.seed, args.start_year)
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"{path}: {rows:,} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Dataset registry for hosting several utilities (tenants) in one process
+
+Each tenant has its own WARIS file, and with it its own served dataset,
+aggregate cube, filtered rows and figures: the loaders resolve their data
+path from the current tenant, and every entry of the shared cache
+(waris.cache) is keyed and accounted per tenant. Each tenant also has its
+own cache budget, so a large tenant evicts its own entries before anyone
+else's.
+
+Without WARIS_TENANTS there is a single 'default' tenant on
+WARIS_DATA_PATH and nothing changes. Otherwise WARIS_TENANTS points to a
+JSON file mapping tenant names to a data path, or to an object with the
+path, a display label and a cache budget in megabytes (relative paths are
+relative to the JSON file):
+
+    {
+        "nairobi": {"path": "nairobi/WARIS.csv", "label": "Nairobi Water", "budget_mb": 192},
+        "mombasa": "mombasa/WARIS.parquet"
+    }
+
+Pages call ``select_tenant()`` before loading data. It picks the tenant
+from the ``?tenant=`` URL parameter or the sidebar selector (shown when
+there is more than one tenant), remembers it for the session, and makes it
+current for the rest of the rerun. Code running outside a page (warm-up,
+refresh threads, the API) uses ``use(name)``.
+
+    WARIS_TENANTS            JSON registry of tenants (unset: one 'default' tenant)
+    WARIS_TENANT_BUDGET_MB   cache budget of tenants without their own
+                             (default: the global budget split evenly)
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+DEFAULT = 'default'
+QUERY_PARAM = 'tenant'
+STATE_KEY = 'tenant'
+REGISTRY_PATH = os.environ.get('WARIS_TENANTS') or None
+DEFAULT_BUDGET_MB = os.environ.get('WARIS_TENANT_BUDGET_MB') or None
+
+Tenant = namedtuple('Tenant', ['name', 'label', 'path', 'budget_bytes'])
+
+_local = threading.local()
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _megabytes(value):
+    return int(float(value) * 1024 * 1024) if value is not None else None
+
+
+def load_registry(path=REGISTRY_PATH):
+    """Tenants from the JSON registry (or the single default tenant), in file order"""
+    if path is None:
+        from waris.data import DATA_PATH
+        return OrderedDict([(DEFAULT, Tenant(DEFAULT, 'Default', DATA_PATH, _megabytes(DEFAULT_BUDGET_MB)))])
+
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f, object_pairs_hook=OrderedDict)
+    if not entries:
+        raise ValueError(f"{path} defines no tenants")
+    base = os.path.dirname(os.path.abspath(path))
+    tenants = OrderedDict()
+    for name, entry in entries.items():
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        if 'path' not in entry:
+            raise ValueError(f"tenant {name!r} has no path")
+        tenants[name] = Tenant(
+            name=name,
+            label=entry.get('label', name),
+            path=os.path.join(base, os.path.expanduser(entry['path'])),
+            budget_bytes=_megabytes(entry.get('budget_mb', DEFAULT_BUDGET_MB)),
+        )
+    return tenants
+
+
+def registry():
+    """Every tenant, by name (loaded once per process)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_registry()
+    return _registry
+
+
+def get(name):
+    """The named tenant; raises KeyError for an unknown name"""
+    return registry()[name]
+
+
+def current():
+    """Tenant of the code running on this thread (the first one when none was chosen)"""
+    tenants = registry()
+    name = getattr(_local, 'name', None)
+    return tenants[name] if name in tenants else next(iter(tenants.values()))
+
+
+def current_name():
+    return current().name
+
+
+def current_path():
+    return current().path
+
+
+def activate(name):
+    """Make the named tenant current on this thread"""
+    _local.name = get(name).name
+
+
+@contextmanager
+def use(name):
+    """Run the enclosed block as the named tenant"""
+    previous = getattr(_local, 'name', None)
+    activate(name)
+    try:
+        yield get(name)
+    finally:
+        _local.name = previous
+
+
+def tenant_for_path(path):
+    """Name of the (first) tenant served from path, or None"""
+    return next((tenant.name for tenant in registry().values() if tenant.path == path), None)
+
+
+def budget_bytes(name, total_bytes):
+    """Cache budget of the tenant: its own, or an even share of the global budget"""
+    tenants = registry()
+    budget = tenants[name].budget_bytes if name in tenants else None
+    if budget is None:
+        budget = total_bytes // max(len(tenants), 1)
+    return min(budget, total_bytes)
+
+
+def select_tenant():
+    """Pick this rerun's tenant from ?tenant= or the sidebar selector and make it current
+
+    Outside a Streamlit session (warm-up, scripts) the thread's current
+    tenant is kept.
+    """
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    tenants = registry()
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return current()
+
+    # A URL parameter wins when it is new (a shared link, an edited URL)
+    requested = st.query_params.get(QUERY_PARAM)
+    if requested in tenants and requested != st.session_state.get('_tenant_param'):
+        st.session_state[STATE_KEY] = requested
+    if st.session_state.get(STATE_KEY) not in tenants:
+        st.session_state[STATE_KEY] = next(iter(tenants))
+
+    if len(tenants) > 1:
+        def remember():
+            st.session_state[STATE_KEY] = st.session_state['_tenant_select']
+
+        names = list(tenants)
+        if st.session_state.get('_tenant_select', st.session_state[STATE_KEY]) != st.session_state[STATE_KEY]:
+            del st.session_state['_tenant_select']
+        st.sidebar.selectbox(
+            "🏢 Utility",
+            options=names,
+            index=names.index(st.session_state[STATE_KEY]),
+            format_func=lambda name: tenants[name].label,
+            key='_tenant_select',
+            on_change=remember,
+        )
+        # Keep the URL shareable
+        if requested != st.session_state[STATE_KEY]:
+            st.query_params[QUERY_PARAM] = st.session_state[STATE_KEY]
+        st.session_state['_tenant_param'] = st.session_state[STATE_KEY]
+
+    activate(st.session_state[STATE_KEY])
+    return current()
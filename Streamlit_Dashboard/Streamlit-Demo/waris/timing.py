@@ -0,0 +1,182 @@
+"""
+Per-section timing of dashboard reruns
+
+Wrap the stages of a page in ``section('name')`` (or decorate a function
+with ``@timed('name')``). A page calls ``start_run(page)`` at the top and
+``debug_overlay()`` at the bottom; every section entered in between is
+recorded against that rerun with time.perf_counter, which costs well under
+a microsecond per section. Finished reruns are kept in a short per-page
+history shared by all sessions of the process.
+
+The overlay is hidden unless the page is opened with ``?debug=timing``. It
+shows a waterfall of the current rerun and the p50/p95 of each section
+across the recent reruns.
+
+Sections entered outside a rerun (background threads, pool workers, scripts)
+are not recorded, and neither are reruns started inside ``paused()`` (the
+cache warm-up runs the pages that way). When memory profiling is on (waris.memprofile), reruns
+and sections also record the memory they allocate.
+"""
+
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from waris import memprofile
+
+HISTORY = 200
+DEBUG_PARAM = 'debug'
+DEBUG_VALUES = ('timing', '1', 'true')
+
+_local = threading.local()
+_history = {}
+_history_lock = threading.Lock()
+
+
+class _Run:
+    __slots__ = ('page', 'started', 'sections', 'depth')
+
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.sections = []
+        self.depth = 0
+
+
+def start_run(page):
+    """Begin recording a rerun of the named page on this thread"""
+    if getattr(_local, 'paused', False):
+        _local.run = None
+        return
+    _local.run = _Run(page)
+    memprofile.begin(page)
+
+
+@contextmanager
+def paused():
+    """Record no reruns started on this thread in the enclosed block"""
+    previous = getattr(_local, 'paused', False)
+    _local.paused = True
+    try:
+        yield
+    finally:
+        _local.paused = previous
+
+
+class section:
+    """Context manager recording how long the enclosed block took in the current rerun"""
+
+    __slots__ = ('name', 'run', 'start', 'depth', 'memory')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.run = getattr(_local, 'run', None)
+        if self.run is not None:
+            self.depth = self.run.depth
+            self.run.depth += 1
+        self.memory = memprofile.open_frame() if memprofile.active() else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.memory is not None:
+            memprofile.close_frame(self.name, self.memory)
+        run = self.run
+        if run is not None:
+            run.depth -= 1
+            run.sections.append((self.name, self.start - run.started, end - self.start, self.depth))
+        return False
+
+
+def timed(name=None):
+    """Decorator: record every call of the function as a section (default: its name)"""
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_run():
+    """Close the current rerun, add it to the page's history and return its sections frame"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    _local.run = None
+    total = time.perf_counter() - run.started
+    memprofile.end()
+    sections = pd.DataFrame(run.sections, columns=['Section', 'Start', 'Duration', 'Depth'])
+    sections = pd.concat([
+        pd.DataFrame([('Total rerun', 0.0, total, -1)], columns=sections.columns),
+        sections.sort_values('Start', kind='stable'),
+    ], ignore_index=True)
+
+    with _history_lock:
+        history = _history.setdefault(run.page, deque(maxlen=HISTORY))
+        history.append(sections[['Section', 'Duration']])
+    return sections
+
+
+def percentiles(page):
+    """p50/p95 (milliseconds) per section across the page's recent reruns"""
+    with _history_lock:
+        runs = list(_history.get(page, ()))
+    if not runs:
+        return pd.DataFrame(columns=['Section', 'Runs', 'p50 (ms)', 'p95 (ms)'])
+    # Sections entered more than once in a rerun (e.g. per chart) are summed per rerun
+    durations = pd.concat(
+        [run.groupby('Section', sort=False)['Duration'].sum() for run in runs], axis=1
+    ).T * 1000
+    return pd.DataFrame({
+        'Section': durations.columns,
+        'Runs': durations.count().to_numpy(),
+        'p50 (ms)': np.nanpercentile(durations, 50, axis=0).round(2),
+        'p95 (ms)': np.nanpercentile(durations, 95, axis=0).round(2),
+    })
+
+
+def debug_overlay():
+    """Finish the rerun and, with ?debug=timing, show its waterfall and recent percentiles"""
+    import plotly.graph_objects as go
+    import streamlit as st
+
+    page = getattr(getattr(_local, 'run', None), 'page', None)
+    sections = finish_run()
+    if sections is None or st.query_params.get(DEBUG_PARAM) not in DEBUG_VALUES:
+        return
+
+    with st.expander(f"⏱️ Rerun timing - {page}", expanded=True):
+        labels = ['  ' * (depth + 1) + name for name, depth in zip(sections['Section'], sections['Depth'])]
+        fig = go.Figure(go.Bar(
+            y=labels,
+            x=sections['Duration'] * 1000,
+            base=sections['Start'] * 1000,
+            orientation='h',
+            marker_color=['#1d4ed8' if depth < 0 else '#3b82f6' for depth in sections['Depth']],
+            hovertemplate='%{y}: %{x:.1f} ms<extra></extra>',
+        ))
+        fig.update_layout(
+            title='Current Rerun Waterfall',
+            title_font_size=16,
+            title_x=0.5,
+            xaxis_title="Milliseconds since rerun start",
+            yaxis=dict(autorange='reversed'),
+            height=max(250, 24 * len(sections)),
+            showlegend=False
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown(f"**Recent reruns of this page** (last {HISTORY}, all sessions)")
+        st.dataframe(percentiles(page), use_container_width=True, hide_index=True)
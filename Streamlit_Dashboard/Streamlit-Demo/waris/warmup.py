@@ -0,0 +1,157 @@
+"""
+Cache warm-up for the WARIS dashboard
+
+Pre-populates the shared dataset cache, the aggregate cube and the
+default-view figures of Home.py and every page, for every tenant, so the
+first session after a deploy or restart is served from the same warm caches
+as the hundredth. The page runs are left out of the rerun timings
+(waris.timing), and the warnings Streamlit logs for scripts run outside a
+session are dropped for the warm-up's thread only.
+
+    python -m waris.warmup            # warm up and print timings
+    python -m waris.warmup --serve    # warm up, then serve Home.py from this process
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from waris import tenants, timing
+from waris.cube import load_cube
+from waris.data import load_data
+from waris.executor import wait_for_pending
+
+logger = logging.getLogger(__name__)
+
+MULTI_PAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Multi_page'))
+PAGES = [
+    'Home.py',
+    os.path.join('pages', '1.Analytics.py'),
+    os.path.join('pages', '2.trends.py'),
+    os.path.join('pages', '3.data.py'),
+    os.path.join('pages', '5.scenarios.py'),
+]
+
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+
+
+def run_page(page):
+    """Execute a Multi_page script as ``__main__``, the way Streamlit runs it
+
+    Outside a live session every widget returns its default value, so this
+    builds exactly the default view and fills the page's cached builders under
+    the same cache keys the server uses.
+    """
+    path = os.path.join(MULTI_PAGE_DIR, page)
+    with open(path, encoding='utf-8') as f:
+        code = compile(f.read(), path, 'exec', dont_inherit=True)
+    exec(code, {'__name__': '__main__', '__file__': path})
+
+
+class _BareModeFilter(logging.Filter):
+    """Drops the bare-mode warnings logged from one thread (not the warm-up's own records)"""
+
+    def __init__(self, thread):
+        super().__init__()
+        self.thread = thread
+
+    def filter(self, record):
+        return record.thread != self.thread or record.levelno > logging.WARNING or record.name == __name__
+
+
+@contextmanager
+def _quiet_bare_mode():
+    """Silence Streamlit's bare-mode warnings for this thread in the enclosed block
+
+    A filter on every handler rather than logging.disable, which would also
+    silence the sessions the server runs meanwhile.
+    """
+    quiet = _BareModeFilter(threading.get_ident())
+    loggers = [logging.getLogger()] + [
+        candidate for candidate in logging.Logger.manager.loggerDict.values()
+        if isinstance(candidate, logging.Logger)
+    ]
+    handlers = {id(handler): handler for log in loggers for handler in log.handlers}
+    if logging.lastResort is not None:
+        handlers[id(logging.lastResort)] = logging.lastResort
+    for handler in handlers.values():
+        handler.addFilter(quiet)
+    try:
+        yield
+    finally:
+        for handler in handlers.values():
+            handler.removeFilter(quiet)
+
+
+def warm_up(pages=PAGES):
+    """Warm the dataset, the aggregate cube, each page and its offloaded analytics
+
+    Every tenant is warmed in registry order. Returns a list of (step, seconds)
+    timings; with several tenants the steps are prefixed with the tenant name.
+    """
+    names = list(tenants.registry())
+    steps = []
+    for tenant in names:
+        prefix = f'{tenant}: ' if len(names) > 1 else ''
+        steps += [(tenant, prefix + 'dataset', load_data), (tenant, prefix + 'aggregate cube', load_cube)]
+        steps += [(tenant, prefix + page, lambda page=page: run_page(page)) for page in pages]
+    steps += [(names[0], 'offloaded analytics', wait_for_pending)]
+
+    timings = []
+    for tenant, name, step in steps:
+        start = time.perf_counter()
+        try:
+            # Handlers are collected per step: page imports may add loggers
+            with _quiet_bare_mode(), timing.paused(), tenants.use(tenant):
+                step()
+        except Exception as e:
+            logger.error("Warm-up step %s failed: %s", name, e)
+        elapsed = time.perf_counter() - start
+        timings.append((name, elapsed))
+        logger.info("Warm-up %s: %.3fs", name, elapsed)
+    return timings
+
+
+def start_warm_up(pages=PAGES):
+    """Start the warm-up in a background thread, once per process"""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(
+                target=warm_up, args=(pages,), name='waris-warmup', daemon=True
+            )
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def format_timings(timings):
+    """Render warm-up timings as a small text table"""
+    width = max(len(name) for name, _ in timings)
+    lines = [f"{name:<{width}}  {seconds:8.3f}s" for name, seconds in timings]
+    lines.append(f"{'total':<{width}}  {sum(seconds for _, seconds in timings):8.3f}s")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm the WARIS dashboard caches")
+    parser.add_argument('--serve', action='store_true',
+                        help="start the Streamlit server for Home.py in this process after warming up")
+    args, streamlit_args = parser.parse_known_args(argv)
+
+    print(format_timings(warm_up()))
+
+    if args.serve:
+        from streamlit.web import cli as stcli
+
+        sys.argv = ['streamlit', 'run', os.path.join(MULTI_PAGE_DIR, 'Home.py')] + streamlit_args
+        return stcli.main()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -8,6 +7,12 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from waris.cube import aggregate, load_cube, period_rollup, slice_cube
+from waris.data import load_data
+from waris.filters import load_filtered
+from waris.kpis import kpi_summary_from_cube, zone_metrics as compute_zone_metrics
+from waris.tenants import select_tenant
+
 # Page configuration
 st.set_page_config(
     page_title="WARIS Water Management Dashboard",
@@ -16,6 +21,9 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Utility (tenant) whose data this session sees: ?tenant= or the sidebar selector
+select_tenant()
+
 # Global CSS for consistent branding
 st.markdown("""
 <style>
@@ -292,29 +300,7 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load and prepare data
-@st.cache_data
-def load_data():
-    """Load and preprocess the WARIS dataset"""
-    try:
-        df = pd.read_csv('../../Data/WARIS.csv')
-        df['Date'] = pd.to_datetime(df[['Year', 'Month']].assign(DAY=1))
-        df['Year'] = df['Date'].dt.year
-        df['Month_Name'] = df['Date'].dt.month_name()
-        df['Quarter'] = df['Date'].dt.quarter
-        
-        # Calculate additional metrics
-        df['Net_Revenue'] = df['Total Operating Revenues'] - df['Total Operating Expenditures']
-        df['Revenue_Growth'] = df.groupby('Zone')['Total Operating Revenues'].pct_change() * 100
-        df['Efficiency_Score'] = (df['Collection Efficiency'] / 100) * df['Operation & Maintenance Cost Coverage']
-        df['Collection_Rate'] = (df['Total Collection'] / df['Total Billing'] * 100).round(2)
-        
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return pd.DataFrame()
-
-# Load data
+# Load data (shared, read-only frame from the waris compute core)
 df = load_data()
 
 if df.empty:
@@ -388,19 +374,8 @@ with st.expander("🔧 Filters & Controls", expanded=False):
         )
 
 # Apply filters
-filtered_df = df.copy()
-
-if len(date_range) == 2:
-    filtered_df = filtered_df[
-        (filtered_df['Date'].dt.date >= date_range[0]) & 
-        (filtered_df['Date'].dt.date <= date_range[1])
-    ]
-
-if 'All' not in selected_zones:
-    filtered_df = filtered_df[filtered_df['Zone'].isin(selected_zones)]
-
-if selected_years:
-    filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
+filtered_df = load_filtered(date_range, selected_zones, selected_years)
+cube_df = slice_cube(load_cube(), date_range, selected_zones, selected_years)
 
 if filtered_df.empty:
     st.warning("No data available for the selected filters. Please adjust your selection.")
@@ -411,20 +386,7 @@ if current_page == "Home":
     st.markdown('<div class="section-header">🏠 Dashboard Overview</div>', unsafe_allow_html=True)
     
     # Key Performance Indicators
-    total_revenue = filtered_df['Total Operating Revenues'].sum()
-    total_expenditure = filtered_df['Total Operating Expenditures'].sum()
-    net_revenue = total_revenue - total_expenditure
-    avg_efficiency = filtered_df['Collection Efficiency'].mean()
-    total_billing = filtered_df['Total Billing'].sum()
-    total_collection = filtered_df['Total Collection'].sum()
-    collection_rate = (total_collection / total_billing * 100) if total_billing > 0 else 0
-    
-    # Previous period comparison
-    if len(filtered_df) > 1:
-        prev_period_revenue = filtered_df.groupby('Year')['Total Operating Revenues'].sum().iloc[-2] if len(filtered_df.groupby('Year')) > 1 else 0
-        revenue_growth = ((total_revenue - prev_period_revenue) / prev_period_revenue * 100) if prev_period_revenue > 0 else 0
-    else:
-        revenue_growth = 0
+    kpis = kpi_summary_from_cube(cube_df)
     
     # KPI Cards
     st.markdown("""
@@ -450,7 +412,8 @@ if current_page == "Home":
             <div class="kpi-trend">Collections / Billing</div>
         </div>
     </div>
-    """.format(total_revenue, revenue_growth, net_revenue, avg_efficiency, collection_rate), unsafe_allow_html=True)
+    """.format(kpis.total_revenue, kpis.revenue_growth, kpis.net_revenue, kpis.avg_efficiency, kpis.collection_rate),
+               unsafe_allow_html=True)
     
     # Overview Charts
     col1, col2 = st.columns(2)
@@ -486,7 +449,7 @@ if current_page == "Home":
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">Revenue Distribution by Zone</div>', unsafe_allow_html=True)
-        zone_revenue = filtered_df.groupby('Zone')['Total Operating Revenues'].sum().reset_index()
+        zone_revenue = aggregate(cube_df, 'Zone')[['Zone', 'Total Operating Revenues']]
         fig = px.pie(
             zone_revenue, 
             values='Total Operating Revenues', 
@@ -502,17 +465,7 @@ elif current_page == "Analytics":
     st.markdown('<div class="section-header">📊 Advanced Analytics</div>', unsafe_allow_html=True)
     
     # Zone Performance Comparison
-    zone_metrics = filtered_df.groupby('Zone').agg({
-        'Total Operating Revenues': 'sum',
-        'Total Operating Expenditures': 'sum',
-        'Collection Efficiency': 'mean',
-        'Operation & Maintenance Cost Coverage': 'mean',
-        'Total Collection': 'sum',
-        'Total Billing': 'sum'
-    }).round(2)
-    
-    zone_metrics['Net Revenue'] = zone_metrics['Total Operating Revenues'] - zone_metrics['Total Operating Expenditures']
-    zone_metrics['Collection Rate'] = (zone_metrics['Total Collection'] / zone_metrics['Total Billing'] * 100).round(2)
+    zone_metrics = compute_zone_metrics(cube_df)
     
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     st.markdown('<div class="chart-title">Zone Performance Summary</div>', unsafe_allow_html=True)
@@ -537,7 +490,7 @@ elif current_page == "Analytics":
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">Revenue by Zone Over Time</div>', unsafe_allow_html=True)
-        revenue_data = filtered_df.groupby(['Zone', 'Year'])['Total Operating Revenues'].sum().reset_index()
+        revenue_data = aggregate(cube_df, ['Zone', 'Year'])[['Zone', 'Year', 'Total Operating Revenues']]
         fig = px.bar(
             revenue_data,
             x='Year',
@@ -580,39 +533,9 @@ elif current_page == "Trends":
         key="agg_level"
     )
     
-    # Aggregate data based on selected level
-    if agg_level == 'Monthly':
-        agg_df = filtered_df.groupby(['Date', 'Zone']).agg({
-            'Total Operating Revenues': 'sum',
-            'Total Operating Expenditures': 'sum',
-            'Collection Efficiency': 'mean',
-            'Total Collection': 'sum',
-            'Total Billing': 'sum',
-            'Net_Revenue': 'sum'
-        }).reset_index()
-        x_col = 'Date'
-    elif agg_level == 'Quarterly':
-        agg_df = filtered_df.groupby(['Year', 'Quarter', 'Zone']).agg({
-            'Total Operating Revenues': 'sum',
-            'Total Operating Expenditures': 'sum',
-            'Collection Efficiency': 'mean',
-            'Total Collection': 'sum',
-            'Total Billing': 'sum',
-            'Net_Revenue': 'sum'
-        }).reset_index()
-        agg_df['Quarter_Date'] = pd.to_datetime(agg_df[['Year', 'Quarter']].assign(Month=agg_df['Quarter']*3))
-        x_col = 'Quarter_Date'
-    else:  # Yearly
-        agg_df = filtered_df.groupby(['Year', 'Zone']).agg({
-            'Total Operating Revenues': 'sum',
-            'Total Operating Expenditures': 'sum',
-            'Collection Efficiency': 'mean',
-            'Total Collection': 'sum',
-            'Total Billing': 'sum',
-            'Net_Revenue': 'sum'
-        }).reset_index()
-        agg_df['Year_Date'] = pd.to_datetime(agg_df['Year'], format='%Y')
-        x_col = 'Year_Date'
+    # Aggregate data based on selected level, from the cached (Date, Zone) cube
+    agg_df = period_rollup(cube_df, agg_level)
+    x_col = 'Date'
     
     # Revenue Trends
     col1, col2 = st.columns(2)
@@ -701,7 +624,7 @@ elif current_page == "Data Explorer":
     with col1:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">Revenue by Zone</div>', unsafe_allow_html=True)
-        revenue_by_zone = filtered_df.groupby('Zone')['Total Operating Revenues'].sum().reset_index()
+        revenue_by_zone = aggregate(cube_df, 'Zone')[['Zone', 'Total Operating Revenues']]
         fig = px.bar(
             revenue_by_zone,
             x='Zone',
@@ -720,7 +643,7 @@ elif current_page == "Data Explorer":
     with col2:
         st.markdown('<div class="chart-container">', unsafe_allow_html=True)
         st.markdown('<div class="chart-title">Collection Efficiency by Zone</div>', unsafe_allow_html=True)
-        efficiency_by_zone = filtered_df.groupby('Zone')['Collection Efficiency'].mean().reset_index()
+        efficiency_by_zone = aggregate(cube_df, 'Zone')[['Zone', 'Collection Efficiency']]
         fig = px.bar(
             efficiency_by_zone,
             x='Zone',
@@ -7,13 +7,26 @@ import streamlit as st
 import sys
 import os
 
-# Add the Multi_page directory to the path
+# Add the Multi_page directory and the shared waris package to the path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Streamlit-Demo', 'Multi_page'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Streamlit-Demo'))
 
-# Import and run the Home.py file
+from waris.warmup import run_page, start_warm_up
+
+# Warm the dataset, aggregate cube and default-view figures once per server
+# process, in the background, so later sessions start from warm caches
+start_warm_up()
+
+# Serve the read-only JSON/Arrow API from this process too, when a port is configured
+if os.environ.get('WARIS_API_PORT'):
+    from waris.api import start_api
+    start_api()
+
+# Run the Home.py file
 if __name__ == "__main__":
     # Change to the Multi_page directory
     os.chdir(os.path.join(os.path.dirname(__file__), 'Streamlit-Demo', 'Multi_page'))
-    
-    # Import and run the main dashboard
-    import Home
+
+    # Run the main dashboard as __main__ on every rerun, sharing the
+    # warm-up's cache keys (a plain import would only execute it once)
+    run_page('Home.py')